@@ -0,0 +1,197 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Benchmarks of the hot paths of decree. Each benchmark is timed with timeit and the best
+time per operation is reported, results are written as json so that runs can be compared
+across releases.
+
+    python benchmarks/bench_decree.py --output benchmarks.json
+    tox -e bench
+'''
+
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import timeit
+
+import decree
+from decree import validators
+from decree.command import Command
+from decree.exceptions import ValidationError
+from decree.ingest import ingest
+from decree.pool import pooled
+
+
+class SomeObject():
+    pass
+
+
+VALIDATOR_SAMPLES = [
+    (validators.IntValidator, {}, 1234),
+    (validators.BooleanValidator, {}, True),
+    (validators.StringValidator, {}, 'blah'),
+    (validators.FloatValidator, {}, 1.234),
+    (validators.DictValidator, {}, {1: 2}),
+    (validators.SetValidator, {}, {1, 2}),
+    (validators.ListValidator, {}, [1, 2]),
+    (validators.ObjectValidator, {'type': SomeObject}, SomeObject()),
+]
+
+
+def define_command(arg_count, base=Command, prefix='arg', defaults=False, defer=False):
+    '''defines a command with arg_count int args'''
+    def command_args(cmd):
+        for index in range(arg_count):
+            if defaults:
+                cmd.int('{}{}'.format(prefix, index), default=index + 1)
+            else:
+                cmd.int('{}{}'.format(prefix, index))
+
+    return type('Command{}'.format(arg_count), (base,), {
+        'command_args': classmethod(command_args),
+        'execute': lambda self: None,
+        'defer_args': defer,
+    })
+
+
+def command_kwargs(arg_count, prefix='arg'):
+    return {'{}{}'.format(prefix, index): index for index in range(arg_count)}
+
+
+def define_hierarchy(depth):
+    '''defines a chain of depth commands each adding an arg to its parent'''
+    command = Command
+    for level in range(depth):
+        command = define_command(1, base=command, prefix='level{}_'.format(level))
+    return command
+
+
+def define_catalog(size, arg_count=10, defer=False):
+    return [define_command(arg_count, defer=defer) for _ in range(size)]
+
+
+def raising(function):
+    def call():
+        try:
+            function()
+        except ValidationError:
+            pass
+    return call
+
+
+def benchmarks():
+    '''the benchmarks to run, as a dict of name to a callable timing a single operation'''
+    cases = {}
+
+    for arg_count in (0, 5, 50):
+        command = define_command(arg_count)
+        kwargs = command_kwargs(arg_count)
+        cases['run/args={}'.format(arg_count)] = lambda command=command, kwargs=kwargs: command.run(**kwargs)
+
+    pooled_command = pooled(define_command(5))
+    pooled_kwargs = command_kwargs(5)
+    cases['run/pooled,args=5'] = lambda: pooled_command.run(**pooled_kwargs)
+
+    defaulted = define_command(5, defaults=True)
+    cases['run/defaults=5'] = defaulted.run
+
+    for validator_class, options, value in VALIDATOR_SAMPLES:
+        validator = validator_class('somearg', **options)
+        args = {'somearg': value}
+        cases['validator/{}'.format(validator_class.__name__)] = \
+            lambda validator=validator, args=args: validator.validate(args)
+
+    ids = {'ids': list(range(100000))}
+    for label, options in (('of=int', {'of': int}), ('of=int,sample=1000', {'of': int, 'sample': 1000})):
+        validator = validators.ListValidator('ids', **options)
+        cases['elements/list={},{}'.format(len(ids['ids']), label)] = \
+            lambda validator=validator: validator.validate(ids)
+
+    ingested = define_command(5)
+    csv_text = ','.join('arg{}'.format(index) for index in range(5)) + '\n' + \
+        ''.join('{0},{0},{0},{0},{0}\n'.format(row + 1) for row in range(10000))
+    cases['ingest/rows=10000,args=5'] = \
+        lambda: list(ingest(ingested, io.StringIO(csv_text)))
+
+    failing = define_command(5)
+    valid = command_kwargs(5)
+    missing = dict(valid)
+    del missing['arg4']
+    wrong_type = dict(valid, arg4='not an int')
+    cases['failure/missing_required'] = raising(lambda: failing.run(**missing))
+    cases['failure/unexpected_type'] = raising(lambda: failing.run(**wrong_type))
+
+    for depth in (1, 10, 50):
+        command = define_hierarchy(depth)
+        kwargs = {'level{}_0'.format(level): level for level in range(depth)}
+        cases['hierarchy/depth={}'.format(depth)] = lambda command=command, kwargs=kwargs: command.run(**kwargs)
+
+    cases['define/command_args=10'] = lambda: define_command(10)
+    cases['define/catalog=100'] = lambda: define_catalog(100)
+    cases['define/deferred_catalog=100'] = lambda: define_catalog(100, defer=True)
+    cases['define/hierarchy=50'] = lambda: define_hierarchy(50)
+    return cases
+
+
+def measure(function, repeat):
+    '''the best time in nanoseconds of a single call of the function'''
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) * 1e9 / number, number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks the hot paths of decree')
+    parser.add_argument('--output', help='file to write the json results to, defaults to stdout')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timings of each benchmark')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    options = parser.parse_args(argv)
+
+    results = {}
+    for name, function in benchmarks().items():
+        if options.filter not in name:
+            continue
+        ns_per_op, number = measure(function, options.repeat)
+        results[name] = {'ns_per_op': round(ns_per_op, 1), 'loops': number, 'repeat': options.repeat}
+        print('{:<40} {:>14.1f} ns/op'.format(name, ns_per_op), file=sys.stderr)
+
+    report = {
+        'decree': decree.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'timestamp': time.time(),
+        'results': results,
+    }
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Defines the AsyncCommand, a Command whose validate and execute methods are coroutines so
+that it can be run from asyncio code without blocking the event loop.
+'''
+
+import asyncio
+import functools
+from time import perf_counter_ns
+
+from decree.command import BatchResult
+from decree.command import Command
+from decree.command import run_recorder
+from decree.deadlines import check_deadline
+
+
+class AsyncCommand(Command):
+    '''
+    Base asynchronous Command. Arguments are defined and validated exactly as for a Command
+    but validate and execute are coroutines and the command is run with run_async.
+    '''
+
+    command_base = True
+
+    @classmethod
+    async def run_async(cls, **command_args):
+        '''
+        runs the command, validating the arguments and awaiting the
+        overridden execute method.
+
+        Args:
+         command_args: arbitrary keyword args which get validated by name
+        '''
+        pool = cls.instance_pool
+        if pool is not None:
+            return await pool.run_async(cls, command_args)
+        instance = cls()
+        return await instance.run_instance_async(**command_args)
+
+    @classmethod
+    async def run_many_async(cls, command_args_batch, concurrency=100):
+        '''
+        runs the command once for each set of args in the batch with at most concurrency
+        invocations in flight at a time.
+
+        Args:
+         command_args_batch: an iterable of dicts of command args, consumed lazily
+         concurrency: the maximum number of invocations to run concurrently
+        Returns:
+         a BatchResult holding the results and errors of each invocation
+        '''
+        invocations = ((cls, command_args) for command_args in command_args_batch)
+        return await run_concurrently(invocations, concurrency)
+
+    async def run_instance_async(self, **command_args):
+        '''
+        runs an instance of a command, validating the arguments and awaiting the
+        overridden execute method. Raises DeadlineExceeded rather than validating or
+        executing the command once the deadline of the current context has passed.
+
+        Args:
+         command_args: arbitrary keyword args which get validated by name
+        '''
+        if self.run_wrappers or run_recorder() is not None:
+            return await _run_hooked_async(self, command_args)
+        check_deadline()
+        self._validate_args(command_args)
+        await self.validate()
+        check_deadline()
+        return await self.execute()
+
+    def run_instance(self, **command_args):
+        raise TypeError('{} is asynchronous, use run_async to run it'.format(type(self).__name__))
+
+    def run_validated(self):
+        raise TypeError('{} is asynchronous, use run_async to run it'.format(type(self).__name__))
+
+    def run_prepared(self):
+        raise TypeError('{} is asynchronous, use run_async to run it'.format(type(self).__name__))
+
+    @classmethod
+    def run_many(cls, command_args_batch, stop_on_error=False):
+        raise TypeError('{} is asynchronous, use run_many_async to run it'.format(cls.__name__))
+
+    @classmethod
+    def prepare(cls, **command_args):
+        # prepared instances are executed synchronously by executors and schedulers
+        raise TypeError('{} is asynchronous and cannot be prepared to be executed '
+                        'elsewhere'.format(cls.__name__))
+
+    async def validate(self):
+        '''
+        validate coroutine awaited after args have been vetted to allow custom argument
+        validation and should raise an Exception to indicate a validation issue
+        '''
+        pass
+
+    async def execute(self):
+        '''
+        execute coroutine awaited when the arguments have been vetted and any custom
+        validation has passed.
+        '''
+        pass
+
+
+async def _run_hooked_async(command, command_args):
+    '''
+    runs an asynchronous command through the run_async of its wrappers, reporting the run to
+    the recorder if there is one, see decree.command.set_run_recorder
+    '''
+    recorder = run_recorder()
+    durations = None if recorder is None else {}
+    try:
+        start = perf_counter_ns()
+        check_deadline()
+        command._validate_args(command_args)
+        if durations is not None:
+            durations['args'] = perf_counter_ns() - start
+
+        proceed = functools.partial(_validate_and_execute_async, command, durations)
+        for wrapper in command.run_wrappers:
+            proceed = functools.partial(wrapper.run_async, command, proceed)
+        result = await proceed()
+    except Exception as e:
+        if recorder is not None:
+            recorder(type(command), durations, e)
+        raise
+    if recorder is not None:
+        recorder(type(command), durations, None)
+    return result
+
+
+async def _validate_and_execute_async(command, durations):
+    if durations is None:
+        await command.validate()
+        check_deadline()
+        return await command.execute()
+
+    start = perf_counter_ns()
+    await command.validate()
+    validated = perf_counter_ns()
+    durations['validate'] = validated - start
+    check_deadline()
+    result = await command.execute()
+    durations['execute'] = perf_counter_ns() - validated
+    return result
+
+
+async def run_concurrently(invocations, concurrency=100):
+    '''
+    runs many asynchronous commands concurrently, never running more than concurrency of
+    them at a time. Invocations are taken from the iterable only as capacity frees up so it
+    may be arbitrarily long.
+
+    Args:
+        invocations: an iterable of (AsyncCommand class, command args dict) tuples
+        concurrency: the maximum number of invocations to run concurrently
+    Returns:
+        a BatchResult holding the results and errors of each invocation in order
+    '''
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1')
+
+    pending = enumerate(invocations)
+    results = {}
+    errors = {}
+
+    async def run_pending():
+        for index, (command_class, command_args) in pending:
+            try:
+                results[index] = await command_class.run_async(**command_args)
+            except Exception as e:
+                results[index] = None
+                errors[index] = e
+
+    await asyncio.gather(*(run_pending() for _ in range(concurrency)))
+
+    batch = BatchResult()
+    batch.results = [results[index] for index in range(len(results))]
+    batch.errors = {index: errors[index] for index in sorted(errors)}
+    return batch
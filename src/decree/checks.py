@@ -0,0 +1,109 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Defines the results of checking command args without raising. Checks record the kind of
+each error and the details needed to describe it, the ValidationError for an error and
+its message are only created when asked for.
+'''
+
+
+class ArgError():
+    '''
+    a validation error found when checking an arg, recording the ValidationError class
+    that describes it and the args that error would be created with
+    '''
+    __slots__ = ('error_class', 'error_args', '_exception')
+
+    def __init__(self, error_class, error_args, exception=None):
+        self.error_class = error_class
+        self.error_args = error_args
+        self._exception = exception
+
+    @classmethod
+    def from_exception(cls, exception):
+        return cls(type(exception), exception.args, exception)
+
+    @property
+    def code(self):
+        return self.error_class.code
+
+    @property
+    def name(self):
+        return self.error_args[0] if self.error_args else None
+
+    @property
+    def message(self):
+        return str(self.exception())
+
+    def exception(self):
+        '''the ValidationError describing this error'''
+        if self._exception is None:
+            self._exception = self.error_class(*self.error_args)
+        return self._exception
+
+    def __repr__(self):
+        return 'ArgError({!r}, {!r})'.format(self.code, self.error_args)
+
+
+class ArgCheck():
+    '''
+    the outcome of checking a single arg, either its validated value or the error found
+    '''
+    __slots__ = ('value', 'error')
+
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def code(self):
+        return self.error.code if self.error is not None else None
+
+
+class CheckResult():
+    '''
+    the outcome of checking all the args of a command, the validated value of each valid arg
+    keyed by name and every error found
+    '''
+    __slots__ = ('values', 'errors')
+
+    def __init__(self, values, errors):
+        self.values = values
+        self.errors = errors
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def codes(self):
+        return {error.name: error.code for error in self.errors}
+
+    def raise_for_errors(self):
+        '''raises the ValidationError of the first error found, if any'''
+        if self.errors:
+            raise self.errors[0].exception()
@@ -0,0 +1,119 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Runs registered commands from a stream of json lines, one invocation per line, writing the
+outcome of each as a json line in the same order. Input is read and output written one line
+at a time so streams of any length are run in constant memory.
+
+    $ decree --import myapp.commands invocations.jsonl
+    {"command": "myapp.Lookup", "args": {"key": 1}}   ->   {"result": ...}
+'''
+
+import argparse
+import collections
+import importlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from decree.command import dispatch
+
+
+def run_line(line):
+    '''
+    runs the invocation encoded in a line of json
+
+    Returns:
+        a dict holding either the result of the command or a description of its error
+    '''
+    try:
+        return {'result': dispatch(json.loads(line))}
+    except Exception as e:
+        return {'error': describe_error(e)}
+
+
+def describe_error(error):
+    description = {'type': type(error).__name__, 'message': str(error)}
+    code = getattr(error, 'code', None)
+    if code is not None:
+        description['code'] = code
+    return description
+
+
+def run_lines(lines, workers=1):
+    '''
+    runs the invocation on each line, skipping blank lines. With more than one worker
+    invocations are run concurrently on a pool of threads, reading only a bounded number of
+    lines ahead of the oldest invocation that has not completed.
+
+    Returns:
+        an iterator over the outcome of each invocation in the order they were read
+    '''
+    lines = (line for line in lines if line.strip())
+    if workers <= 1:
+        for line in lines:
+            yield run_line(line)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = collections.deque()
+        for line in lines:
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+            in_flight.append(pool.submit(run_line, line))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs commands from json lines invocations')
+    parser.add_argument('input', nargs='?', default='-', help='file of invocations, defaults to stdin')
+    parser.add_argument('--output', help='file to write the outcomes to, defaults to stdout')
+    parser.add_argument('--import', dest='modules', action='append', default=[], metavar='MODULE',
+                        help='module defining commands to import, may be repeated')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of invocations to run concurrently, outcomes keep their order')
+    options = parser.parse_args(argv)
+
+    for module in options.modules:
+        importlib.import_module(module)
+
+    source = sys.stdin if options.input == '-' else open(options.input)
+    output = sys.stdout if not options.output else open(options.output, 'w')
+    failures = 0
+    try:
+        for outcome in run_lines(source, options.workers):
+            if 'error' in outcome:
+                failures += 1
+            output.write(json.dumps(outcome, default=str))
+            output.write('\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Defines the CommandClient which runs commands on a CommandServer, see decree.server.
+'''
+
+import itertools
+import json
+import socket
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError
+
+from decree.exceptions import RemoteCommandError
+from decree.server import encode
+from decree.server import read_frame
+from decree.server import write_frame
+
+
+class CommandClient():
+    '''
+    Runs commands on a CommandServer over a pool of connections. Requests are pipelined,
+    each is sent without waiting for the responses to those before it, so many commands may
+    be in flight on each connection. Requests are sent on the connection with the fewest in
+    flight, opening another connection while the pool is below pool_size and every open
+    connection is busy.
+    '''
+
+    def __init__(self, address, pool_size=4, timeout=None):
+        '''
+        Args:
+            address: the path of the server's unix domain socket or its (host, port)
+            pool_size: the maximum number of connections to the server
+            timeout: the number of seconds run waits for a response, None to wait forever
+        '''
+        if pool_size < 1:
+            raise ValueError('pool_size must be at least 1')
+
+        self.address = address
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._connections = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, command, command_args=None):
+        '''
+        sends a request to run the command without waiting for its response
+
+        Args:
+            command: a command class or the name it is registered with
+            command_args: dict of args for the command, validated by the server
+        Returns:
+            a Future for the result of the command, failing with a RemoteCommandError if the
+            command fails on the server
+        '''
+        return self._send(command, command_args)[1]
+
+    def run(self, command, command_args=None):
+        '''
+        runs the command on the server, waiting for and returning its result. Raises a
+        TimeoutError if there is no response within the client's timeout, any response that
+        arrives later is dropped.
+        '''
+        connection, future = self._send(command, command_args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            connection.forget(future)
+            raise
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _send(self, command, command_args):
+        command_name = command if isinstance(command, str) else command.command_name
+        body = encode({'command': command_name, 'args': command_args or {}})
+        connection = self._connection()
+        return connection, connection.send(body)
+
+    def _connection(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('client is closed')
+            self._connections = [connection for connection in self._connections if connection.open]
+            connection = min(self._connections, key=len, default=None)
+            if connection is None or (len(connection) and len(self._connections) < self.pool_size):
+                connection = _Connection(self.address)
+                self._connections.append(connection)
+            return connection
+
+
+class _Connection():
+    '''a connection to the server whose responses are read by its own thread'''
+
+    def __init__(self, address):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET6 if ':' in address[0] else socket.AF_INET,
+                                      socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.connect(address)
+
+        self.open = True
+        self._pending = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._read, name='decree-client', daemon=True).start()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def send(self, body):
+        future = Future()
+        with self._lock:
+            if not self.open:
+                raise ConnectionError('connection to the command server is closed')
+            request_id = next(self._ids) & 0xffffffff
+            self._pending[request_id] = future
+        try:
+            with self._send_lock:
+                write_frame(self.sock, request_id, body)
+        except OSError:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise
+        return future
+
+    def forget(self, future):
+        '''stops waiting for the response of a request, dropping it should it arrive'''
+        with self._lock:
+            for request_id, pending in self._pending.items():
+                if pending is future:
+                    del self._pending[request_id]
+                    return
+
+    def close(self):
+        self.open = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _read(self):
+        try:
+            with self.sock.makefile('rb') as stream:
+                while True:
+                    frame = read_frame(stream)
+                    if frame is None:
+                        break
+                    request_id, body = frame
+                    with self._lock:
+                        future = self._pending.pop(request_id, None)
+                    if future is not None:
+                        _complete(future, json.loads(body.decode('utf-8')))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self.open = False
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError('connection to the command server was lost'))
+
+
+def _complete(future, response):
+    if 'error' in response:
+        error = response['error']
+        future.set_exception(RemoteCommandError(error['type'], error['message'], error.get('code')))
+    else:
+        future.set_result(response['result'])
@@ -0,0 +1,167 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Single flight coalescing of concurrent command runs. While a single flight command is
+running, other runs of it with equal validated args wait for that run and share its result
+or exception rather than executing the command again. Unlike memoization nothing is kept
+once the run completes. Runs that join another wait no longer than their own deadline.
+'''
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from concurrent.futures import wait
+
+from decree.command import RunWrapper
+from decree.command import add_run_wrapper
+from decree.deadlines import remaining
+from decree.exceptions import DeadlineExceeded
+from decree.memo import args_key
+
+
+def single_flight(command_class):
+    '''
+    class decorator that coalesces concurrent runs of a command with equal args
+
+        @single_flight
+        class FetchPrices(Command):
+            ...
+
+    Works for both Commands run from threads and AsyncCommands run from asyncio tasks, the
+    in flight runs are available as the flights attribute of the command class. Like the
+    other decorators that wrap runs, such as memoize and journaled, it wraps the runs of any
+    applied before it.
+    '''
+    command_class.flights = Flights()
+    add_run_wrapper(command_class, command_class.flights)
+    return command_class
+
+
+class Flights(RunWrapper):
+    '''
+    the in flight runs of a single flight command keyed by their args, along with counts of
+    the runs that executed the command and those that joined another run. Wraps the runs of
+    the command, only proceeding with those that lead a flight.
+    '''
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+
+        self._flights = {}
+        self._getters = {}
+        self._lock = threading.Lock()
+
+    def run(self, command, proceed):
+        key = self.key(command)
+        if key is None:
+            return proceed()
+
+        flight, leader = self.join(key, Future)
+        if not leader:
+            if not wait([flight], timeout=remaining()).done:
+                raise DeadlineExceeded()
+            return flight.result()
+
+        try:
+            result = proceed()
+        except BaseException as e:
+            self.land(key)
+            flight.set_exception(e)
+            raise
+        self.land(key)
+        flight.set_result(result)
+        return result
+
+    async def run_async(self, command, proceed):
+        key = self.key(command)
+        if key is None:
+            return await proceed()
+
+        loop = asyncio.get_running_loop()
+        key = (loop, key)
+        flight, leader = self.join(key, loop.create_future)
+        if not leader:
+            # shielded so that a follower timing out or being cancelled leaves the flight be,
+            # the shield is cancelled or its result read so that its exception is retrieved
+            shielded = asyncio.shield(flight)
+            done, _ = await asyncio.wait([shielded], timeout=remaining())
+            if not done:
+                shielded.cancel()
+                raise DeadlineExceeded()
+            return shielded.result()
+
+        try:
+            result = await proceed()
+        except asyncio.CancelledError:
+            self.land(key)
+            flight.cancel()
+            raise
+        except BaseException as e:
+            self.land(key)
+            flight.set_exception(e)
+            # retrieved here so that flights nobody joined are not logged as unhandled
+            flight.exception()
+            raise
+        self.land(key)
+        flight.set_result(result)
+        return result
+
+    def key(self, command):
+        return args_key(command, self._getters)
+
+    def join(self, key, create_flight):
+        '''
+        joins the flight for the key, starting one if there is none
+
+        Args:
+            key: the key of the args of the run
+            create_flight: callable creating the future of a new flight
+        Returns:
+            a tuple of the flight's future and whether the caller started it and so must
+            execute the command and complete the future
+        '''
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = create_flight()
+            self.leaders += 1
+            return flight, True
+
+    def land(self, key):
+        '''ends the flight for the key so that later runs execute the command again'''
+        with self._lock:
+            del self._flights[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+            }
+
+    def __len__(self):
+        return len(self._flights)
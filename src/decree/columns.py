@@ -0,0 +1,172 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Validates and runs commands over columns of arguments, one sequence or numpy array of values
+per argument name. Each column is validated once as a whole rather than value by value,
+numpy arrays are checked by their dtype alone. numpy is optional, install decree[numpy] to
+validate numpy arrays.
+'''
+
+from decree.command import BatchResult
+from decree.command import run_recorder
+from decree.deadlines import check_deadline
+from decree.exceptions import MissingRequiredError
+from decree.exceptions import NotNoneError
+from decree.exceptions import UnexpectedTypeError
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+def run_columns(command_class, columns):
+    '''
+    validates the columns of args for the command and then runs it. Commands that set
+    columnar are run once with each arg set to its whole column, otherwise the command is run
+    once per row with each arg set to that row's value.
+
+    Args:
+        command_class: the command to run
+        columns: mapping of arg name to a sequence or numpy array of values for that arg
+    Returns:
+        the result of the command for columnar commands, otherwise a BatchResult holding
+        the result of each row
+    '''
+    if hasattr(command_class, 'run_instance_async'):
+        raise TypeError('{} is asynchronous and cannot be run over columns'.format(command_class.__name__))
+    validated, _ = validate_columns(command_class, columns)
+    if command_class.columnar:
+        return command_class.from_validated_args(validated).run_validated()
+    return _run_rows(command_class, validated)
+
+
+def validate_columns(command_class, columns):
+    '''
+    validates each column of args with the command's validators, broadcasting the default
+    of any missing column that has one. All the columns must be of the same length.
+
+    Returns:
+        a tuple of the validated columns, keyed by arg name, and the number of rows
+    '''
+    length = _column_length(command_class, columns)
+    validated = {}
+    for validator in command_class.validators.values():
+        name = validator.name
+        if name in columns:
+            validated[name] = validate_column(validator, columns[name])
+        elif validator.default:
+            validated[name] = [validator.default] * length
+        else:
+            raise MissingRequiredError(name)
+    return validated, length
+
+
+def validate_column(validator, column):
+    '''
+    validates a column of values for a single arg. Arrays with a numeric, boolean or string
+    dtype are checked against the kinds of dtype the validator accepts, other columns are
+    checked once for each distinct type of value in them rather than once per value.
+    '''
+    if not getattr(validator, 'inlinable', False):
+        return [validator.validate({validator.name: value}) for value in column]
+
+    if not (validator.allow_none or _all_present(column)):
+        raise NotNoneError(validator.name)
+
+    dtype = getattr(column, 'dtype', None)
+    if dtype is not None and dtype.kind != 'O':
+        if dtype.kind not in (validator.dtype_kinds or ''):
+            raise UnexpectedTypeError(validator.name, validator.type_name(), str(dtype))
+        return column
+
+    matcher = validator.type_matcher()
+    for value_type in set(map(type, column)):
+        if value_type is not matcher.expected and not matcher.matches(value_type):
+            raise UnexpectedTypeError(validator.name, validator.type_name(), value_type.__name__)
+    if validator.has_contents:
+        return [validator.validate_contents(value) for value in column]
+    return column
+
+
+def _all_present(column):
+    '''the vectorized equivalent of checking every value of a column that may not be None'''
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return numpy.count_nonzero(column) == column.size
+    return all(column)
+
+
+def _column_length(command_class, columns):
+    lengths = set(len(columns[validator.name]) for validator in command_class.validators.values()
+                  if validator.name in columns)
+    if len(lengths) > 1:
+        raise ValueError('columns must all be of the same length, found lengths {}'.format(
+            sorted(lengths)))
+    if not lengths:
+        raise ValueError('at least one column of args is required')
+    return lengths.pop()
+
+
+def _run_rows(command_class, validated):
+    '''runs the command once per row of the validated columns'''
+    names = list(validated)
+    columns = [_native(validated[name]) for name in names]
+    from_validated_args = command_class.from_validated_args
+    validate = command_class.validate
+    execute = command_class.execute
+    hooked = bool(command_class.run_wrappers) or run_recorder() is not None
+    pool = command_class.instance_pool
+    if pool is not None:
+        pool = pool.for_class(command_class)
+
+    batch = BatchResult()
+    results = batch.results
+    errors = batch.errors
+    for index, row in enumerate(zip(*columns)):
+        if pool is None:
+            instance = from_validated_args(dict(zip(names, row)))
+        else:
+            instance = pool.acquire()
+            instance.set_validated_args(dict(zip(names, row)))
+        try:
+            if hooked:
+                results.append(instance.run_validated())
+            else:
+                check_deadline()
+                validate(instance)
+                check_deadline()
+                results.append(execute(instance))
+        except Exception as e:
+            results.append(None)
+            errors[index] = e
+            continue
+        if pool is not None:
+            pool.release(instance)
+    return batch
+
+
+def _native(column):
+    '''converts numpy columns to lists so that each row holds native python values'''
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return column.tolist()
+    return column
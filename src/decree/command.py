@@ -25,24 +25,137 @@ SOFTWARE.
 Defines the base Command object which is the core of Interact.
 '''
 
+import functools
+import keyword
+import threading
+import types
+import weakref
+from collections import ChainMap
+from collections.abc import Mapping
+from time import perf_counter_ns
+
+from decree.checks import CheckResult
+from decree.compiler import compile_arg_check
+from decree.compiler import compile_arg_validation
+from decree.compiler import lazy_arg_descriptors
+from decree.compiler import replaceable
+from decree.deadlines import check_deadline
+from decree.deadlines import deadline
+from decree.exceptions import AmbiguousCommandError
+from decree.exceptions import UnknownCommandError
+
 
 class CommandArgDefiner(type):
     '''
     metaclass invoked every time Command is subclassed, calling the subclasses' command_args
     function to define its arguments. Each command inherits its parent commands argument validators
     which it can override if it wishes. The full set of validators is stored in the command
-    class and called each time the command is executed
+    class and compiled into a single validation function that is called each time the command
+    is executed. The validation function is regenerated for every subclass so that any
+    arguments it redefines are picked up.
+
+    The validators of a command are held in a ChainMap layered over those of its parent so
+    that only the args a command defines itself are stored with it. Commands that set
+    defer_args have their command_args called when they are first run rather than when they
+    are defined, finalize_all can be used to define the args of all such commands at once.
+
+    Every command, other than those that set command_base in their body, is also registered
+    by name so that it can be looked up and run from a payload naming it, see lookup_command
+    and dispatch.
     '''
+    def __new__(mcs, name, bases, clsdict):
+        if not clsdict.get('slotted_args', any(getattr(base, 'slotted_args', False) for base in bases)):
+            return super(CommandArgDefiner, mcs).__new__(mcs, name, bases, clsdict)
+
+        validators = _collect_args(name, bases, clsdict)
+        clsdict = dict(clsdict)
+        clsdict['__slots__'] = _declared_slots(clsdict) + _arg_slots(bases, clsdict, validators)
+        cls = super(CommandArgDefiner, mcs).__new__(mcs, name, bases, clsdict)
+        cls._collected_validators = validators
+        return cls
+
     def __init__(cls, name, bases, clsdict):
         super(CommandArgDefiner, cls).__init__(name, bases, clsdict)
+        cls.command_base = clsdict.get('command_base', False)
+        if cls.command_base:
+            cls.command_name = None
+        else:
+            cls._register(clsdict.get('command_name') or name)
+
+        if cls.lazy_args and cls.slotted_args:
+            raise TypeError('{} cannot have both lazy_args and slotted_args'.format(name))
+
+        if cls.defer_args and not cls.slotted_args:
+            cls._args_pending = True
+            cls.validators = _PendingValidators(cls)
+            if getattr(cls._validate_args, 'replaceable', False):
+                cls._validate_args = _finalize_and_validate_args
+            _pending.add(cls)
+        else:
+            cls._args_pending = False
+            cls._finalize_args()
+
+    def finalize_args(cls):
+        '''
+        defines the args of a command whose definition was deferred, does nothing if they
+        have already been defined
+        '''
+        if cls._args_pending:
+            with _finalize_lock:
+                if cls._args_pending:
+                    cls._finalize_args()
+                    cls._args_pending = False
+                    _pending.discard(cls)
+
+    def _finalize_args(cls):
+        # the args of slotted commands were collected to declare their slots
+        collected = cls.__dict__.get('_collected_validators')
+        if collected is None:
+            cls._define_args(cls.__bases__)
+        else:
+            del cls._collected_validators
+            cls.validators = collected
+
+        cls.keeps_raw_args = cls.keep_raw_args if cls.keep_raw_args is not None else not cls.slotted_args
+        if not cls.slotted_args and not cls.__dictoffset__:
+            # only the base Command, it has no instance dict and no slot to keep them in
+            cls.keeps_raw_args = False
 
-        cls.validators = {}
+        if cls.lazy_args:
+            cls.keeps_raw_args = True
+            for arg_name, descriptor in lazy_arg_descriptors(cls).items():
+                setattr(cls, arg_name, descriptor)
+
+        # the instance attributes cleared by reset_args
+        cls._run_attributes = tuple(cls.validators) + (('raw_args',) if cls.keeps_raw_args else ())
+
+        if getattr(cls._validate_args, 'replaceable', False):
+            if cls.compile_args:
+                cls._validate_args = compile_arg_validation(cls)
+            else:
+                cls._validate_args = cls._interpret_args
+
+    def _register(cls, command_name):
+        if cls.command_namespace:
+            command_name = '{}.{}'.format(cls.command_namespace, command_name)
+        cls.command_name = command_name
+
+        # registered by its module and qualified name too, which no other command shares. A
+        # command redefined, as when its module is reloaded, replaces its earlier definition
+        defined_at = _defined_at(cls)
+        for name in (command_name, '.'.join(defined_at)):
+            _registry.setdefault(name, weakref.WeakValueDictionary())[defined_at] = cls
+
+    def _define_args(cls, bases):
+        cls.validators = ChainMap()
 
         # get the validators from the first command found in the hierachy
         # if present they will also contain the validators from its parent
         for base in bases:
-            if base.validators:
-                cls.validators = base.validators.copy()
+            if isinstance(base, CommandArgDefiner):
+                base.finalize_args()
+            if getattr(base, 'validators', None):
+                cls.validators = base.validators.new_child()
                 break
 
         try:
@@ -52,10 +165,392 @@ class CommandArgDefiner(type):
             cls.defining_args = False
 
 
+def _defined_at(command_class):
+    return command_class.__module__, command_class.__qualname__
+
+
+def _collect_args(name, bases, clsdict):
+    '''
+    the validators of a slotted command, which are needed to declare its slots before the
+    class can be created. Its command_args is run against a stand-in for the class so that
+    the class is only created once.
+    '''
+    collector = _ArgCollector(name, bases, clsdict)
+    CommandArgDefiner._define_args(collector, bases)
+    return collector.validators
+
+
+def _arg_slots(bases, clsdict, validators):
+    '''the slots needed to store the args of a slotted command'''
+    names = list(validators)
+    if clsdict.get('keep_raw_args', _inherited(bases, 'keep_raw_args')):
+        names.append('raw_args')
+
+    slots = []
+    for arg_name in names:
+        if not arg_name.isidentifier():
+            raise ValueError("Slotted command args must be identifiers, '{}' is not".format(arg_name))
+        if keyword.iskeyword(arg_name):
+            raise ValueError("Slotted command args cannot be keywords, '{}' is one".format(arg_name))
+        if not any(isinstance(getattr(base, arg_name, None), types.MemberDescriptorType) for base in bases):
+            slots.append(arg_name)
+    return tuple(slots)
+
+
+def _inherited(bases, name):
+    for klass in _linearize(bases):
+        if name in klass.__dict__:
+            return klass.__dict__[name]
+    return None
+
+
+def _linearize(bases):
+    '''the method resolution order of a class with the bases, less the class itself'''
+    sequences = [list(base.__mro__) for base in bases] + [list(bases)]
+    mro = []
+    while True:
+        sequences = [sequence for sequence in sequences if sequence]
+        if not sequences:
+            return mro
+        for sequence in sequences:
+            head = sequence[0]
+            if not any(head in other[1:] for other in sequences):
+                break
+        else:
+            raise TypeError('Cannot create a consistent method resolution order for bases {}'.format(bases))
+        mro.append(head)
+        for sequence in sequences:
+            if sequence[0] is head:
+                del sequence[0]
+
+
+class _ArgCollector():
+    '''
+    stands in for a slotted command class while its command_args is run, resolving attributes
+    from the body of the class and then its bases as the class itself would
+    '''
+
+    def __init__(self, name, bases, clsdict):
+        self.__name__ = name
+        self._namespaces = [clsdict] + [klass.__dict__ for klass in _linearize(bases)]
+
+    def __getattr__(self, name):
+        for namespace in self._namespaces:
+            if name in namespace:
+                attr = namespace[name]
+                get = getattr(type(attr), '__get__', None)
+                return attr if get is None else get(attr, None, self)
+        raise AttributeError(name)
+
+
+_pending = weakref.WeakSet()
+_finalize_lock = threading.RLock()
+# the commands registered with each name, keyed by the module and qualified name of each
+_registry = {}
+
+
+def lookup_command(command_name):
+    '''
+    the command class registered with the name, including its namespace if it has one, or
+    with the module and qualified name of its class. Raises an UnknownCommandError if there
+    is none and an AmbiguousCommandError if several commands are registered with the name.
+    '''
+    registered = _registry.get(command_name)
+    command_classes = list(registered.values()) if registered is not None else []
+    if len(command_classes) == 1:
+        return command_classes[0]
+    if not command_classes:
+        raise UnknownCommandError(command_name)
+    raise AmbiguousCommandError(command_name, sorted('.'.join(_defined_at(command_class))
+                                                     for command_class in command_classes))
+
+
+def registered_commands():
+    '''
+    a dict of the currently registered command classes keyed by each name they can be looked
+    up by, names shared by several commands are left out
+    '''
+    commands = {}
+    for command_name, registered in list(_registry.items()):
+        command_classes = list(registered.values())
+        if len(command_classes) == 1:
+            commands[command_name] = command_classes[0]
+    return commands
+
+
+def dispatch(payload):
+    '''
+    runs the command named by a payload with the args it holds
+
+    Args:
+        payload: a mapping holding the registered name of the command as 'command' and
+            optionally a mapping of its args as 'args'
+    Returns:
+        the result of the command
+    '''
+    return lookup_command(payload['command']).run(**payload.get('args') or {})
+
+
+def finalize_all():
+    '''
+    defines the args of every command whose definition has been deferred, for services that
+    would rather pay the cost of defining them up front than on their first run
+    '''
+    for command_class in list(_pending):
+        command_class.finalize_args()
+
+
+class _PendingValidators(Mapping):
+    '''
+    stands in for the validators of a command whose args have not yet been defined, defining
+    them when first used
+    '''
+
+    def __init__(self, command_class):
+        self.command_class = command_class
+
+    def _resolve(self):
+        self.command_class.finalize_args()
+        return self.command_class.validators
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __len__(self):
+        return len(self._resolve())
+
+
+@replaceable
+def _finalize_and_validate_args(self, command_args):
+    '''validation method of commands with deferred args, replaced once the args are defined'''
+    command_class = type(self)
+    command_class.finalize_args()
+    return command_class._validate_args(self, command_args)
+
+
+def _interpret_check(command_class, command_args):
+    '''checks the args of a command with each of its validators in turn'''
+    values = {}
+    errors = []
+    for validator in command_class.validators.values():
+        result = validator.check(command_args)
+        if result.error is None:
+            values[validator.name] = result.value
+        else:
+            errors.append(result.error)
+    return values, errors
+
+
+def _declared_slots(clsdict):
+    slots = clsdict.get('__slots__', ())
+    if isinstance(slots, str):
+        return (slots,)
+    return tuple(slots)
+
+
+class BatchResult():
+    '''
+    Outcome of running a command for a batch of args. Results are held in the order the args
+    were supplied with None in place of any invocation that failed, the exception raised by
+    each failure is held in errors keyed by its index in the batch.
+    '''
+
+    def __init__(self):
+        self.results = []
+        self.errors = {}
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+class RunWrapper():
+    '''
+    Wraps the runs of a command once its args have been validated, see add_run_wrapper.
+    Subclasses override run, and run_async to wrap the runs of AsyncCommands, calling
+    proceed to carry on with the run, which calls the next wrapper in or validates and
+    executes the command, unless they return a result without running it.
+    '''
+
+    # the coroutine function wrapping the runs of asynchronous commands, None if the
+    # wrapper cannot wrap them
+    run_async = None
+
+    def run(self, command, proceed):
+        '''
+        Args:
+            command: the instance being run, its args validated
+            proceed: callable with no args carrying on with the run and returning its result
+        Returns:
+            the result of the run
+        '''
+        return proceed()
+
+
+def add_run_wrapper(command_class, wrapper):
+    '''
+    wraps every run of the command in the wrapper, outside any wrappers added before it.
+    A command can only be wrapped by a single wrapper of each type, though a wrapper it
+    inherits from its parent is replaced by one of the same type added to it.
+
+    Args:
+        command_class: the command whose runs are wrapped, and those of its subclasses
+        wrapper: the RunWrapper
+    '''
+    if hasattr(command_class, 'run_instance_async') and wrapper.run_async is None:
+        raise TypeError('{} cannot wrap the asynchronous command {}'.format(
+            type(wrapper).__name__, command_class.__name__))
+
+    inherited = [wrapped for base in command_class.__mro__[1:] for wrapped in getattr(base, 'run_wrappers', ())]
+    wrappers = []
+    for wrapped in command_class.run_wrappers:
+        if type(wrapped) is type(wrapper):
+            if not any(wrapped is base_wrapper for base_wrapper in inherited):
+                raise TypeError('{} is already wrapped by a {}'.format(
+                    command_class.__name__, type(wrapper).__name__))
+            continue
+        wrappers.append(wrapped)
+    command_class.run_wrappers = tuple(wrappers) + (wrapper,)
+
+
+_recorder = None
+
+
+def set_run_recorder(recorder):
+    '''
+    sets the callable that every command run is reported to, or None for no recorder, see
+    decree.metrics. It is called with the command class, a dict holding the duration in
+    nanoseconds of each phase of the run that completed, 'args', 'validate' and 'execute',
+    and the exception that ended the run or None.
+    '''
+    global _recorder
+    _recorder = recorder
+
+
+def run_recorder():
+    '''the callable every command run is reported to, None if there is none'''
+    return _recorder
+
+
+def _run_hooked(command, command_args, terminal):
+    '''
+    runs a command through its wrappers, reporting the run to the recorder if there is one.
+    The args are validated first unless command_args is None, when they were already set,
+    and the run then ends with the terminal, which validates and executes the command or
+    just executes it.
+    '''
+    recorder = _recorder
+    if recorder is None:
+        if command_args is not None:
+            check_deadline()
+            command._validate_args(command_args)
+        return _run_wrapped(command, terminal, None)
+
+    durations = {}
+    try:
+        if command_args is not None:
+            start = perf_counter_ns()
+            check_deadline()
+            command._validate_args(command_args)
+            durations['args'] = perf_counter_ns() - start
+        result = _run_wrapped(command, terminal, durations)
+    except Exception as e:
+        recorder(type(command), durations, e)
+        raise
+    recorder(type(command), durations, None)
+    return result
+
+
+def _run_wrapped(command, terminal, durations):
+    proceed = functools.partial(terminal, command, durations)
+    for wrapper in command.run_wrappers:
+        proceed = functools.partial(wrapper.run, command, proceed)
+    return proceed()
+
+
+def _validate_and_execute(command, durations=None):
+    if durations is None:
+        command.validate()
+        check_deadline()
+        return command.execute()
+
+    start = perf_counter_ns()
+    command.validate()
+    validated = perf_counter_ns()
+    durations['validate'] = validated - start
+    check_deadline()
+    result = command.execute()
+    durations['execute'] = perf_counter_ns() - validated
+    return result
+
+
+def _execute(command, durations=None):
+    check_deadline()
+    if durations is None:
+        return command.execute()
+
+    start = perf_counter_ns()
+    result = command.execute()
+    durations['execute'] = perf_counter_ns() - start
+    return result
+
+
 class Command(metaclass=CommandArgDefiner):
     '''
     Base Command object.
     '''
+
+    __slots__ = ()
+
+    # when True the command's args are stored in slots generated from its validators rather
+    # than in an instance dict. Commands with slotted args, and all their bases, must not rely
+    # on an instance dict so any other instance attributes need to be declared in __slots__
+    slotted_args = False
+
+    # when True command_args is called the first time the command is run rather than when it
+    # is defined, see finalize_all. Ignored for commands with slotted_args
+    defer_args = False
+
+    # when True only the presence of required args is checked when the command is run, the
+    # rest of each arg's validation is deferred until it is first read from the instance.
+    # Useful for commands with many optional args of which execute only reads a few
+    lazy_args = False
+
+    # whether the raw command args are kept as raw_args on the instance, by default they are
+    # kept unless the command has slotted args
+    keep_raw_args = None
+
+    # when False the command's validators are iterated each time it is run rather than
+    # being compiled into a single validation function, which can be useful when debugging
+    compile_args = True
+
+    # when True run_columns executes the command once with each arg set to its whole column
+    # of values rather than once per row
+    columnar = False
+
+    # the name the command is registered under, which defaults to its class name and is not
+    # inherited. It is prefixed with the command's namespace, which is inherited, if it has
+    # one. Commands defined in different modules may share a name, looking the name up then
+    # raises an AmbiguousCommandError and each can be looked up by its module and qualified
+    # name instead. Redefining a command replaces it
+    command_name = None
+    command_namespace = None
+
+    # when True the command is a base for other commands rather than a command itself and
+    # is not registered. It is not inherited
+    command_base = True
+
+    # the RunWrappers every run of the command passes through, innermost first, see
+    # add_run_wrapper. Inherited by subclasses
+    run_wrappers = ()
+
+    # the InstancePool runs take their instances from rather than creating them, see
+    # decree.pool. Subclasses of a pooled command are given pools of their own
+    instance_pool = None
+
     @classmethod
     def command_args(cmd):
         '''
@@ -81,32 +576,250 @@ class Command(metaclass=CommandArgDefiner):
         Args:
          command_args: arbitrary keyword args which get validated by name
         '''
+        pool = cls.instance_pool
+        if pool is not None:
+            return pool.run(cls, command_args)
         instance = cls()
         return instance.run_instance(**command_args)
 
+    @classmethod
+    def run_within(cls, timeout, /, **command_args):
+        '''
+        runs the command with a deadline timeout seconds from now, which also applies to any
+        commands it runs in turn, see decree.deadlines. A deadline already set by an outer
+        command is kept if it is sooner.
+
+        Args:
+         timeout: the number of seconds the command has to complete
+         command_args: arbitrary keyword args which get validated by name
+        '''
+        with deadline(timeout=timeout):
+            return cls.run(**command_args)
+
+    @classmethod
+    def run_until(cls, at, /, **command_args):
+        '''
+        runs the command with a deadline given as a time of the monotonic clock, see run_within
+        '''
+        with deadline(at=at):
+            return cls.run(**command_args)
+
+    @classmethod
+    def check(cls, **command_args):
+        '''
+        checks the args of the command without running it or raising. Every arg is checked
+        so all of the errors are collected at once and their messages are only formatted if
+        they are read. The command's validate method is not called.
+
+        Args:
+         command_args: arbitrary keyword args which get validated by name
+        Returns:
+         a CheckResult holding the validated values and the ArgErrors found
+        '''
+        cls.finalize_args()
+        if '_check_args' not in cls.__dict__:
+            if cls.compile_args:
+                cls._check_args = staticmethod(compile_arg_check(cls))
+            else:
+                cls._check_args = staticmethod(functools.partial(_interpret_check, cls))
+        return CheckResult(*cls._check_args(command_args))
+
+    @classmethod
+    def prepare(cls, **command_args):
+        '''
+        creates an instance of the command ready to execute, validating the arguments and
+        calling the overridden validate method. Used to vet a command's args up front when it
+        is to be executed elsewhere.
+
+        Args:
+         command_args: arbitrary keyword args which get validated by name
+        Returns:
+         the validated command instance
+        '''
+        instance = cls()
+        instance._validate_args(command_args)
+        instance.validate()
+        return instance
+
+    @classmethod
+    def from_validated_args(cls, validated_args):
+        '''
+        creates an instance of the command from args that have already been validated,
+        for instance by the validated_args of another instance, without validating them again.
+
+        Args:
+         validated_args: dict of arg name to validated value
+        '''
+        cls.finalize_args()
+        instance = cls()
+        instance.set_validated_args(validated_args)
+        return instance
+
+    @classmethod
+    def run_many(cls, command_args_batch, stop_on_error=False):
+        '''
+        runs the command once for each set of args in the batch. The per class work of
+        running a command is done once for the whole batch and a failing invocation does not
+        abort the batch, its exception is recorded in the returned BatchResult instead.
+
+        Args:
+         command_args_batch: an iterable of dicts of command args, consumed lazily
+         stop_on_error: if True the batch stops at the first invocation that fails
+        Returns:
+         a BatchResult holding the results and errors of each invocation
+        '''
+        cls.finalize_args()
+        validate_args = cls._validate_args
+        validate = cls.validate
+        execute = cls.execute
+        hooked = bool(cls.run_wrappers) or _recorder is not None
+        pool = cls.instance_pool
+        if pool is not None:
+            pool = pool.for_class(cls)
+
+        batch = BatchResult()
+        results = batch.results
+        errors = batch.errors
+        for index, command_args in enumerate(command_args_batch):
+            instance = cls() if pool is None else pool.acquire()
+            try:
+                if hooked:
+                    results.append(_run_hooked(instance, command_args, _validate_and_execute))
+                else:
+                    check_deadline()
+                    validate_args(instance, command_args)
+                    validate(instance)
+                    check_deadline()
+                    results.append(execute(instance))
+            except Exception as e:
+                results.append(None)
+                errors[index] = e
+                if stop_on_error:
+                    break
+                continue
+            if pool is not None:
+                pool.release(instance)
+        return batch
+
+    @classmethod
+    def run_columns(cls, columns):
+        '''
+        validates and runs the command for columns of args, a sequence or numpy array of
+        values per arg name. Each column is validated once rather than value by value and any
+        missing column with a default is filled with it. Commands that set columnar are run
+        once with whole columns as their args, others are run once per row.
+
+        Args:
+         columns: mapping of arg name to the column of values for that arg
+        Returns:
+         the result of execute for columnar commands, otherwise a BatchResult for the rows
+        '''
+        from decree.columns import run_columns
+        return run_columns(cls, columns)
+
+    @classmethod
+    def ingest(cls, source, **options):
+        '''
+        runs the command over the rows of a csv file, converting the text of each field to
+        the type of its arg. See decree.ingest.ingest for the options.
+
+        Args:
+         source: path to the file or a file object open for reading text
+        Returns:
+         an iterator over the IngestedChunk of each chunk of rows
+        '''
+        from decree.ingest import ingest
+        return ingest(cls, source, **options)
+
     def run_instance(self, **command_args):
         '''
         runs an instance of a command, validating the arguments and calling
-        the overridden execute method.
+        the overridden execute method. Raises DeadlineExceeded rather than validating or
+        executing the command once the deadline of the current context has passed.
 
         Args:
          command_args: arbitrary keyword args which get validated by name
         '''
+        if self.run_wrappers or _recorder is not None:
+            return _run_hooked(self, command_args, _validate_and_execute)
+        check_deadline()
         self._validate_args(command_args)
         self.validate()
+        check_deadline()
         return self.execute()
 
-    def _validate_args(self, command_args):
+    def run_validated(self):
+        '''
+        runs an instance whose args are already set, as by from_validated_args, calling the
+        overridden validate and execute methods through the command's wrappers
+        '''
+        return _run_hooked(self, None, _validate_and_execute)
+
+    def run_prepared(self):
+        '''
+        executes an instance created by prepare through the command's wrappers, for those
+        executing prepared commands such as decree.executor
+        '''
+        return _run_hooked(self, None, _execute)
+
+    @replaceable
+    def _interpret_args(self, command_args):
         '''
         Iterates each of the validators defined during the command's command_args method.
         It uses them to vet the keyword command_args supplied to run. As each argument is
         vetted its is added as an attribute on the command instance so that it is easily accessible
-        during the command execution.
+        during the command execution. Unless compile_args is disabled this is replaced by a
+        compiled equivalent when the command class is defined.
         '''
-        self.raw_args = command_args
+        if self.keeps_raw_args:
+            self.raw_args = command_args
         for validator in self.__class__.validators.values():
             validated_arg = validator.validate(command_args)
-            self.__dict__[validator.name] = validated_arg
+            if self.slotted_args:
+                setattr(self, validator.name, validated_arg)
+            else:
+                self.__dict__[validator.name] = validated_arg
+
+    _validate_args = _interpret_args
+
+    def set_validated_args(self, validated_args):
+        '''
+        sets args that have already been validated on the instance without validating them
+        again, see from_validated_args
+
+        Args:
+         validated_args: dict of arg name to validated value
+        '''
+        if self.keeps_raw_args:
+            self.raw_args = validated_args
+        if self.slotted_args:
+            for name, value in validated_args.items():
+                setattr(self, name, value)
+        else:
+            self.__dict__.update(validated_args)
+
+    def reset_args(self):
+        '''
+        clears the validated args and raw_args of the instance so that it can be run again,
+        see decree.pool. Any other state of the instance is kept, commands that keep state
+        from a run on their instances should extend this to clear it too.
+        '''
+        if not self.slotted_args:
+            pop = self.__dict__.pop
+            for name in self._run_attributes:
+                pop(name, None)
+            return
+        for name in self._run_attributes:
+            try:
+                delattr(self, name)
+            except AttributeError:
+                pass
+
+    def validated_args(self):
+        '''
+        the validated value of each of the command's args keyed by arg name
+        '''
+        return {name: getattr(self, name) for name in self.__class__.validators}
 
     def validate(self):
         '''
@@ -0,0 +1,423 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Compiles the validators of a command into a single specialized validation function.
+Rather than looping over each validator every time the command is run, the checks of
+every argument are written out in straight-line python source when the command class
+is defined and compiled once.
+'''
+
+import functools
+import itertools
+
+from decree.checks import ArgError
+from decree.exceptions import MissingRequiredError
+from decree.exceptions import NotNoneError
+from decree.exceptions import UnexpectedTypeError
+from decree.exceptions import ValidationError
+
+
+class _Missing():
+    '''sentinel marking an argument absent from the supplied command args'''
+
+    def __repr__(self):
+        return '<missing>'
+
+
+MISSING = _Missing()
+
+
+def replaceable(method):
+    '''
+    marks an arg validation method as one that may be replaced by a compiled version
+    when a command class is defined. Methods overridden by a command are left untouched.
+    '''
+    method.replaceable = True
+    return method
+
+
+def compile_arg_validation(command_class):
+    '''
+    generates the validation function for a command class from its full set of validators.
+    The generated function behaves exactly as iterating each validator in turn but inlines
+    the presence, default, None and type checks of each argument, calling validate_contents
+    for validators that check the contents of their values. Validators that customise
+    their validation are called as normal from the generated function.
+
+    Args:
+        command_class: the command class whose validators should be compiled
+    Returns:
+        a function suitable for use as the command's _validate_args method
+    '''
+    namespace = _namespace()
+    lines = ['def _validate_args(self, command_args):']
+    if command_class.keeps_raw_args:
+        lines.append('    self.raw_args = command_args')
+    if not command_class.slotted_args and command_class.validators:
+        lines.append('    store = self.__dict__')
+    lines.append('    get = command_args.get')
+
+    lazy = command_class.lazy_args
+    for index, validator in enumerate(command_class.validators.values()):
+        if lazy and _inline_matcher(validator) is not None:
+            lines.extend(_presence_source(validator))
+        else:
+            store = _store_source(validator, command_class.slotted_args)
+            lines.extend(_arg_source(validator, index, namespace, store, _RAISE))
+
+    validate_args = _define(command_class, '_validate_args', lines, namespace)
+    return replaceable(validate_args)
+
+
+def compile_arg_check(command_class):
+    '''
+    generates a function that checks the args of a command class without raising. It is
+    generated from the same source as the validation function but records an ArgError for
+    each invalid arg rather than raising, checking every arg so all errors are found at once.
+
+    Returns:
+        a function taking the dict of command args and returning a tuple of the dict of
+        validated values and the list of ArgErrors found
+    '''
+    namespace = _namespace()
+    lines = [
+        'def _check_args(command_args):',
+        '    store = {}',
+        '    errors = []',
+        '    get = command_args.get',
+    ]
+    for index, validator in enumerate(command_class.validators.values()):
+        store = _store_source(validator, False)
+        lines.extend(_arg_source(validator, index, namespace, store, _COLLECT))
+    lines.append('    return store, errors')
+    return _define(command_class, '_check_args', lines, namespace)
+
+
+def _namespace():
+    return {
+        'MISSING': MISSING,
+        'ArgError': ArgError,
+        'ValidationError': ValidationError,
+        'MissingRequiredError': MissingRequiredError,
+        'NotNoneError': NotNoneError,
+        'UnexpectedTypeError': UnexpectedTypeError,
+    }
+
+
+def _define(command_class, function_name, lines, namespace):
+    source = '\n'.join(lines) + '\n'
+    exec(_compile_source(source), namespace)
+
+    function = namespace[function_name]
+    function.__qualname__ = '{}.{}'.format(command_class.__qualname__, function_name)
+    function.source = source
+    return function
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_source(source):
+    '''
+    compiles generated validation source. The source refers to validators and types by
+    their position so commands that define args of the same names and kinds, as is common
+    across a catalog of commands, share the same source and are only compiled once.
+    '''
+    return compile(source, '<decree generated args>', 'exec')
+
+
+def compile_schema_validation(schema, name):
+    '''
+    generates the function validating the contents of a dict arg against its schema, a dict
+    of field name to the validator of that field. Nested schemas are written out inline so
+    that a whole payload is validated by a single function, fields are checked exactly as
+    args are and errors name the dotted path to the field, e.g. 'config.db.port'.
+
+    Args:
+        schema: dict of field name to the validator of that field
+        name: the name of the validated arg, the root of every path
+    Returns:
+        a function taking a dict and returning a copy of it with each field validated and
+        missing fields defaulted, fields not in the schema are kept as they are
+    '''
+    namespace = _namespace()
+    namespace['with_path'] = with_path
+    lines = ['def _validate_schema(value_0):']
+    _schema_source(schema, name, 0, namespace, lines, '    ', itertools.count())
+    lines.append('    return store_0')
+
+    source = '\n'.join(lines) + '\n'
+    exec(_compile_source(source), namespace)
+    function = namespace['_validate_schema']
+    function.source = source
+    return function
+
+
+def with_path(error, path, name):
+    '''
+    a copy of a validation error raised by the validator of a schema field naming the field
+    by its full path rather than by the validator's name. Errors whose first arg is not the
+    name of the field, or of one nested in it, are returned as they are.
+    '''
+    error_name = getattr(error, 'name', None)
+    if not error.args or error.args[0] != error_name or not isinstance(error_name, str):
+        return error
+    if error_name == name:
+        return type(error)(path, *error.args[1:])
+    if error_name.startswith(name + '.'):
+        return type(error)(path + error_name[len(name):], *error.args[1:])
+    return error
+
+
+def _schema_source(schema, path, depth, namespace, lines, indent, indexes):
+    '''generates the lines validating each field of a schema into the store of its depth'''
+    value = 'value_{}'.format(depth)
+    store = 'store_{}'.format(depth)
+    field_value = 'value_{}'.format(depth + 1)
+    lines.extend([
+        '{}get_{} = {}.get'.format(indent, depth, value),
+        '{}{} = dict({})'.format(indent, store, value),
+    ])
+
+    for key, field in schema.items():
+        index = next(indexes)
+        field_name = '{}.{}'.format(path, key)
+        field_path = repr(field_name)
+        target = '{}[{!r}]'.format(store, key)
+
+        matcher = _inline_matcher(field)
+        if matcher is None:
+            field_ref = 'field_{}'.format(index)
+            namespace[field_ref] = field
+            lines.extend(_with_path_source(indent, '{} = {}.validate({})'.format(target, field_ref, value),
+                                           field_path, field.name))
+            continue
+
+        lines.extend([
+            '{}{} = get_{}({!r}, MISSING)'.format(indent, field_value, depth, key),
+            '{}if {} is MISSING:'.format(indent, field_value),
+        ])
+        if field.default:
+            default_ref = 'default_{}'.format(index)
+            namespace[default_ref] = field.default
+            lines.append('{}    {} = {}'.format(indent, target, default_ref))
+        else:
+            lines.append('{}    raise MissingRequiredError({})'.format(indent, field_path))
+
+        if not field.allow_none:
+            lines.extend([
+                '{}elif not {}:'.format(indent, field_value),
+                '{}    raise NotNoneError({})'.format(indent, field_path),
+            ])
+
+        lines.extend([
+            '{}elif {}:'.format(indent, _type_mismatch_source(matcher, index, namespace, field_value)),
+            '{}    raise UnexpectedTypeError({}, {!r}, type({}).__name__)'.format(
+                indent, field_path, field.type_name(), field_value),
+            '{}else:'.format(indent),
+        ])
+        if getattr(field, 'schema', None):
+            _schema_source(field.schema, field_name, depth + 1, namespace, lines, indent + '    ', indexes)
+            lines.append('{}    {} = store_{}'.format(indent, target, depth + 1))
+        elif field.has_contents:
+            contents_ref = 'contents_{}'.format(index)
+            namespace[contents_ref] = field.validate_contents
+            lines.extend(_with_path_source(indent + '    ', '{} = {}({})'.format(
+                target, contents_ref, field_value), field_path, field.name))
+        else:
+            lines.append('{}    {} = {}'.format(indent, target, field_value))
+
+
+def _with_path_source(indent, statement, path, name):
+    return [
+        '{}try:'.format(indent),
+        '{}    {}'.format(indent, statement),
+        '{}except ValidationError as e:'.format(indent),
+        '{}    raise with_path(e, {}, {!r})'.format(indent, path, name),
+    ]
+
+
+def lazy_arg_descriptors(command_class):
+    '''
+    the LazyArg descriptors for the args of a command with lazy_args, keyed by arg name.
+    Validators that customise their validation are not deferred and have no descriptor.
+    '''
+    return {validator.name: LazyArg(validator) for validator in command_class.validators.values()
+            if _inline_matcher(validator) is not None}
+
+
+class LazyArg():
+    '''
+    descriptor that validates an arg of a command with lazy_args the first time it is read,
+    caching the validated value in the instance dict. The presence of the arg has already
+    been checked when the command was run so only its None, type and default handling are
+    deferred, raising the same ValidationErrors as they would have when run.
+    '''
+    __slots__ = ('name', 'validator')
+
+    def __init__(self, validator):
+        self.name = validator.name
+        self.validator = validator
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        store = instance.__dict__
+        try:
+            return store[self.name]
+        except KeyError:
+            value = store[self.name] = self.validator.validate(instance.raw_args)
+            return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+    def __delete__(self, instance):
+        del instance.__dict__[self.name]
+
+
+def _presence_source(validator):
+    '''generates the eager presence check of a lazily validated argument'''
+    if validator.default:
+        return []
+    name = repr(validator.name)
+    return [
+        '    if {} not in command_args:'.format(name),
+        '        raise MissingRequiredError({})'.format(name),
+    ]
+
+
+def _store_source(validator, slotted):
+    '''the target an argument's value is stored to, its slot or its key in the instance dict'''
+    if slotted:
+        return 'self.{}'.format(validator.name)
+    return 'store[{!r}]'.format(validator.name)
+
+
+class _Raising():
+    '''generates the failure handling of validation functions, raising the error'''
+
+    def fail(self, error_class, error_args):
+        return 'raise {}({})'.format(error_class, error_args)
+
+    def call(self, store, validator_ref):
+        return ['    {} = {}.validate(command_args)'.format(store, validator_ref)]
+
+    def contents(self, store, contents_ref):
+        return ['        {} = {}(value)'.format(store, contents_ref)]
+
+
+class _Collecting():
+    '''generates the failure handling of check functions, collecting the error'''
+
+    def fail(self, error_class, error_args):
+        return 'errors.append(ArgError({}, ({},)))'.format(error_class, error_args)
+
+    def call(self, store, validator_ref):
+        return [
+            '    try:',
+            '        {} = {}.validate(command_args)'.format(store, validator_ref),
+            '    except ValidationError as e:',
+            '        errors.append(ArgError.from_exception(e))',
+        ]
+
+    def contents(self, store, contents_ref):
+        return [
+            '        try:',
+            '            {} = {}(value)'.format(store, contents_ref),
+            '        except ValidationError as e:',
+            '            errors.append(ArgError.from_exception(e))',
+        ]
+
+
+_RAISE = _Raising()
+_COLLECT = _Collecting()
+
+
+def _arg_source(validator, index, namespace, store, failure):
+    '''generates the lines that validate and store a single argument'''
+    name = repr(validator.name)
+    validator_ref = 'validator_{}'.format(index)
+    namespace[validator_ref] = validator
+
+    matcher = _inline_matcher(validator)
+    if matcher is None:
+        return failure.call(store, validator_ref)
+
+    lines = [
+        '    value = get({}, MISSING)'.format(name),
+        '    if value is MISSING:',
+    ]
+    if validator.default:
+        default_ref = 'default_{}'.format(index)
+        namespace[default_ref] = validator.default
+        lines.append('        {} = {}'.format(store, default_ref))
+    else:
+        lines.append('        ' + failure.fail('MissingRequiredError', name))
+
+    if not validator.allow_none:
+        lines.extend([
+            '    elif not value:',
+            '        ' + failure.fail('NotNoneError', name),
+        ])
+
+    type_error_args = '{}, {!r}, type(value).__name__'.format(name, validator.type_name())
+    lines.extend([
+        '    elif {}:'.format(_type_mismatch_source(matcher, index, namespace)),
+        '        ' + failure.fail('UnexpectedTypeError', type_error_args),
+        '    else:',
+    ])
+    if validator.has_contents:
+        contents_ref = 'contents_{}'.format(index)
+        namespace[contents_ref] = validator.validate_contents
+        lines.extend(failure.contents(store, contents_ref))
+    else:
+        lines.append('        {} = value'.format(store))
+    return lines
+
+
+def _type_mismatch_source(matcher, index, namespace, value='value'):
+    '''
+    generates the condition that a present value is not of the expected type. The expected
+    type is compared by identity first and only types that differ from it are passed on to
+    the validator's cached matcher
+    '''
+    matches_ref = 'matches_{}'.format(index)
+    namespace[matches_ref] = matcher.matches
+    mismatch = 'not {}(type({}))'.format(matches_ref, value)
+    if matcher.expected is not None:
+        type_ref = 'type_{}'.format(index)
+        namespace[type_ref] = matcher.expected
+        mismatch = 'type({0}) is not {1} and {2}'.format(value, type_ref, mismatch)
+    return mismatch
+
+
+def _inline_matcher(validator):
+    '''
+    the type matcher to inline for the validator or None if the validator must be called
+    rather than inlined, either because it customises validation or cannot name its type
+    '''
+    if not getattr(validator, 'inlinable', False):
+        return None
+    try:
+        return validator.type_matcher()
+    except NotImplementedError:
+        return None
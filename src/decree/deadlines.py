@@ -0,0 +1,97 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Deadlines carried in the context of command runs. A deadline set around a command run
+applies to every command run within it, including those run from its execute method and
+from asyncio tasks it creates, so nested commands share the time budget of the outermost
+one. Commands are not started once the deadline has passed, raising DeadlineExceeded
+before their args are validated and again before they are executed. Long running execute
+methods can check the deadline themselves to cancel cooperatively.
+
+    with deadline(timeout=0.5):
+        Lookup.run(key=key)
+
+    def execute(self):
+        for chunk in self.chunks:
+            check_deadline()
+            ...
+'''
+
+import contextlib
+import contextvars
+from time import monotonic
+
+from decree.exceptions import DeadlineExceeded
+
+# the time by the monotonic clock by which the current command run must complete
+_deadline = contextvars.ContextVar('decree_deadline', default=None)
+
+
+@contextlib.contextmanager
+def deadline(timeout=None, at=None):
+    '''
+    sets the deadline of the command runs within the context. A deadline that is already
+    set is only ever tightened, never extended, by a nested one.
+
+    Args:
+        timeout: the number of seconds from now the deadline is
+        at: the deadline as a time of the monotonic clock, an alternative to timeout
+    '''
+    if timeout is not None:
+        at = monotonic() + timeout
+    current = _deadline.get()
+    if at is None or (current is not None and current <= at):
+        yield current
+        return
+
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline():
+    '''the deadline of the current context by the monotonic clock, None if there is none'''
+    return _deadline.get()
+
+
+def remaining():
+    '''the number of seconds left until the current deadline, None if there is no deadline'''
+    at = _deadline.get()
+    if at is None:
+        return None
+    return max(at - monotonic(), 0.0)
+
+
+def expired():
+    '''whether the deadline of the current context has passed'''
+    at = _deadline.get()
+    return at is not None and monotonic() >= at
+
+
+def check_deadline():
+    '''raises DeadlineExceeded if the deadline of the current context has passed'''
+    at = _deadline.get()
+    if at is not None and monotonic() >= at:
+        raise DeadlineExceeded()
@@ -21,13 +21,16 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 
-Defines exceptions raised by decree.
+Defines exceptions raised by decree. The messages of validation errors are only formatted
+when the error is converted to a string.
 '''
 
 
 class ValidationError(Exception):
     '''Base validation Error'''
-    pass
+
+    # short machine readable code identifying the kind of validation error
+    code = 'invalid'
 
 
 class NotDefiningArgsException(Exception):
@@ -39,22 +42,112 @@ class NotDefiningArgsException(Exception):
 
 class MissingRequiredError(ValidationError):
     '''Error raised when a required command arg is missing'''
+    code = 'missing'
 
     def __init__(self, name):
-        super().__init__("Argument '{}' not present in command args".format(name))
+        super().__init__(name)
+        self.name = name
+
+    def __str__(self):
+        return "Argument '{}' not present in command args".format(self.name)
 
 
 class NotNoneError(ValidationError):
     '''Error raised when None is passed for an arg which may not be None'''
+    code = 'not_none'
 
     def __init__(self, name):
-        super().__init__("Argument '{}' may not be None".format(name))
+        super().__init__(name)
+        self.name = name
+
+    def __str__(self):
+        return "Argument '{}' may not be None".format(self.name)
 
 
 class UnexpectedTypeError(ValidationError):
     '''Error raised when the type of a command arg is not as expected'''
+    code = 'unexpected_type'
 
     def __init__(self, name, expected_type, actual_type):
-        super().__init__("Expected '{}' to be of type '{}' but was '{}'".format(
-            name, expected_type, actual_type
-        ))
+        super().__init__(name, expected_type, actual_type)
+        self.name = name
+        self.expected_type = expected_type
+        self.actual_type = actual_type
+
+    def __str__(self):
+        return "Expected '{}' to be of type '{}' but was '{}'".format(
+            self.name, self.expected_type, self.actual_type
+        )
+
+
+class UnexpectedElementTypeError(UnexpectedTypeError):
+    '''Error raised when the elements, keys or values of a container arg are not as expected'''
+    code = 'unexpected_element_type'
+
+    def __init__(self, name, expected_type, actual_type, part='elements'):
+        super().__init__(name, expected_type, actual_type)
+        self.args = (name, expected_type, actual_type, part)
+        self.part = part
+
+    def __str__(self):
+        return "Expected {} of '{}' to be of type '{}' but found '{}'".format(
+            self.part, self.name, self.expected_type, self.actual_type
+        )
+
+
+class DeadlineExceeded(TimeoutError):
+    '''Error raised when the deadline of a command passes before it has completed'''
+
+    def __init__(self, message='deadline exceeded'):
+        super().__init__(message)
+
+
+class UnknownCommandError(LookupError):
+    '''Error raised when no command is registered with a given name'''
+
+    def __init__(self, command_name):
+        super().__init__(command_name)
+        self.command_name = command_name
+
+    def __str__(self):
+        return "No command is registered as '{}'".format(self.command_name)
+
+
+class AmbiguousCommandError(LookupError):
+    '''Error raised when several commands are registered with a given name'''
+
+    def __init__(self, command_name, candidates):
+        super().__init__(command_name, candidates)
+        self.command_name = command_name
+        # the module and qualified names the commands can be looked up by instead
+        self.candidates = candidates
+
+    def __str__(self):
+        return "Several commands are registered as '{}', look one up as {}".format(
+            self.command_name, ' or '.join(self.candidates))
+
+
+class RemoteCommandError(Exception):
+    '''Error raised by a client when a command run by a command server fails'''
+
+    def __init__(self, type_name, message, code=None):
+        super().__init__(type_name, message, code)
+        self.type_name = type_name
+        self.message = message
+        self.code = code
+
+    def __str__(self):
+        return '{}: {}'.format(self.type_name, self.message)
+
+
+class InvalidBufferError(ValidationError):
+    '''Error raised when a buffer arg is not of the expected size, layout or dtype'''
+    code = 'invalid_buffer'
+
+    def __init__(self, name, reason):
+        super().__init__(name, reason)
+        self.name = name
+        self.reason = reason
+
+    def __str__(self):
+        return "Argument '{}' {}".format(self.name, self.reason)
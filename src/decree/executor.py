@@ -0,0 +1,185 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Defines the CommandExecutor which executes commands on a pool of worker threads or
+processes, returning futures for their results.
+'''
+
+import contextvars
+import functools
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+from decree.sharing import DEFAULT_SHARE_THRESHOLD
+from decree.sharing import attach_args
+from decree.sharing import detach
+from decree.sharing import release
+from decree.sharing import share_args
+
+
+class CommandExecutor():
+    '''
+    Executes commands on a pool of threads or processes. Arguments are validated in the
+    calling thread so that invalid args raise immediately rather than from the returned
+    future, only the execution of the command is done by the pool. Commands executed on
+    threads run in a copy of the caller's context, so they keep its deadline.
+
+    When using processes the command class is sent to the worker as a reference to where it
+    can be imported from along with its validated args, so commands run on processes must
+    be defined at module level and their validated args must be picklable. Any state set on
+    the instance by the command's validate method is not sent to the worker. Large buffer
+    args, such as bytes and numpy arrays, are sent through shared memory rather than pickled,
+    see decree.sharing. Commands executed on processes are not passed through their run
+    wrappers or reported to the run recorder, as those belong to the calling process.
+    '''
+
+    def __init__(self, max_workers=None, processes=False, share_threshold=DEFAULT_SHARE_THRESHOLD):
+        '''
+        Args:
+            max_workers: the number of workers in the pool, defaults as for concurrent.futures
+            processes: if True commands are executed on a pool of processes rather than threads
+            share_threshold: buffer args of at least this many bytes are sent to worker
+                processes through shared memory, None to always pickle them
+        '''
+        self.processes = processes
+        self.share_threshold = share_threshold
+        if processes:
+            self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, command_class, **command_args):
+        '''
+        validates the args for the command and schedules it to be executed by the pool.
+
+        Args:
+            command_class: the command to execute
+            command_args: arbitrary keyword args which get validated by name
+        Returns:
+            a Future for the result of the command's execute method
+        '''
+        instance = command_class.prepare(**command_args)
+        if self.processes:
+            validated_args, segments = self._share(instance.validated_args())
+            future = self._pool.submit(_execute_by_reference, command_reference(command_class),
+                                       validated_args)
+            return _releasing(future, segments)
+        return self._pool.submit(contextvars.copy_context().run, instance.run_prepared)
+
+    def map(self, command_class, command_args_batch, chunksize=1):
+        '''
+        validates every set of args in the batch and then executes the command for each of
+        them on the pool, submitting them in chunks to amortize the cost of each submission.
+
+        Args:
+            command_class: the command to execute
+            command_args_batch: an iterable of dicts of command args
+            chunksize: the number of invocations submitted to a worker at a time
+        Returns:
+            an iterator over the results of each invocation in order
+        '''
+        if chunksize < 1:
+            raise ValueError('chunksize must be at least 1')
+
+        instances = [command_class.prepare(**command_args) for command_args in command_args_batch]
+        chunks = [instances[start:start + chunksize] for start in range(0, len(instances), chunksize)]
+        if self.processes:
+            reference = command_reference(command_class)
+            futures = []
+            for chunk in chunks:
+                shared = [self._share(instance.validated_args()) for instance in chunk]
+                future = self._pool.submit(_execute_chunk_by_reference, reference,
+                                           [validated_args for validated_args, _ in shared])
+                futures.append(_releasing(future, [segment for _, segments in shared
+                                                   for segment in segments]))
+        else:
+            context = contextvars.copy_context()
+            futures = [self._pool.submit(context.copy().run, _execute_chunk, chunk) for chunk in chunks]
+        return _chained_results(futures)
+
+    def _share(self, validated_args):
+        if self.share_threshold is None:
+            return validated_args, []
+        return share_args(validated_args, self.share_threshold)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+        return False
+
+
+def command_reference(command_class):
+    '''
+    the module and qualified name the command class can be imported by in another process
+    '''
+    qualname = command_class.__qualname__
+    if '<locals>' in qualname:
+        raise ValueError('{} is defined in a function and cannot be imported by a worker '
+                         'process'.format(qualname))
+    return command_class.__module__, qualname
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_command(reference):
+    '''imports the command class for a reference created by command_reference'''
+    module_name, qualname = reference
+    resolved = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        resolved = getattr(resolved, name)
+    return resolved
+
+
+def _execute_by_reference(reference, validated_args):
+    validated_args, segments = attach_args(validated_args)
+    try:
+        return resolve_command(reference).from_validated_args(validated_args).execute()
+    finally:
+        del validated_args
+        detach(segments)
+
+
+def _execute_chunk_by_reference(reference, validated_args_chunk):
+    return [_execute_by_reference(reference, validated_args) for validated_args in validated_args_chunk]
+
+
+def _releasing(future, segments):
+    '''releases the shared memory segments of a submission once it completes'''
+    if segments:
+        future.add_done_callback(lambda _: release(segments))
+    return future
+
+
+def _execute_chunk(instances):
+    return [instance.run_prepared() for instance in instances]
+
+
+def _chained_results(futures):
+    for future in futures:
+        for result in future.result():
+            yield result
@@ -0,0 +1,307 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Runs commands over the rows of csv and tsv files. The text of each field is converted to
+the type of the arg it is read as by a table of converters built once from the command's
+validators, see Validator.string_converter. Files are read in chunks of rows, each chunk is
+converted and validated column by column as with run_columns and then run, so only a single
+chunk is ever held in memory.
+
+    rejects = RejectWriter(open('rejects.csv', 'w', newline=''))
+    for chunk in ingest(LoadTrade, 'trades.tsv', delimiter='\\t', rejects=rejects):
+        ...
+
+Empty fields are read as the arg's default if it has one, as the empty string for string
+args and otherwise as None, which fails validation as it does for any other run. Rows that
+cannot be converted or fail validation are passed to the reject sink with their line number
+in the file and are not run.
+'''
+
+import csv
+import itertools
+
+from decree.columns import _run_rows
+from decree.columns import numpy
+from decree.columns import validate_column
+from decree.exceptions import MissingRequiredError
+from decree.exceptions import ValidationError
+
+# the numpy dtypes whole columns of text are parsed as, by the dtype kinds of the validator
+_NUMPY_DTYPES = {'iu': 'int64', 'f': 'float64'}
+
+
+class IngestedChunk():
+    '''
+    the outcome of running a command for a chunk of rows. The result is that of the command
+    for columnar commands, otherwise a BatchResult holding the result of each row run.
+    '''
+
+    def __init__(self, rows, result):
+        # the line numbers of the rows the command was run for
+        self.rows = rows
+        self.result = result
+
+
+class RejectWriter():
+    '''
+    reject sink that writes each rejected row to a csv file, prefixed by its line number
+    and the error it was rejected for
+    '''
+
+    def __init__(self, output, **format_options):
+        self.writer = csv.writer(output, **format_options)
+        self.count = 0
+
+    def __call__(self, line_number, row, error):
+        self.writer.writerow([line_number, '{}: {}'.format(type(error).__name__, error)] + list(row))
+        self.count += 1
+
+
+class ColumnConverter():
+    '''converts a column of text fields into the values of a single arg'''
+
+    def __init__(self, validator, vectorize=False):
+        convert = validator.string_converter()
+        if convert is None:
+            raise ValueError('{} args cannot be read from text'.format(validator.type_name()))
+
+        self.validator = validator
+        self.convert = convert
+        # empty fields are read as the default, or as the value of the empty text for
+        # converters that accept it such as those of strings, or as None to be vetted by the
+        # validator
+        self.empty = validator.default or _empty_value(convert)
+        self.dtype = _NUMPY_DTYPES.get(validator.dtype_kinds) if vectorize else None
+
+    def __call__(self, fields):
+        '''
+        Returns:
+            a tuple of the converted values and a dict of the index of each field that could
+            not be converted to the error raised
+        '''
+        if '' not in fields:
+            try:
+                if self.dtype is not None:
+                    return numpy.array(fields).astype(self.dtype), {}
+                return list(map(self.convert, fields)), {}
+            except (ValueError, TypeError):
+                pass
+        return self._convert_each(fields)
+
+    def _convert_each(self, fields):
+        convert = self.convert
+        values = []
+        errors = {}
+        for index, text in enumerate(fields):
+            if text == '':
+                values.append(self.empty)
+                continue
+            try:
+                values.append(convert(text))
+            except (ValueError, TypeError) as e:
+                errors[index] = e
+                values.append(None)
+        return values, errors
+
+
+def _empty_value(convert):
+    '''the value an empty field converts to, None if the converter rejects empty text'''
+    try:
+        return convert('')
+    except (ValueError, TypeError):
+        return None
+
+
+def converter_table(command_class, fieldnames, vectorize=False):
+    '''
+    builds the converters of the fields of a file that are args of the command, fields that
+    are not are skipped.
+
+    Returns:
+        a list of tuples of the index of each field and its ColumnConverter
+    '''
+    command_class.finalize_args()
+    validators = command_class.validators
+    return [(index, ColumnConverter(validators[name], vectorize))
+            for index, name in enumerate(fieldnames) if name in validators]
+
+
+def ingest(command_class, source, chunk_size=10000, fieldnames=None, rejects=None,
+           encoding='utf-8', **format_options):
+    '''
+    runs the command over the rows of a csv file. Commands that set columnar are run once per
+    chunk with each arg set to its column of the chunk, numeric columns of which are parsed
+    straight into numpy arrays when numpy is installed. Other commands are run once per row.
+
+    Args:
+        command_class: the command to run
+        source: path to the file or a file object open for reading text
+        chunk_size: the number of rows converted and run at a time
+        fieldnames: the arg names of the fields, if not given they are read from the first row
+        rejects: callable passed the line number, fields and error of each rejected row. If
+            not given the error of the first rejected row is raised with its line number set
+            as row_number
+        encoding: the encoding of the file when given its path
+        format_options: options of csv.reader, such as delimiter='\\t' for tsv files
+    Returns:
+        an iterator over the IngestedChunk of each chunk of rows
+    '''
+    if hasattr(command_class, 'run_instance_async'):
+        raise TypeError('{} is asynchronous and cannot be run over a file'.format(command_class.__name__))
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+    return _ingest_source(command_class, source, encoding, chunk_size, fieldnames, rejects,
+                          format_options)
+
+
+def _ingest_source(command_class, source, encoding, *options):
+    if isinstance(source, str):
+        with open(source, newline='', encoding=encoding) as csv_file:
+            yield from _ingest(command_class, csv_file, *options)
+    else:
+        yield from _ingest(command_class, source, *options)
+
+
+def _ingest(command_class, csv_file, chunk_size, fieldnames, rejects, format_options):
+    reader = csv.reader(csv_file, **format_options)
+    if fieldnames is None:
+        fieldnames = next(reader, None)
+        if fieldnames is None:
+            return
+
+    vectorize = numpy is not None and command_class.columnar
+    converters = converter_table(command_class, fieldnames, vectorize)
+    converted_names = set(fieldnames)
+    defaults = {}
+    for validator in command_class.validators.values():
+        if validator.name in converted_names:
+            continue
+        if not validator.default:
+            raise MissingRequiredError(validator.name)
+        defaults[validator.name] = validator.default
+
+    reject = rejects if rejects is not None else _raise_rejected
+    width = len(fieldnames)
+    while True:
+        rows = []
+        line_numbers = []
+        malformed = []
+        read = 0
+        for row in itertools.islice(reader, chunk_size):
+            read += 1
+            if len(row) != width:
+                malformed.append((reader.line_num, row, ValueError(
+                    'expected {} fields but found {}'.format(width, len(row)))))
+                continue
+            rows.append(row)
+            line_numbers.append(reader.line_num)
+
+        validated, kept, rejected = _convert_chunk(converters, rows, line_numbers)
+        for line_number, row, error in sorted(malformed + rejected, key=_line_number):
+            reject(line_number, row, error)
+        if kept:
+            yield _run_chunk(command_class, validated, defaults, kept)
+        if read < chunk_size:
+            return
+
+
+def _convert_chunk(converters, rows, line_numbers):
+    '''
+    converts and validates the columns of a chunk of rows. Columns are converted and
+    validated whole, only a column that fails is gone through value by value to find the
+    rows at fault, which are rejected.
+
+    Returns:
+        a tuple of the validated columns keyed by arg name, the line numbers of the rows they
+        hold and a list of the line number, fields and error of each rejected row
+    '''
+    if not rows:
+        return {}, [], []
+    fields = list(zip(*rows))
+    columns = []
+    errors = {}
+    for index, converter in converters:
+        values, failed = converter(fields[index])
+        for row_index, error in failed.items():
+            errors.setdefault(row_index, error)
+        columns.append((converter.validator, values))
+
+    validated = None
+    while validated is None:
+        validated = {}
+        for validator, values in columns:
+            if errors:
+                values = _drop(values, errors)
+            try:
+                validated[validator.name] = validate_column(validator, values)
+            except ValidationError:
+                errors.update(_failing_values(validator, values, errors))
+                validated = None
+                break
+
+    kept = [line_number for row_index, line_number in enumerate(line_numbers)
+            if row_index not in errors]
+    rejected = [(line_numbers[row_index], rows[row_index], error)
+                for row_index, error in errors.items()]
+    return validated, kept, rejected
+
+
+def _failing_values(validator, values, dropped):
+    '''the index in the chunk and error of each value the validator rejects'''
+    kept_indexes = (row_index for row_index in itertools.count() if row_index not in dropped)
+    for row_index, value in zip(kept_indexes, _native(values)):
+        try:
+            validator.validate({validator.name: value})
+        except ValidationError as e:
+            yield row_index, e
+
+
+def _drop(values, errors):
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return numpy.delete(values, sorted(errors))
+    return [value for row_index, value in enumerate(values) if row_index not in errors]
+
+
+def _native(values):
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values.tolist()
+    return values
+
+
+def _run_chunk(command_class, validated, defaults, rows):
+    length = len(rows)
+    for name, default in defaults.items():
+        validated[name] = [default] * length
+
+    if command_class.columnar:
+        return IngestedChunk(rows, command_class.from_validated_args(validated).run_validated())
+    return IngestedChunk(rows, _run_rows(command_class, validated))
+
+
+def _line_number(rejected):
+    return rejected[0]
+
+
+def _raise_rejected(line_number, row, error):
+    error.row_number = line_number
+    raise error
@@ -0,0 +1,481 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+An append only journal of command runs. Each run of a journaled command whose args are
+valid is appended as a binary record holding the registered name of the command, its
+validated args, when it ran and whether it failed, in validate or execute. Records are
+written and fsynced by a background thread in groups, so that many runs share the cost of
+each fsync, to segment files that are rotated as they grow. Checkpoints save a snapshot of
+application state along with the position in the journal it reflects so that recovery
+only replays the records written after it.
+
+    journal = Journal('/var/lib/app/journal')
+
+    @journaled(journal)
+    class Deposit(Command):
+        ...
+
+    replay('/var/lib/app/journal', restore=load_snapshot)
+
+Records are pickled, so journals must only be replayed from trusted storage.
+'''
+
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+from decree.command import RunWrapper
+from decree.command import add_run_wrapper
+from decree.command import lookup_command
+
+# the length and crc32 of the body of each record
+RECORD_HEADER = struct.Struct('<II')
+
+_SEGMENT_PREFIX = 'segment-'
+_SEGMENT_SUFFIX = '.log'
+_CHECKPOINT_PREFIX = 'checkpoint-'
+_CHECKPOINT_SUFFIX = '.pickle'
+
+
+def journaled(journal, durable=False):
+    '''
+    class decorator that appends every run of a command whose args are valid to the journal
+    once it has completed
+
+        @journaled(journal, durable=True)
+        class Transfer(Command):
+            ...
+
+    Like the other decorators that wrap runs, such as memoize and single_flight, it wraps the
+    runs of any applied before it. AsyncCommands cannot be journaled.
+
+    Args:
+        journal: the Journal runs are appended to
+        durable: if True a run does not return until its record has been fsynced, runs
+            waiting at the same time share a single fsync
+    '''
+    def decorate(command_class):
+        command_class.journal = journal
+        command_class.journal_durable = durable
+        add_run_wrapper(command_class, JournaledRuns(journal, durable))
+        return command_class
+    return decorate
+
+
+class JournaledRuns(RunWrapper):
+    '''
+    wraps the runs of a journaled command, appending each to the journal with its outcome.
+    The args are read and pickled before the run proceeds, so commands with lazy_args are
+    fully validated, and args that cannot be journaled rejected, before they execute.
+    '''
+
+    def __init__(self, journal, durable=False):
+        self.journal = journal
+        self.durable = durable
+
+    def run(self, command, proceed):
+        args = self.journal.encode_args(command.validated_args())
+        try:
+            result = proceed()
+        except Exception as e:
+            self._record(command, args, e)
+            raise
+        self._record(command, args, None)
+        return result
+
+    def _record(self, command, args, error):
+        sequence = self.journal.append_encoded(type(command).command_name, args, _outcome(error))
+        if self.durable:
+            self.journal.wait(sequence)
+
+
+class JournalRecord():
+    '''a command run read back from a journal'''
+    __slots__ = ('timestamp', 'command', 'args', 'error', 'position')
+
+    def __init__(self, timestamp, command, args, error, position):
+        self.timestamp = timestamp
+        self.command = command
+        self.args = args
+        # None if the run succeeded, otherwise the type name and message of its error
+        self.error = error
+        # the segment number and offset of the record
+        self.position = position
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Journal():
+    '''
+    Appends records of command runs to segment files in a directory. Records are buffered
+    and written by a background thread, which fsyncs once the buffer holds sync_bytes or
+    sync_interval seconds have passed, whichever comes first. A new segment is started each
+    time the journal is opened and once the current one reaches segment_size.
+    '''
+
+    def __init__(self, directory, segment_size=64 * 1024 * 1024, sync_interval=0.01,
+                 sync_bytes=1024 * 1024, clock=time.time):
+        '''
+        Args:
+            directory: the directory holding the segments and checkpoints, created if needed
+            segment_size: the size in bytes at which a segment is rotated
+            sync_interval: the longest a record waits to be written and fsynced
+            sync_bytes: the number of buffered bytes that trigger an immediate fsync
+            clock: the clock records are timestamped with
+        '''
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync_interval = sync_interval
+        self.sync_bytes = sync_bytes
+        self.clock = clock
+
+        self.syncs = 0
+        self._buffer = bytearray()
+        self._appended = 0
+        self._synced = 0
+        self._closed = False
+        # the error that stopped records being written, raised on appending or waiting
+        self._error = None
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+
+        segments = segment_numbers(directory)
+        self._segment_number = segments[-1] + 1 if segments else 0
+        self._file = None
+        self._open_segment()
+
+        self._flusher = threading.Thread(target=self._flush_continuously, name='decree-journal',
+                                         daemon=True)
+        self._flusher.start()
+
+    def record(self, command, error=None, args=None):
+        '''
+        appends the run of a command instance whose args have been validated
+
+        Args:
+            command: the command instance that was run
+            error: the exception that ended the run, if any
+            args: the validated args of the run, read from the instance if not given
+        Returns:
+            the sequence number of the record, to pass to wait
+        '''
+        if args is None:
+            args = command.validated_args()
+        return self.append(type(command).command_name, args, _outcome(error))
+
+    def append(self, command_name, args, error=None):
+        '''
+        appends a record of a command run, returning its sequence number once buffered
+        '''
+        return self.append_encoded(command_name, self.encode_args(args), error)
+
+    def encode_args(self, args):
+        '''
+        pickles the args of a run ahead of appending it with append_encoded, raising if they
+        cannot be pickled
+        '''
+        return pickle.dumps(args, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def append_encoded(self, command_name, encoded_args, error=None):
+        '''
+        appends a record of a command run whose args were pickled by encode_args, returning
+        its sequence number once buffered. Raises a RuntimeError if the journal is closed or
+        has failed to write its records.
+        '''
+        body = pickle.dumps((self.clock(), command_name, encoded_args, error), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._condition:
+            self._check_writable()
+            self._buffer += RECORD_HEADER.pack(len(body), zlib.crc32(body))
+            self._buffer += body
+            self._appended += 1
+            if len(self._buffer) >= self.sync_bytes:
+                self._condition.notify_all()
+            return self._appended
+
+    def wait(self, sequence, timeout=None):
+        '''
+        waits until the record with the sequence number has been written and fsynced. Raises
+        a RuntimeError if the journal failed to write it.
+
+        Returns:
+            True if it has been, False if the timeout passed first
+        '''
+        with self._condition:
+            synced = self._condition.wait_for(
+                lambda: self._synced >= sequence or self._error is not None, timeout)
+            if synced and self._synced < sequence:
+                self._check_failed()
+            return synced
+
+    def flush(self):
+        '''writes and fsyncs every record appended so far'''
+        with self._condition:
+            sequence = self._appended
+            self._condition.notify_all()
+        self.wait(sequence)
+
+    def checkpoint(self, state, prune=True):
+        '''
+        saves a snapshot of application state reflecting every record appended so far. The
+        journal is flushed and rotated so that replay restores the snapshot and then replays
+        only the segments written after it.
+
+        The state must reflect exactly the records appended before the checkpoint is taken,
+        so runs of journaled commands must be paused while it is captured and checkpointed.
+        A run recorded in between lands in a segment the checkpoint replaces and would be
+        lost, as replay skips those segments and prune removes them.
+
+        Args:
+            state: picklable application state
+            prune: if True the segments and checkpoints made redundant are removed
+        '''
+        with self._write_lock:
+            self._write_buffered()
+            self._open_segment()
+            position = self._segment_number
+
+        path = _checkpoint_path(self.directory, position)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as snapshot:
+            pickle.dump((position, state), snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, path)
+        _fsync_directory(self.directory)
+
+        if prune:
+            for number in segment_numbers(self.directory):
+                if number < position:
+                    os.remove(segment_path(self.directory, number))
+            for number in _checkpoint_numbers(self.directory):
+                if number < position:
+                    os.remove(_checkpoint_path(self.directory, number))
+        return position
+
+    def close(self):
+        '''writes any buffered records and stops the journal'''
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._flusher.join()
+        with self._write_lock:
+            if self._error is None:
+                self._write_buffered()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _flush_continuously(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._buffer) >= self.sync_bytes,
+                    self.sync_interval)
+                closed = self._closed
+            try:
+                with self._write_lock:
+                    self._write_buffered()
+            except Exception:
+                # the error is kept to be raised by append and wait, stop writing
+                return
+            if closed:
+                return
+
+    def _write_buffered(self):
+        '''
+        writes and fsyncs the buffered records, called holding the write lock. An error
+        writing them is kept and the runs waiting for them woken to raise it.
+        '''
+        with self._condition:
+            self._check_failed()
+            data, self._buffer = self._buffer, bytearray()
+            sequence = self._appended
+        if data:
+            try:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.syncs += 1
+                if self._file.tell() >= self.segment_size:
+                    self._open_segment()
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+                    self._condition.notify_all()
+                raise
+        with self._condition:
+            self._synced = sequence
+            self._condition.notify_all()
+
+    def _check_writable(self):
+        '''raises if records can no longer be appended, called holding the condition'''
+        self._check_failed()
+        if self._closed:
+            raise RuntimeError('journal is closed')
+
+    def _check_failed(self):
+        if self._error is not None:
+            raise RuntimeError('journal failed to write its records') from self._error
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._segment_number += 1
+        self._file = open(segment_path(self.directory, self._segment_number), 'ab')
+        _fsync_directory(self.directory)
+
+
+def segment_path(directory, number):
+    return os.path.join(directory, '{}{:08d}{}'.format(_SEGMENT_PREFIX, number, _SEGMENT_SUFFIX))
+
+
+def segment_numbers(directory):
+    '''the numbers of the segments in the directory in order'''
+    return _numbered(directory, _SEGMENT_PREFIX, _SEGMENT_SUFFIX)
+
+
+def read_checkpoint(directory):
+    '''
+    loads the latest checkpoint in the directory
+
+    Returns:
+        a tuple of the saved state and the number of the first segment written after it,
+        or (None, 0) if there is no checkpoint
+    '''
+    numbers = _checkpoint_numbers(directory)
+    if not numbers:
+        return None, 0
+    with open(_checkpoint_path(directory, numbers[-1]), 'rb') as snapshot:
+        position, state = pickle.load(snapshot)
+    return state, position
+
+
+def read_records(directory, first_segment=0):
+    '''
+    streams the records of the segments in the directory, starting from the given segment.
+    Each segment is memory mapped rather than read. A record that was only partially written,
+    as when the process stopped mid write, ends its segment.
+
+    Returns:
+        an iterator over the JournalRecords in the order they were appended
+    '''
+    for number in segment_numbers(directory):
+        if number < first_segment:
+            continue
+        with open(segment_path(directory, number), 'rb') as segment:
+            if os.fstat(segment.fileno()).st_size == 0:
+                continue
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for record in _segment_records(mapped, number):
+                    yield record
+
+
+def replay(directory, restore=None):
+    '''
+    recovers from a journal by restoring the latest checkpoint and then executing each
+    successful run recorded after it. Commands are rebuilt from their recorded args without
+    validating them again and executed directly, so replay is not itself journaled. Raises a
+    TypeError for records of AsyncCommands, which cannot be executed synchronously.
+
+    Args:
+        directory: the journal's directory
+        restore: callable passed the state saved by the latest checkpoint, if there is one
+    Returns:
+        the number of runs replayed
+    '''
+    state, first_segment = read_checkpoint(directory)
+    if restore is not None and state is not None:
+        restore(state)
+
+    replayed = 0
+    for record in read_records(directory, first_segment):
+        if record.error is None:
+            command_class = lookup_command(record.command)
+            if hasattr(command_class, 'run_instance_async'):
+                raise TypeError('{} is asynchronous and cannot be replayed'.format(command_class.__name__))
+            command_class.from_validated_args(record.args).execute()
+            replayed += 1
+    return replayed
+
+
+def _segment_records(mapped, number):
+    header_size = RECORD_HEADER.size
+    size = len(mapped)
+    offset = 0
+    while offset + header_size <= size:
+        length, checksum = RECORD_HEADER.unpack_from(mapped, offset)
+        start = offset + header_size
+        body = mapped[start:start + length]
+        if len(body) < length or zlib.crc32(body) != checksum:
+            return
+        timestamp, command, args, error = pickle.loads(body)
+        yield JournalRecord(timestamp, command, pickle.loads(args), error, (number, offset))
+        offset = start + length
+
+
+def _outcome(error):
+    '''the type name and message recorded for the error that ended a run, if any'''
+    return None if error is None else (type(error).__name__, str(error))
+
+
+def _checkpoint_path(directory, number):
+    return os.path.join(directory, '{}{:08d}{}'.format(_CHECKPOINT_PREFIX, number, _CHECKPOINT_SUFFIX))
+
+
+def _checkpoint_numbers(directory):
+    return _numbered(directory, _CHECKPOINT_PREFIX, _CHECKPOINT_SUFFIX)
+
+
+def _numbered(directory, prefix, suffix):
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            number = name[len(prefix):-len(suffix)]
+            if number.isdigit():
+                numbers.append(int(number))
+    return sorted(numbers)
+
+
+def _fsync_directory(directory):
+    '''fsyncs a directory so that files created or renamed in it are durable'''
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
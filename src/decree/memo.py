@@ -0,0 +1,264 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Memoization of the results of pure commands. A memoized command caches the result of
+execute keyed on its validated args so that running it again with equal args returns the
+cached result without calling validate or execute.
+'''
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from operator import attrgetter
+
+from decree.command import RunWrapper
+from decree.command import add_run_wrapper
+
+
+def memoize(command_class=None, max_entries=1024, max_bytes=None, ttl=None, sizeof=sys.getsizeof):
+    '''
+    class decorator that memoizes the results of a command, used either bare or with options
+
+        @memoize(max_entries=10000, ttl=60)
+        class Lookup(Command):
+            ...
+
+    The cache is available as the result_cache attribute of the command class. Only
+    commands whose result depends solely on their args should be memoized. Works for both
+    Commands and AsyncCommands, and like the other decorators that wrap runs, such as
+    journaled and single_flight, wraps the runs of any applied before it.
+
+    Args:
+        max_entries: the maximum number of results cached, None for no limit
+        max_bytes: the maximum total size of the cached results, None for no limit
+        ttl: the number of seconds a result stays cached, None for no expiry
+        sizeof: callable used to measure the size of a result for max_bytes
+    '''
+    def decorate(command_class):
+        command_class.result_cache = ResultCache(command_class, max_entries, max_bytes, ttl, sizeof)
+        add_run_wrapper(command_class, command_class.result_cache)
+        return command_class
+
+    if command_class is not None:
+        return decorate(command_class)
+    return decorate
+
+
+def args_getter(command_class):
+    '''
+    a function returning the tuple of validated arg values of an instance of the command
+    '''
+    names = list(command_class.validators)
+    if not names:
+        return lambda command: ()
+    if len(names) == 1:
+        single = attrgetter(names[0])
+        return lambda command: (single(command),)
+    return attrgetter(*names)
+
+
+def args_key(command, getters):
+    '''
+    the hashable key of the validated args of a command instance, including its class, or
+    None if its args cannot be hashed. The key includes the type of each value so that equal
+    values of different types, such as 1, 1.0 and True, do not collide. Args holding
+    containers are converted to a canonical hashable form, which types their contents too.
+
+    Args:
+        command: the command instance whose args have been validated
+        getters: dict caching the args_getter of each command class
+    '''
+    command_class = type(command)
+    getter = getters.get(command_class)
+    if getter is None:
+        getter = getters[command_class] = args_getter(command_class)
+
+    values = getter(command)
+    value_types = tuple(map(type, values))
+    if _CONTAINER_TYPES.isdisjoint(value_types):
+        key = (command_class, values, value_types)
+        try:
+            hash(key)
+            return key
+        except TypeError:
+            return None
+    try:
+        return (command_class, canonical(values))
+    except TypeError:
+        return None
+
+
+# the types canonical converts, whose equal contents may still differ in type
+_CONTAINER_TYPES = frozenset((list, tuple, dict, set, frozenset))
+
+
+def canonical(value):
+    '''
+    converts a value to a hashable equivalent. Lists, tuples, dicts and sets are converted
+    recursively, tagged with their type so that for example a list and a set of the same
+    values do not collide. Other values are tagged with their type so that equal values of
+    different types, such as 1 and True, are kept apart. Values of unhashable types raise a
+    TypeError.
+    '''
+    value_type = type(value)
+    if value_type is list or value_type is tuple:
+        return (value_type, tuple(canonical(item) for item in value))
+    if value_type is dict:
+        return (dict, frozenset((canonical(k), canonical(v)) for k, v in value.items()))
+    if value_type is set or value_type is frozenset:
+        return (set, frozenset(canonical(item) for item in value))
+    hash(value)
+    return (value_type, value)
+
+
+class ResultCache(RunWrapper):
+    '''
+    LRU cache of command results with optional limits on the number of entries, their total
+    size and how long they live. Counts hits, misses and evictions and is safe to use from
+    multiple threads. Wraps the runs of a memoized command, only proceeding with those whose
+    result is not cached.
+    '''
+
+    def __init__(self, command_class, max_entries=1024, max_bytes=None, ttl=None,
+                 sizeof=sys.getsizeof, clock=time.monotonic):
+        self.command_class = command_class
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+
+        self._entries = OrderedDict()
+        self._getters = {}
+        self._lock = threading.Lock()
+
+    def run(self, command, proceed):
+        key = self.key(command)
+        found, result = self.get(key)
+        if found:
+            return result
+        result = proceed()
+        self.put(key, result)
+        return result
+
+    async def run_async(self, command, proceed):
+        key = self.key(command)
+        found, result = self.get(key)
+        if found:
+            return result
+        result = await proceed()
+        self.put(key, result)
+        return result
+
+    def key(self, command):
+        '''
+        the hashable key of the validated args of a command instance, see args_key
+        '''
+        return args_key(command, self._getters)
+
+    def get(self, key):
+        '''
+        looks up a cached result
+        Returns:
+            a tuple of whether the result was found and the result
+        '''
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            result, expires, size = entry
+            if expires is not None and expires <= self.clock():
+                self._remove(key)
+                self.evictions += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, result
+
+    def put(self, key, result):
+        if key is None:
+            return
+
+        size = self.sizeof(result) if self.max_bytes is not None else 0
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, expires, size)
+            self.total_bytes += size
+            self._evict()
+
+    def invalidate(self, **command_args):
+        '''
+        removes the cached result for the command run with the given args, returning True
+        if there was one
+        '''
+        command = self.command_class()
+        command._validate_args(command_args)
+        key = self.key(command)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def _evict(self):
+        entries = self._entries
+        while entries and (
+                (self.max_entries is not None and len(entries) > self.max_entries) or
+                (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            _, (_, _, size) = entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
@@ -0,0 +1,161 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Per command instrumentation of command runs. When enabled every command run is counted,
+its errors are counted by exception type and the latency of each phase of the run,
+validating the args, the validate method and the execute method, is recorded in fixed bucket
+histograms. Only the phases a run completed are recorded, so a memoized run that returns a
+cached result records no validate or execute latency. Instrumentation is enabled by setting
+the run recorder of decree.command, which runs of Commands and AsyncCommands report to
+whether run singly, in batches, over columns or by executors and schedulers. While it is
+disabled each run checks only that no recorder is set.
+
+    from decree import metrics
+    metrics.enable()
+    ...
+    export(metrics.snapshot())
+    metrics.reset()
+'''
+
+import threading
+from bisect import bisect_left
+
+from decree.command import run_recorder
+from decree.command import set_run_recorder
+
+# upper bounds in nanoseconds of each latency bucket, from 1 microsecond to 10 seconds. Values
+# above the last bound are counted in a final overflow bucket
+BUCKET_BOUNDS = tuple(int(multiplier * 10 ** exponent)
+                      for exponent in range(3, 10)
+                      for multiplier in (1, 2.5, 5)) + (10 ** 10,)
+
+PHASES = ('args', 'validate', 'execute')
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class Histogram():
+    '''
+    fixed bucket histogram of latencies in nanoseconds
+    '''
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        self.counts[bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        return {
+            'bounds': BUCKET_BOUNDS,
+            'counts': list(self.counts),
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+        }
+
+
+class CommandStats():
+    '''
+    the calls, errors and phase latencies recorded for a single command class
+    '''
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = {}
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self.lock = threading.Lock()
+
+    def record(self, durations, error=None):
+        '''
+        records a run of the command given a dict of the duration of each phase it completed
+        and the exception that ended it, if any
+        '''
+        with self.lock:
+            self.calls += 1
+            for phase, duration in durations.items():
+                self.phases[phase].record(duration)
+            if error is not None:
+                error_name = type(error).__name__
+                self.errors[error_name] = self.errors.get(error_name, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'errors': dict(self.errors),
+                'phases': {phase: histogram.snapshot() for phase, histogram in self.phases.items()},
+            }
+
+
+def enable():
+    '''sets the run recorder so that every command run is recorded'''
+    set_run_recorder(_record)
+
+
+def disable():
+    '''unsets the run recorder, recorded stats are kept'''
+    if enabled():
+        set_run_recorder(None)
+
+
+def enabled():
+    return run_recorder() is _record
+
+
+def snapshot():
+    '''
+    the stats recorded for each command keyed by the command's module qualified name
+    '''
+    with _stats_lock:
+        recorded = list(_stats.items())
+    return {'{}.{}'.format(command_class.__module__, command_class.__qualname__): stats.snapshot()
+            for command_class, stats in recorded}
+
+
+def reset():
+    '''discards all recorded stats'''
+    with _stats_lock:
+        _stats.clear()
+
+
+def stats_for(command_class):
+    '''the CommandStats recorded for the command class, created when first needed'''
+    stats = _stats.get(command_class)
+    if stats is None:
+        with _stats_lock:
+            stats = _stats.setdefault(command_class, CommandStats())
+    return stats
+
+
+def _record(command_class, durations, error):
+    stats_for(command_class).record(durations, error)
@@ -0,0 +1,171 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Streaming pipelines of commands. Each item output by a stage is fed to the next stage as
+its args, commands whose execute returns a generator or other iterator have their items
+streamed one at a time rather than collected, so the first output of a pipeline is
+available as soon as it has passed through every stage.
+
+    pipeline = Pipeline(ReadLines, Stage(ParseLine, arg='line'), Stage(Store, threaded=True))
+    for stored in pipeline.run(path='big.log'):
+        ...
+'''
+
+import contextvars
+import queue
+import threading
+from collections.abc import Iterator
+from collections.abc import Mapping
+
+# how long a worker waits on a full buffer before checking if the pipeline was closed
+_POLL_INTERVAL = 0.1
+
+_ITEM = 'item'
+_DONE = 'done'
+_ERROR = 'error'
+
+
+class Stage():
+    '''
+    a command run by a pipeline once for each item output by the previous stage. Items are
+    passed as the value of a single arg when arg is given, otherwise each item must be a
+    mapping of args. Fixed args are passed on every run along with those from the item.
+
+    Threaded stages run on their own worker thread, along with any unthreaded stages before
+    them, and hand their output to the next stage through a queue of at most buffer_size
+    items, so a fast stage blocks rather than running ahead of a slow one.
+    '''
+
+    def __init__(self, command_class, arg=None, threaded=False, buffer_size=64, **command_args):
+        if arg is not None and arg not in command_class.validators:
+            raise ValueError('{} has no arg named {}'.format(command_class.__name__, arg))
+        if buffer_size < 1:
+            raise ValueError('buffer_size must be at least 1')
+
+        self.command_class = command_class
+        self.arg = arg
+        self.threaded = threaded
+        self.buffer_size = buffer_size
+        self.command_args = command_args
+
+    def args_for(self, item):
+        '''the args the command is run with for an item output by the previous stage'''
+        if self.arg is not None:
+            return dict(self.command_args, **{self.arg: item})
+        if not isinstance(item, Mapping):
+            raise TypeError('{} expects a mapping of args but was given {}, pass arg to name '
+                            'the arg items are passed as'.format(self.command_class.__name__,
+                                                                 type(item).__name__))
+        return dict(self.command_args, **item)
+
+    def outputs(self, items):
+        '''lazily runs the command for each item, streaming the items of iterator results'''
+        run = self.command_class.run
+        for item in items:
+            result = run(**self.args_for(item))
+            if isinstance(result, Iterator):
+                yield from result
+            else:
+                yield result
+
+
+class Pipeline():
+    '''
+    chains stages so that the output of each stage is fed to the next. Stages may be given
+    as Stage instances or as command classes, which are run with each item as their args.
+    '''
+
+    def __init__(self, *stages):
+        if not stages:
+            raise ValueError('a pipeline requires at least one stage')
+        self.stages = [stage if isinstance(stage, Stage) else Stage(stage) for stage in stages]
+
+    def run(self, **command_args):
+        '''
+        runs the first stage once with the given args and streams its output through the
+        rest of the pipeline.
+
+        Returns:
+            an iterator over the output of the last stage
+        '''
+        return self.stream([command_args])
+
+    def stream(self, items):
+        '''
+        streams each of the items through the pipeline, each item is passed to the first
+        stage as for any other stage. Nothing runs until the returned iterator is consumed.
+
+        Returns:
+            an iterator over the output of the last stage
+        '''
+        for stage in self.stages:
+            items = stage.outputs(items)
+            if stage.threaded:
+                items = _buffered(items, stage.buffer_size, stage.command_class.__name__)
+        return items
+
+
+def _buffered(items, buffer_size, name):
+    '''
+    consumes the items on a worker thread, passing them back through a bounded queue. The
+    worker is started when the returned generator is first advanced and stops once it is
+    closed, any error it hits is raised from the generator.
+    '''
+    buffer = queue.Queue(maxsize=buffer_size)
+    closed = threading.Event()
+
+    def produce():
+        try:
+            for item in items:
+                if not _put(buffer, (_ITEM, item), closed):
+                    return
+            _put(buffer, (_DONE, None), closed)
+        except BaseException as e:
+            _put(buffer, (_ERROR, e), closed)
+
+    # the worker runs in a copy of the caller's context, so deadlines and other context
+    # variables set around the pipeline apply to the commands run by its threaded stages
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(produce,), name='decree-pipeline-{}'.format(name),
+                     daemon=True).start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind is _DONE:
+                return
+            if kind is _ERROR:
+                raise value
+            yield value
+    finally:
+        closed.set()
+
+
+def _put(buffer, entry, closed):
+    '''puts the entry on the buffer, waiting for space unless the pipeline is closed'''
+    while not closed.is_set():
+        try:
+            buffer.put(entry, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
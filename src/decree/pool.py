@@ -0,0 +1,213 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Pooling of command instances. Rather than creating an instance for every run, a pooled
+command takes an instance from a small pool kept for each thread and returns it once the
+run completes, its args cleared by reset_args. Instances are pooled by every run of the
+command, by run and run_async as well as the runs of run_many, run_columns and ingest. Only
+the instances prepared to be executed elsewhere, by executors and schedulers, are created
+afresh. Each subclass of a pooled command has a pool of its own, created on its first run.
+
+An instance that is still referenced once its run completes, say because execute returned
+it or stored it away, is never returned to the pool so that a later run cannot change it
+from under whoever holds it, nor is the instance of a run that raised, which the error's
+traceback still refers to.
+
+Plain instances are cheap to create and are freed as soon as a run completes, so pooling
+them costs slightly more than it saves. Pooling pays off for commands whose instances are
+costly to set up, such as those whose __init__ allocates buffers or opens handles, as
+reset_args keeps everything but the args of the previous run.
+'''
+
+import sys
+import threading
+
+# instances are only pooled where references to them can be counted to guard against leaks
+_getrefcount = getattr(sys, 'getrefcount', None)
+
+
+def pooled(command_class=None, size=8):
+    '''
+    class decorator that runs a command with instances taken from a pool, used either bare or
+    with options
+
+        @pooled(size=4)
+        class Increment(Command):
+            ...
+
+    The pool is available as the instance_pool attribute of the command class. Commands
+    that keep state on their instances other than their args must extend reset_args to
+    clear it.
+
+    Args:
+        size: the most idle instances kept for each thread
+    '''
+    def decorate(command_class):
+        command_class.instance_pool = InstancePool(command_class, size)
+        return command_class
+
+    if command_class is not None:
+        return decorate(command_class)
+    return decorate
+
+
+class InstancePool():
+    '''
+    bounded pool of idle instances of a command kept for each thread, so instances are
+    taken and returned without locking
+    '''
+
+    def __init__(self, command_class, size=8):
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        self.command_class = command_class
+        self.size = size if _getrefcount is not None else 0
+        self.leaked = 0
+        self._local = threading.local()
+        self._leak_lock = threading.Lock()
+        self._released_references = _released_references(self)
+        self._run_references = _run_references()
+
+    def for_class(self, command_class):
+        '''
+        the pool of the command class, which is this pool for the pooled command itself. A
+        subclass inheriting this pool is given its own with the same size, so that its runs
+        are never given instances of the pooled command.
+        '''
+        if command_class is self.command_class:
+            return self
+        pool = command_class.__dict__.get('instance_pool')
+        if pool is None:
+            # threads racing to create the pool each use their own for that run, only the
+            # instances of the pools that lost are not reused
+            pool = command_class.instance_pool = InstancePool(command_class, self.size)
+        return pool
+
+    def run(self, command_class, command_args):
+        '''
+        runs the command with an instance taken from this thread's pool, returning it to the
+        pool once the run completes as release does
+        '''
+        if command_class is not self.command_class:
+            return self.for_class(command_class).run(command_class, command_args)
+        idle = self.idle_instances()
+        instance = idle.pop() if idle else command_class()
+        result = instance.run_instance(**command_args)
+        # done here rather than by calling release to keep the cost of each run down
+        if self.size:
+            if _getrefcount(instance) > self._run_references:
+                self.leak()
+            elif len(idle) < self.size:
+                instance.reset_args()
+                idle.append(instance)
+        return result
+
+    async def run_async(self, command_class, command_args):
+        '''runs an AsyncCommand with an instance taken from this thread's pool, see run'''
+        if command_class is not self.command_class:
+            return await self.for_class(command_class).run_async(command_class, command_args)
+        idle = self.idle_instances()
+        instance = idle.pop() if idle else command_class()
+        result = await instance.run_instance_async(**command_args)
+        if self.size:
+            if _getrefcount(instance) > self._run_references:
+                self.leak()
+            elif len(idle) < self.size:
+                instance.reset_args()
+                idle.append(instance)
+        return result
+
+    def idle_instances(self):
+        '''the list of idle instances pooled for this thread'''
+        try:
+            return self._local.idle
+        except AttributeError:
+            idle = self._local.idle = []
+            return idle
+
+    def acquire(self):
+        '''an idle instance of the command, created if this thread has none'''
+        idle = self.idle_instances()
+        return idle.pop() if idle else self.command_class()
+
+    def release(self, instance):
+        '''
+        resets an instance and returns it to this thread's pool, unless the pool is full. An
+        instance that is still referenced other than by the variable of the caller passed
+        here is counted as leaked and dropped instead.
+
+        Returns:
+            True if the instance was returned to the pool
+        '''
+        if _references(instance) > self._released_references:
+            self.leak()
+            return False
+        idle = self.idle_instances()
+        if len(idle) >= self.size:
+            return False
+        instance.reset_args()
+        idle.append(instance)
+        return True
+
+    def _measure(self, instance):
+        # called exactly as release is so that their references can be compared
+        return _references(instance)
+
+    def leak(self):
+        '''counts an instance that was not returned as it was still referenced'''
+        with self._leak_lock:
+            self.leaked += 1
+
+    def idle(self):
+        '''the number of idle instances in this thread's pool'''
+        return len(self.idle_instances())
+
+
+def _released_references(pool):
+    '''
+    the number of references release sees to an instance referred to only by the variable
+    its caller passes, which varies between interpreters and their versions
+    '''
+    instance = object()
+    return pool._measure(instance)
+
+
+def _run_references():
+    '''
+    the number of references run sees to an instance referred to only by its own variable,
+    counted as run counts them
+    '''
+    if _getrefcount is None:
+        return 0
+    instance = object()
+    return _getrefcount(instance)
+
+
+def _references(instance):
+    '''
+    the number of references to the instance, only comparable between calls made the same
+    way with the instance referred to in the same ways
+    '''
+    if _getrefcount is None:
+        return 0
+    return _getrefcount(instance)
@@ -0,0 +1,194 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Defines the CommandScheduler which queues commands by priority and runs them on a pool of
+worker threads, so that latency sensitive commands are not starved by bursts of batch work.
+'''
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from time import monotonic
+
+from decree.deadlines import current_deadline
+from decree.deadlines import deadline as run_deadline
+from decree.exceptions import DeadlineExceeded
+from decree.metrics import Histogram
+
+
+class CommandScheduler():
+    '''
+    Runs commands on a pool of worker threads in order of priority, lower values first and
+    commands of equal priority in the order they were scheduled. Args are validated, and the
+    command's validate method called, when the command is scheduled so invalid args raise
+    immediately rather than from the returned future.
+
+    Commands may be given a deadline. Commands whose deadline has passed by the time a worker
+    takes them from the queue are not executed, their futures either fail with
+    DeadlineExceeded or, if expired is 'drop', are cancelled. With the default clock the
+    deadline of the scheduling context also applies, and the deadline is carried into the
+    context of the command's execution, see decree.deadlines.
+    '''
+
+    def __init__(self, workers=4, expired='fail', clock=monotonic):
+        '''
+        Args:
+            workers: the number of worker threads
+            expired: 'fail' to fail the futures of expired commands, 'drop' to cancel them
+            clock: the clock deadlines are measured by
+        '''
+        if workers < 1:
+            raise ValueError('workers must be at least 1')
+        if expired not in ('fail', 'drop'):
+            raise ValueError("expired must be 'fail' or 'drop'")
+
+        self.expired = expired
+        self.clock = clock
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expirations = 0
+        self.wait_times = Histogram()
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._shutdown = False
+        self._condition = threading.Condition()
+        self._workers = [threading.Thread(target=self._work, name='decree-scheduler-{}'.format(index),
+                                          daemon=True)
+                         for index in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def schedule(self, command_class, command_args=None, priority=0, deadline=None, timeout=None):
+        '''
+        validates the args for the command and queues it to be executed.
+
+        Args:
+            command_class: the command to execute
+            command_args: dict of args which get validated by name
+            priority: the priority of the command, lower values are run first
+            deadline: the time, by the scheduler's clock, after which the command is expired
+            timeout: the number of seconds from now after which the command is expired, an
+                alternative to deadline
+        Returns:
+            a Future for the result of the command's execute method
+        '''
+        if timeout is not None:
+            deadline = self.clock() + timeout
+        if self.clock is monotonic and current_deadline() is not None:
+            deadline = min(current_deadline(), deadline if deadline is not None else float('inf'))
+        instance = command_class.prepare(**(command_args or {}))
+
+        future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule commands after shutdown')
+            heapq.heappush(self._queue, (priority, next(self._sequence), self.clock(), deadline,
+                                         instance, future))
+            self.submitted += 1
+            self._condition.notify()
+        return future
+
+    def depth(self):
+        '''the number of commands waiting to be executed'''
+        return len(self._queue)
+
+    def stats(self):
+        '''
+        the queue depth, the counts of commands by outcome and a histogram of the
+        nanoseconds commands waited in the queue
+        '''
+        with self._condition:
+            return {
+                'depth': len(self._queue),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'expired': self.expirations,
+                'wait': self.wait_times.snapshot(),
+            }
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        '''
+        stops the workers once the queue is empty, or straight away cancelling the queued
+        commands if cancel_pending is set
+        '''
+        with self._condition:
+            self._shutdown = True
+            if cancel_pending:
+                for entry in self._queue:
+                    entry[-1].cancel()
+                del self._queue[:]
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+        return False
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                _, _, queued, deadline, instance, future = heapq.heappop(self._queue)
+                now = self.clock()
+                self.wait_times.record(int((now - queued) * 1e9))
+                expired = deadline is not None and deadline <= now
+                if expired:
+                    self.expirations += 1
+
+            if expired:
+                if self.expired == 'drop':
+                    future.cancel()
+                elif future.set_running_or_notify_cancel():
+                    future.set_exception(DeadlineExceeded(
+                        '{} expired before it was executed'.format(type(instance).__name__)))
+                continue
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if self.clock is monotonic:
+                    with run_deadline(at=deadline):
+                        result = instance.run_prepared()
+                else:
+                    result = instance.run_prepared()
+            except BaseException as e:
+                future.set_exception(e)
+                with self._condition:
+                    self.failed += 1
+            else:
+                future.set_result(result)
+                with self._condition:
+                    self.completed += 1
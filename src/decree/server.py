@@ -0,0 +1,227 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Serves registered commands over a unix domain or TCP socket. Requests and responses are
+sent as frames, an 8 byte header holding the length of the body and the id of the request
+followed by a json body. Requests name the command and its args as for dispatch and are
+answered with the result of the command or a description of its error, tagged with the id
+of the request so that clients may send many requests before reading their responses. Only
+the commands a server is explicitly given, by name or by namespace, are served.
+'''
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from decree.cli import describe_error
+from decree.command import lookup_command
+from decree.exceptions import UnknownCommandError
+
+# the length of the body and the id of the request of each frame
+FRAME_HEADER = struct.Struct('>II')
+
+# the largest frame body accepted, larger frames close the connection
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+def write_frame(sock, request_id, body):
+    '''sends a frame with the encoded json body'''
+    sock.sendall(FRAME_HEADER.pack(len(body), request_id) + body)
+
+
+def read_frame(stream):
+    '''
+    reads a frame from a buffered binary stream
+
+    Returns:
+        a tuple of the request id and body of the frame, or None at the end of the stream
+    '''
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    length, request_id = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError('frame of {} bytes exceeds the maximum of {}'.format(length, MAX_FRAME_SIZE))
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return request_id, body
+
+
+def encode(payload):
+    return json.dumps(payload, default=str).encode('utf-8')
+
+
+class CommandServer():
+    '''
+    Serves registered commands to CommandClients. Each connection is read by its own thread
+    while the commands are run on a shared pool of workers, so the requests sent on a single
+    connection run concurrently and may be answered in any order. A connection stops being
+    read while it has max_in_flight requests waiting to be answered.
+
+        with CommandServer(('127.0.0.1', 9000), namespaces=['billing']) as server:
+            server.serve_forever()
+
+    Requests for commands the server was not given fail as though the command was not
+    registered.
+    '''
+
+    def __init__(self, address, workers=8, commands=(), namespaces=(), max_in_flight=64):
+        '''
+        Args:
+            address: the path of a unix domain socket or a (host, port) tuple to listen on,
+                a port of 0 picks a free port
+            workers: the number of commands run at a time
+            commands: the command classes, or the names they are registered with, served
+            namespaces: the command namespaces whose commands are all served
+            max_in_flight: the most requests of a single connection waiting to be answered
+        '''
+        self.commands = frozenset(command if isinstance(command, str) else command.command_name
+                                  for command in commands)
+        self.namespaces = frozenset(namespaces)
+        if not self.commands and not self.namespaces:
+            raise ValueError('the commands or namespaces served must be given')
+        if max_in_flight < 1:
+            raise ValueError('max_in_flight must be at least 1')
+
+        if isinstance(address, str):
+            if _UnixServer is None:
+                raise ValueError('unix domain sockets are not supported on this platform')
+            server_class = _UnixServer
+        else:
+            server_class = _TCPServer
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self._server = server_class(address, _ConnectionHandler)
+        self._server.pool = self.pool
+        self._server.serves = self.serves
+        self._server.max_in_flight = max_in_flight
+        self._thread = None
+
+    def serves(self, command_name):
+        '''whether requests to run the command registered with the name are served'''
+        return command_name in self.commands or command_name.rpartition('.')[0] in self.namespaces
+
+    @property
+    def address(self):
+        '''the address the server is listening on'''
+        return self._server.server_address
+
+    def serve_forever(self, poll_interval=0.1):
+        self._server.serve_forever(poll_interval)
+
+    def start(self):
+        '''serves requests on a background thread'''
+        self._thread = threading.Thread(target=self.serve_forever, name='decree-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        self.pool.shutdown(wait=True)
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        return False
+
+
+def handle_request(body, serves):
+    '''
+    runs the command requested by a frame body, returning the encoded response body
+
+    Args:
+        body: the body of the request frame
+        serves: callable returning whether the command registered with a name is served
+    '''
+    try:
+        payload = json.loads(body.decode('utf-8'))
+        command_name = payload['command']
+        if not serves(command_name):
+            raise UnknownCommandError(command_name)
+        command_class = lookup_command(command_name)
+        # a command looked up by its module and class name must be served by its own name
+        if command_class.command_name != command_name and not serves(command_class.command_name):
+            raise UnknownCommandError(command_name)
+        result = command_class.run(**payload.get('args') or {})
+        return encode({'result': result})
+    except Exception as e:
+        return encode({'error': describe_error(e)})
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        sock = self.request
+        if sock.family != getattr(socket, 'AF_UNIX', None):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        write_lock = threading.Lock()
+        # bounds the requests waiting to be answered, once it is reached the connection is
+        # not read so that the client is held back by the socket's buffers
+        in_flight = threading.BoundedSemaphore(self.server.max_in_flight)
+        serves = self.server.serves
+
+        def respond(request_id, body):
+            try:
+                response = handle_request(body, serves)
+                with write_lock:
+                    try:
+                        write_frame(sock, request_id, response)
+                    except OSError:
+                        pass
+            finally:
+                in_flight.release()
+
+        with sock.makefile('rb') as stream:
+            while True:
+                try:
+                    frame = read_frame(stream)
+                except (OSError, ValueError):
+                    return
+                if frame is None:
+                    return
+                in_flight.acquire()
+                self.server.pool.submit(respond, *frame)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:  # pragma: no cover
+    _UnixServer = None
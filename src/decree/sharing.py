@@ -0,0 +1,173 @@
+'''
+MIT License
+
+Copyright (c) 2017 Stephen Gargan
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Passes large buffer args to worker processes through shared memory rather than pickling
+them. Buffers are copied once into a shared memory segment and only a small handle naming
+the segment is pickled, the worker maps the segment and views it in place. numpy arrays and
+memoryviews are passed to the command as views of the segment without any further copy,
+bytes and bytearrays are recreated from it.
+'''
+
+import mmap
+import sys
+from multiprocessing import shared_memory
+
+# buffers of at least this many bytes are passed through shared memory by default
+DEFAULT_SHARE_THRESHOLD = 1024 * 1024
+
+_BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+class SharedArg():
+    '''
+    picklable handle to a buffer arg copied into a shared memory segment, along with what is
+    needed to recreate the arg from it in the worker
+    '''
+
+    def __init__(self, segment_name, kind, nbytes, dtype=None, shape=None):
+        self.segment_name = segment_name
+        self.kind = kind
+        self.nbytes = nbytes
+        self.dtype = dtype
+        self.shape = shape
+
+    def attach(self):
+        '''
+        maps the segment in the worker
+
+        Returns:
+            a tuple of the recreated arg and the segment, which must be closed once the arg
+            is no longer used
+        '''
+        segment = _attach(self.segment_name)
+        view = segment.buf[:self.nbytes]
+        if self.kind == 'ndarray':
+            import numpy
+            return numpy.ndarray(self.shape, dtype=numpy.dtype(self.dtype), buffer=view), segment
+        if self.kind == 'memoryview':
+            return view.cast(self.dtype, self.shape), segment
+        try:
+            return _RECREATE[self.kind](view), segment
+        finally:
+            view.release()
+
+
+_RECREATE = {'bytes': bytes, 'bytearray': bytearray, 'mmap': bytes}
+
+
+def share_args(validated_args, threshold=DEFAULT_SHARE_THRESHOLD):
+    '''
+    copies each buffer arg of at least threshold bytes into its own shared memory segment
+
+    Returns:
+        a tuple of the args with those buffers replaced by SharedArg handles and the list of
+        segments created, which must be released once the worker is done with them
+    '''
+    shared = dict(validated_args)
+    segments = []
+    try:
+        for name, value in validated_args.items():
+            kind = _buffer_kind(value)
+            if kind is None:
+                continue
+            with memoryview(value) as view:
+                if view.nbytes < threshold or not view.c_contiguous:
+                    continue
+                segment = shared_memory.SharedMemory(create=True, size=max(view.nbytes, 1))
+                segments.append(segment)
+                segment.buf[:view.nbytes] = view.cast('B')
+                nbytes = view.nbytes
+            if kind == 'ndarray':
+                shared[name] = SharedArg(segment.name, kind, nbytes, value.dtype.str, value.shape)
+            elif kind == 'memoryview':
+                shared[name] = SharedArg(segment.name, kind, nbytes, value.format, value.shape)
+            else:
+                shared[name] = SharedArg(segment.name, kind, nbytes)
+    except BaseException:
+        release(segments)
+        raise
+    return shared, segments
+
+
+def attach_args(args):
+    '''
+    recreates the args shared by share_args in the worker
+
+    Returns:
+        a tuple of the args and the list of segments attached, to be passed to detach once
+        the command has executed
+    '''
+    if not any(isinstance(value, SharedArg) for value in args.values()):
+        return args, []
+
+    attached = dict(args)
+    segments = []
+    for name, value in args.items():
+        if isinstance(value, SharedArg):
+            attached[name], segment = value.attach()
+            segments.append(segment)
+    return attached, segments
+
+
+def detach(segments):
+    '''
+    closes the segments attached in the worker. Segments still viewed by an object the
+    command kept hold of stay mapped until the worker exits.
+    '''
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            pass
+
+
+def release(segments):
+    '''closes and removes the segments created by share_args'''
+    for segment in segments:
+        segment.close()
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _buffer_kind(value):
+    '''the kind of buffer the value is, or None if it is not one that can be shared'''
+    for buffer_type in _BUFFER_TYPES:
+        if isinstance(value, buffer_type):
+            return buffer_type.__name__
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(value, numpy.ndarray) and not value.dtype.hasobject:
+        return 'ndarray'
+    return None
+
+
+def _attach(segment_name):
+    '''
+    maps an existing segment. Worker processes share the resource tracker of the process
+    that created the segment, which removes it, so it is not tracked again where supported
+    '''
+    try:
+        return shared_memory.SharedMemory(name=segment_name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=segment_name)
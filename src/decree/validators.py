@@ -25,13 +25,90 @@ Defines the validators used by commands. Validators are defined in the required
 methods of the command.
 '''
 
+import array
+import builtins
+import importlib
 import inspect
-
+import itertools
+import json
+import mmap
+import sys
+from collections.abc import Sequence
+
+from decree.checks import ArgCheck
+from decree.checks import ArgError
 from decree.command import Command
+from decree.compiler import compile_schema_validation
+from decree.exceptions import InvalidBufferError
 from decree.exceptions import MissingRequiredError
 from decree.exceptions import NotDefiningArgsException
 from decree.exceptions import NotNoneError
+from decree.exceptions import UnexpectedElementTypeError
 from decree.exceptions import UnexpectedTypeError
+from decree.exceptions import ValidationError
+
+
+class TypeMatcher():
+    '''
+    matches the types of argument values against the type a validator expects. The expected
+    type is resolved to a class once so that the common case is a single identity check,
+    subclasses are matched via their mro and the outcome for each concrete type is cached.
+
+    The expected type may be a class, the name of a builtin type, a dotted path to a class
+    which is imported on first use, or the bare name of a class. A bare name is never
+    resolved to a single class, as classes of the same name may be defined in many modules,
+    values match it if any class in their mro has that name.
+
+    Alternative types may also be accepted, given as classes or dotted paths. Dotted
+    alternatives are never imported, a value can only be an instance of one whose module
+    has already been imported.
+    '''
+
+    def __init__(self, expected, alternatives=()):
+        self.expected = None
+        self.alternatives = alternatives
+        self._name = None
+        self._cache = {}
+
+        if inspect.isclass(expected):
+            self.expected = expected
+        elif inspect.isclass(getattr(builtins, expected, None)):
+            self.expected = getattr(builtins, expected)
+        else:
+            self._name = expected
+
+    def matches(self, actual_type):
+        '''
+        checks if values of the actual type are acceptable, caching the result per type
+        '''
+        try:
+            return self._cache[actual_type]
+        except KeyError:
+            matched = self._cache[actual_type] = self._match(actual_type)
+            return matched
+
+    def _match(self, actual_type):
+        if self.expected is None:
+            if '.' not in self._name:
+                return self._match_name(actual_type) or self._match_alternative(actual_type)
+            self.expected = self._resolve()
+        return issubclass(actual_type, self.expected) or self._match_alternative(actual_type)
+
+    def _match_alternative(self, actual_type):
+        for alternative in self.alternatives:
+            if isinstance(alternative, str):
+                module_name, _, class_name = alternative.rpartition('.')
+                alternative = getattr(sys.modules.get(module_name), class_name, None)
+            if alternative is not None and issubclass(actual_type, alternative):
+                return True
+        return False
+
+    def _match_name(self, actual_type):
+        return any(candidate.__name__ == self._name for candidate in actual_type.__mro__)
+
+    def _resolve(self):
+        module_name, _, class_name = self._name.rpartition('.')
+        return getattr(importlib.import_module(module_name), class_name)
 
 
 class CommandValidatorEnricher(type):
@@ -69,6 +146,14 @@ class Validator(metaclass=CommandValidatorEnricher):
     type, presence and possible defaults.
     '''
 
+    _matcher = None
+
+    # whether validate_contents checks the contents of values once their type is validated
+    has_contents = False
+
+    # the kinds of numpy dtype accepted for a column of this validator's values
+    dtype_kinds = None
+
     def __init__(self, name, default=None, allow_none=True):
         if not name:
             raise ValueError("validator requires a name")
@@ -88,107 +173,535 @@ class Validator(metaclass=CommandValidatorEnricher):
         '''
         raise NotImplementedError('validator must implement type_name')
 
+    def expected_type(self):
+        '''
+        the type the validator expects, either a class or the name of one. Defaults to the
+        validator's type_name.
+        '''
+        return self.type_name()
+
+    def alternative_types(self):
+        '''
+        other types the validator accepts in place of its expected type, as classes or dotted
+        paths to them. None by default.
+        '''
+        return ()
+
+    def type_matcher(self):
+        '''
+        the TypeMatcher used to check values against the expected type, created on first use
+        '''
+        if self._matcher is None:
+            self._matcher = TypeMatcher(self.expected_type(), self.alternative_types())
+        return self._matcher
+
     @classmethod
     def arg_method_names(cls):
         return []
 
+    @property
+    def inlinable(self):
+        '''
+        whether a command may inline this validator's checks into its compiled validation
+        function. Validators that customise validate or validate_type are called instead.
+        '''
+        validator_class = type(self)
+        return (validator_class.validate is Validator.validate and
+                validator_class.validate_type is Validator.validate_type)
+
     def validate_type(self, name, value):
-        actual_type = type(value).__name__
-        if not actual_type == self.type_name():
-            raise UnexpectedTypeError(name, self.type_name(), actual_type)
+        matcher = self._matcher or self.type_matcher()
+        actual_type = type(value)
+        if actual_type is not matcher.expected and not matcher.matches(actual_type):
+            raise UnexpectedTypeError(name, self.type_name(), actual_type.__name__)
         return value
 
+    def string_converter(self):
+        '''
+        the callable converting the text of a value, as read from a csv file, to a value of
+        the expected type, raising ValueError if it cannot. None if values cannot be read
+        from text.
+        '''
+        return None
+
+    def validate_contents(self, value):
+        '''
+        validates the contents of a value already known to be of the expected type, raising
+        a ValidationError if they are invalid. Only called if has_contents is set.
+
+        Returns:
+            the validated value
+        '''
+        return value
+
+    def check(self, args):
+        '''
+        checks the arg without raising, returning an ArgCheck holding either its validated
+        value or the error found. Validators that customise validate are checked by calling it.
+        '''
+        if type(self).validate is not Validator.validate:
+            try:
+                return ArgCheck(self.validate(args))
+            except ValidationError as e:
+                return ArgCheck(error=ArgError.from_exception(e))
+        return self._check(args)
+
     def validate(self, args):
-        present = self.name in args
-        if present:
-            value = args[self.name]
-            if not (self.allow_none or value):
-                raise NotNoneError(self.name)
-            return self.validate_type(self.name, value)
-        else:
+        result = self._check(args)
+        if result.error is not None:
+            raise result.error.exception()
+        return result.value
+
+    def _check(self, args):
+        name = self.name
+        if name not in args:
             if not self.default:
-                raise MissingRequiredError(self.name)
-            return self.default
+                return ArgCheck(error=ArgError(MissingRequiredError, (name,)))
+            return ArgCheck(self.default)
+
+        value = args[name]
+        if not (self.allow_none or value):
+            return ArgCheck(error=ArgError(NotNoneError, (name,)))
+
+        if type(self).validate_type is not Validator.validate_type:
+            try:
+                return ArgCheck(self.validate_type(name, value))
+            except ValidationError as e:
+                return ArgCheck(error=ArgError.from_exception(e))
+
+        matcher = self._matcher or self.type_matcher()
+        actual_type = type(value)
+        if actual_type is not matcher.expected and not matcher.matches(actual_type):
+            return ArgCheck(error=ArgError(UnexpectedTypeError, (name, self.type_name(), actual_type.__name__)))
+        if self.has_contents:
+            try:
+                return ArgCheck(self.validate_contents(value))
+            except ValidationError as e:
+                return ArgCheck(error=ArgError.from_exception(e))
+        return ArgCheck(value)
 
 
 class IntValidator(Validator):
+    dtype_kinds = 'iu'
+
     def type_name(self):
         return "int"
 
+    def string_converter(self):
+        return int
+
     @classmethod
     def arg_method_names(cls):
         return ['int', 'integer']
 
 
 class BooleanValidator(Validator):
+    dtype_kinds = 'b'
+
     def type_name(self):
         return "bool"
 
+    def string_converter(self):
+        return parse_bool
+
     @classmethod
     def arg_method_names(cls):
         return ['bool', 'boolean']
 
 
 class StringValidator(Validator):
+    dtype_kinds = 'U'
+
     def type_name(self):
         return "str"
 
+    def string_converter(self):
+        return _identity
+
     @classmethod
     def arg_method_names(cls):
         return ['string', 'str']
 
 
 class FloatValidator(Validator):
+    dtype_kinds = 'f'
+
     def type_name(self):
         return "float"
 
+    def string_converter(self):
+        return float
+
     @classmethod
     def arg_method_names(cls):
         return ['float']
 
 
-class DictValidator(Validator):
+# the kinds of numpy dtype holding values of each builtin type
+_DTYPE_KINDS = {bool: 'b', int: 'iu', float: 'f', complex: 'c', str: 'U', bytes: 'S'}
+
+# the builtin type of the values held by arrays of each array.array typecode
+_TYPECODE_TYPES = dict([(typecode, int) for typecode in 'bBhHiIlLqQ'] +
+                       [(typecode, float) for typecode in 'fd'] +
+                       [(typecode, str) for typecode in 'uw'])
+
+
+class ContainerValidator(Validator):
+    '''
+    Base validator of containers whose elements may also be type checked. Elements are
+    checked once for each distinct type among them rather than once per element, and when
+    a sample size is given only that many elements, spread across the container, are checked.
+    '''
+
+    def __init__(self, name, default=None, allow_none=True, sample=None):
+        if sample is not None and sample < 1:
+            raise ValueError("sample must be at least 1")
+
+        self.sample = sample
+        self._element_matchers = self.element_matchers()
+        super().__init__(name, default, allow_none)
+
+        if self.default and self.has_contents:
+            self.validate_contents(default)
+
+    def string_converter(self):
+        return json.loads
+
+    def element_matchers(self):
+        '''
+        the (part, TypeMatcher, elements getter) triples checked for a container, where part
+        names what is checked, e.g. 'elements', and the getter returns them from the container
+        '''
+        return []
+
+    def validate_contents(self, value):
+        for part, matcher, elements in self._element_matchers:
+            self.check_elements(part, matcher, elements(value))
+        return value
+
+    def check_elements(self, part, matcher, elements):
+        '''raises an UnexpectedElementTypeError if any of the elements are not of the matched type'''
+        expected = matcher.expected
+        for element_type in set(map(type, self.sampled(elements))):
+            if element_type is not expected and not matcher.matches(element_type):
+                raise UnexpectedElementTypeError(self.name, _type_label(matcher),
+                                                 element_type.__name__, part)
+
+    def sampled(self, elements):
+        '''the elements to check, a sample of them evenly spread across sequences if sampling'''
+        sample = self.sample
+        if sample is None or len(elements) <= sample:
+            return elements
+        if isinstance(elements, Sequence) or hasattr(elements, 'dtype'):
+            return elements[::-(-len(elements) // sample)]
+        return itertools.islice(elements, sample)
+
+    @property
+    def has_contents(self):
+        return bool(self._element_matchers)
+
+
+class DictValidator(ContainerValidator):
+    '''
+    validates dict args, optionally checking the types of their keys and values or
+    validating them against a schema. A schema maps the name of each field to the validator
+    of that field, or to a validator class which is created for the field, and may nest
+    further dict validators with schemas of their own.
+
+        cmd.dict('config', schema={
+            'port': IntValidator('port', default=8080),
+            'db': DictValidator('db', schema={'user': StringValidator}),
+        })
+
+    The schema is compiled into a single validation function when the validator is created.
+    '''
+
+    def __init__(self, name, default=None, allow_none=True, keys=None, values=None, sample=None,
+                 schema=None):
+        if schema and (keys is not None or values is not None):
+            raise ValueError("schema cannot be combined with keys or values")
+
+        self.keys = keys
+        self.values = values
+        self.schema = _schema_fields(schema) if schema else None
+        self._validate_schema = compile_schema_validation(self.schema, name) if schema else None
+        super().__init__(name, default, allow_none, sample)
+
     def type_name(self):
         return "dict"
 
+    def element_matchers(self):
+        matchers = []
+        if self.keys is not None:
+            matchers.append(('keys', TypeMatcher(self.keys), _identity))
+        if self.values is not None:
+            matchers.append(('values', TypeMatcher(self.values), dict.values))
+        return matchers
+
+    @property
+    def has_contents(self):
+        return self.schema is not None or bool(self._element_matchers)
+
+    def validate_contents(self, value):
+        if self._validate_schema is not None:
+            return self._validate_schema(value)
+        return super().validate_contents(value)
+
     @classmethod
     def arg_method_names(cls):
         return ['dict', 'map']
 
 
-class SetValidator(Validator):
+def _schema_fields(schema):
+    '''the validator of each field of a schema, creating those given as validator classes'''
+    fields = {}
+    for key, field in schema.items():
+        if inspect.isclass(field):
+            field = field(key)
+        elif field.name != key:
+            raise ValueError("schema field '{}' has a validator named '{}'".format(key, field.name))
+        fields[key] = field
+    return fields
+
+
+class SetValidator(ContainerValidator):
+
+    def __init__(self, name, default=None, allow_none=True, of=None, sample=None):
+        self.of = of
+        super().__init__(name, default, allow_none, sample)
+
     def type_name(self):
         return "set"
 
+    def element_matchers(self):
+        if self.of is None:
+            return []
+        return [('elements', TypeMatcher(self.of), _identity)]
+
+    def string_converter(self):
+        return _parse_json_set
+
     @classmethod
     def arg_method_names(cls):
         return ['set']
 
 
-class ListValidator(Validator):
+class ListValidator(ContainerValidator):
+    '''
+    validates list args. Lists with a type for their elements also accept array.array and
+    numpy arrays whose typecode or dtype holds values of that type, which are checked without
+    scanning their elements.
+    '''
+
+    def __init__(self, name, default=None, allow_none=True, of=None, sample=None):
+        self.of = of
+        super().__init__(name, default, allow_none, sample)
+
     def type_name(self):
         return "list"
 
+    def alternative_types(self):
+        if self.of is None:
+            return ()
+        return (array.array, 'numpy.ndarray')
+
+    def element_matchers(self):
+        if self.of is None:
+            return []
+        return [('elements', TypeMatcher(self.of), _identity)]
+
+    def validate_contents(self, value):
+        if type(value) is list:
+            return super().validate_contents(value)
+
+        _, matcher, _ = self._element_matchers[0]
+        if isinstance(value, array.array):
+            element_type = _TYPECODE_TYPES.get(value.typecode, object)
+            if not matcher.matches(element_type):
+                raise UnexpectedElementTypeError(self.name, _type_label(matcher),
+                                                 element_type.__name__)
+            return value
+
+        dtype = getattr(value, 'dtype', None)
+        if dtype is None:
+            return super().validate_contents(value)
+        if dtype.kind == 'O':
+            self.check_elements('elements', matcher, value.ravel())
+        elif dtype.kind not in _dtype_kinds(matcher):
+            raise UnexpectedElementTypeError(self.name, _type_label(matcher), str(dtype))
+        return value
+
     @classmethod
     def arg_method_names(cls):
         return ['list', 'array']
 
 
+def _identity(value):
+    return value
+
+
+# the text read as each boolean value, compared case insensitively
+_BOOLEAN_STRINGS = {'true': True, 't': True, 'yes': True, 'y': True, 'on': True, '1': True,
+                    'false': False, 'f': False, 'no': False, 'n': False, 'off': False, '0': False}
+
+
+def parse_bool(text):
+    '''reads a boolean from text such as true, no or 1, raising ValueError for any other text'''
+    try:
+        return _BOOLEAN_STRINGS[text.strip().lower()]
+    except KeyError:
+        raise ValueError('invalid boolean {!r}'.format(text)) from None
+
+
+def _parse_json_set(text):
+    return set(json.loads(text))
+
+
+def _type_label(matcher):
+    if matcher.expected is not None:
+        return matcher.expected.__name__
+    return matcher._name
+
+
+def _dtype_kinds(matcher):
+    '''the kinds of numpy dtype holding values of the matched type'''
+    if matcher.expected is None:
+        return ''
+    return ''.join(kinds for value_type, kinds in _DTYPE_KINDS.items()
+                   if issubclass(value_type, matcher.expected))
+
+
 class ObjectValidator(Validator):
 
     def __init__(self, name, type=None, default=None, allow_none=True):
-        super().__init__(name, default, allow_none)
         if not type:
             raise ValueError("Object validator requires a type argument")
 
+        self.object_type = type
         if inspect.isclass(type):
             self.type = type.__name__
         else:
             self.type = type
+        super().__init__(name, default, allow_none)
 
     def type_name(self):
         return self.type
 
+    def expected_type(self):
+        return self.object_type
+
     @classmethod
     def arg_method_names(cls):
         return ['object', 'type']
+
+
+class BufferValidator(Validator):
+    '''
+    validates args exposing the buffer protocol, such as bytes, bytearray, memoryview, array,
+    mmap and numpy arrays. Their size and layout are checked through a memoryview of the
+    buffer so the data itself is never copied.
+    '''
+
+    def __init__(self, name, default=None, allow_none=True, min_size=None, max_size=None,
+                 contiguous=False):
+        '''
+        Args:
+            min_size: the fewest bytes the buffer may hold
+            max_size: the most bytes the buffer may hold
+            contiguous: whether the buffer must be C contiguous
+        '''
+        self.min_size = min_size
+        self.max_size = max_size
+        self.contiguous = contiguous
+        super().__init__(name, default, allow_none)
+
+    def type_name(self):
+        return "buffer"
+
+    def expected_type(self):
+        return memoryview
+
+    def alternative_types(self):
+        return (bytes, bytearray, array.array, mmap.mmap, 'numpy.ndarray')
+
+    @property
+    def has_contents(self):
+        return self.min_size is not None or self.max_size is not None or self.contiguous
+
+    def validate_contents(self, value):
+        with memoryview(value) as view:
+            check_buffer_layout(self.name, view.nbytes, view.c_contiguous, self.min_size,
+                                self.max_size, self.contiguous)
+        return value
+
+    @classmethod
+    def arg_method_names(cls):
+        return ['buffer']
+
+
+class NdarrayValidator(Validator):
+    '''
+    validates numpy array args, optionally checking their dtype, shape, size and layout
+    without copying them. Shapes may use None for dimensions of any length. Requires numpy.
+    '''
+
+    def __init__(self, name, default=None, allow_none=True, dtype=None, shape=None,
+                 min_size=None, max_size=None, contiguous=False):
+        '''
+        Args:
+            dtype: the dtype the array must have, anything numpy.dtype accepts
+            shape: the shape the array must have, a tuple of lengths or None for any length
+            min_size: the fewest bytes the array may hold
+            max_size: the most bytes the array may hold
+            contiguous: whether the array must be C contiguous
+        '''
+        try:
+            numpy = importlib.import_module('numpy')
+        except ImportError:
+            raise ValueError("ndarray validator requires numpy, install decree[numpy]") from None
+
+        self.dtype = numpy.dtype(dtype) if dtype is not None else None
+        self.shape = tuple(shape) if shape is not None else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.contiguous = contiguous
+        super().__init__(name, default, allow_none)
+
+    def type_name(self):
+        return "ndarray"
+
+    def expected_type(self):
+        return 'numpy.ndarray'
+
+    @property
+    def has_contents(self):
+        return (self.dtype is not None or self.shape is not None or self.min_size is not None or
+                self.max_size is not None or self.contiguous)
+
+    def validate_contents(self, value):
+        name = self.name
+        if self.dtype is not None and value.dtype != self.dtype:
+            raise InvalidBufferError(name, "must have dtype '{}' but has '{}'".format(self.dtype, value.dtype))
+
+        shape = self.shape
+        if shape is not None and (len(shape) != value.ndim or any(
+                expected is not None and expected != actual for expected, actual in zip(shape, value.shape))):
+            raise InvalidBufferError(name, 'must have shape {} but has {}'.format(shape, value.shape))
+
+        check_buffer_layout(name, value.nbytes, value.flags.c_contiguous, self.min_size,
+                            self.max_size, self.contiguous)
+        return value
+
+    @classmethod
+    def arg_method_names(cls):
+        return ['ndarray']
+
+
+def check_buffer_layout(name, nbytes, c_contiguous, min_size, max_size, contiguous):
+    '''raises an InvalidBufferError if a buffer's size or layout is not as required'''
+    if min_size is not None and nbytes < min_size:
+        raise InvalidBufferError(name, 'must hold at least {} bytes but holds {}'.format(min_size, nbytes))
+    if max_size is not None and nbytes > max_size:
+        raise InvalidBufferError(name, 'must hold at most {} bytes but holds {}'.format(max_size, nbytes))
+    if contiguous and not c_contiguous:
+        raise InvalidBufferError(name, 'must be contiguous')
@@ -0,0 +1,72 @@
+import asyncio
+import io
+
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.aio import AsyncCommand
+from decree.aio import run_concurrently
+from decree.exceptions import MissingRequiredError
+
+
+class SleepCommand(AsyncCommand):
+    in_flight = 0
+    max_in_flight = 0
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+        cmd.float('delay', default=0.01)
+
+    async def validate(self):
+        if self.someint < 0:
+            raise ValueError('someint must not be negative')
+
+    async def execute(self):
+        cls = type(self)
+        cls.in_flight += 1
+        cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        await asyncio.sleep(self.delay)
+        cls.in_flight -= 1
+        return self.someint * 2
+
+
+def test_run_async():
+    assert asyncio.run(SleepCommand.run_async(someint=21)) == 42
+
+
+def test_run_async_validates_args():
+    with raises(MissingRequiredError):
+        asyncio.run(SleepCommand.run_async())
+    with raises(ValueError, match='someint must not be negative'):
+        asyncio.run(SleepCommand.run_async(someint=-1))
+
+
+def test_async_command_cannot_be_run_synchronously():
+    with raises(TypeError, match='SleepCommand is asynchronous, use run_async to run it'):
+        SleepCommand.run(someint=1)
+
+
+def test_async_command_cannot_be_run_over_columns_files_or_executors():
+    with raises(TypeError, match='cannot be run over columns'):
+        SleepCommand.run_columns({'someint': [1, 2]})
+    with raises(TypeError, match='cannot be run over a file'):
+        SleepCommand.ingest(io.StringIO('someint\n1\n'))
+    with raises(TypeError, match='cannot be prepared'):
+        SleepCommand.prepare(someint=1)
+
+
+def test_run_many_async_limits_concurrency():
+    SleepCommand.max_in_flight = 0
+    batch = asyncio.run(SleepCommand.run_many_async(({'someint': i} for i in range(20)), concurrency=5))
+    assert batch.ok
+    assert batch.results == [i * 2 for i in range(20)]
+    assert SleepCommand.max_in_flight == 5
+
+
+def test_run_concurrently_records_errors():
+    invocations = [(SleepCommand, {'someint': 1}), (SleepCommand, {}), (SleepCommand, {'someint': -1})]
+    batch = asyncio.run(run_concurrently(invocations, concurrency=2))
+    assert batch.results == [2, None, None]
+    assert isinstance(batch.errors[1], MissingRequiredError)
+    assert isinstance(batch.errors[2], ValueError)
@@ -0,0 +1,48 @@
+import json
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.cli import main
+from decree.cli import run_lines
+from decree.command import Command
+
+
+class DoubleCommand(Command):
+    command_namespace = 'cli'
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+
+    def execute(self):
+        return self.someint * 2
+
+
+def invocation(someint):
+    return json.dumps({'command': 'cli.DoubleCommand', 'args': {'someint': someint}})
+
+
+def test_run_lines_reports_results_and_errors():
+    outcomes = list(run_lines([invocation(1), '', invocation('x'), 'not json',
+                               '{"command": "cli.Missing"}']))
+    assert outcomes[0] == {'result': 2}
+    assert outcomes[1]['error']['code'] == 'unexpected_type'
+    assert outcomes[2]['error']['type'] == 'JSONDecodeError'
+    assert outcomes[3]['error'] == {'type': 'UnknownCommandError',
+                                    'message': "No command is registered as 'cli.Missing'"}
+
+
+def test_run_lines_in_parallel_keeps_order():
+    outcomes = run_lines((invocation(number) for number in range(100)), workers=4)
+    assert [outcome['result'] for outcome in outcomes] == [number * 2 for number in range(100)]
+
+
+def test_main_streams_a_file_of_invocations(tmpdir):
+    source = tmpdir.join('invocations.jsonl')
+    source.write('\n'.join([invocation(1), invocation(2)]))
+    output = tmpdir.join('outcomes.jsonl')
+
+    assert main([str(source), '--output', str(output), '--workers', '2']) == 0
+    assert output.read().splitlines() == ['{"result": 2}', '{"result": 4}']
+
+    source.write(invocation('x'))
+    assert main([str(source), '--output', str(output)]) == 1
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.aio import AsyncCommand
+from decree.coalesce import single_flight
+from decree.command import Command
+from decree.memo import memoize
+
+
+@single_flight
+class SlowCommand(Command):
+    executions = 0
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+        cmd.object('release', type=threading.Event)
+
+    def execute(self):
+        type(self).executions += 1
+        self.release.wait(5)
+        if self.someint < 0:
+            raise ValueError('someint must not be negative')
+        return self.someint * 2
+
+
+def run_concurrently(someint, callers=5):
+    release = threading.Event()
+    results = []
+    errors = []
+
+    def call():
+        try:
+            results.append(SlowCommand.run(someint=someint, release=release))
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    while SlowCommand.flights.stats()['coalesced'] < callers - 1:
+        threading.Event().wait(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_runs_with_equal_args_share_one_execution():
+    SlowCommand.executions = 0
+    results, errors = run_concurrently(21)
+    assert results == [42] * 5
+    assert errors == []
+    assert SlowCommand.executions == 1
+    assert len(SlowCommand.flights) == 0
+
+
+def test_concurrent_runs_share_the_exception():
+    results, errors = run_concurrently(-1)
+    assert results == []
+    assert len(errors) == 5
+    assert len(set(map(id, errors))) == 1
+
+
+def test_completed_runs_are_not_cached():
+    SlowCommand.executions = 0
+    release = threading.Event()
+    release.set()
+    SlowCommand.run(someint=1, release=release)
+    SlowCommand.run(someint=1, release=release)
+    assert SlowCommand.executions == 2
+
+
+@single_flight
+class AsyncSlowCommand(AsyncCommand):
+    executions = 0
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+
+    async def execute(self):
+        type(self).executions += 1
+        await asyncio.sleep(0.01)
+        if self.someint < 0:
+            raise ValueError('someint must not be negative')
+        return self.someint * 2
+
+
+def test_concurrent_async_runs_share_one_execution():
+    async def run_all(someint):
+        return await asyncio.gather(*(AsyncSlowCommand.run_async(someint=someint) for _ in range(5)),
+                                    return_exceptions=True)
+
+    AsyncSlowCommand.executions = 0
+    assert asyncio.run(run_all(21)) == [42] * 5
+    assert AsyncSlowCommand.executions == 1
+
+    errors = asyncio.run(run_all(-1))
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert AsyncSlowCommand.executions == 2
+    with raises(TypeError, match='AsyncSlowCommand is asynchronous'):
+        AsyncSlowCommand.run(someint=1)
+
+
+@single_flight
+@memoize
+class SlowMemoizedCommand(SlowCommand):
+    pass
+
+
+def test_single_flight_stacks_with_memoize():
+    assert SlowMemoizedCommand.run_wrappers == (SlowMemoizedCommand.result_cache, SlowMemoizedCommand.flights)
+    assert SlowCommand.run_wrappers == (SlowCommand.flights,)
+    SlowMemoizedCommand.executions = 0
+    release = threading.Event()
+    release.set()
+    assert SlowMemoizedCommand.run(someint=2, release=release) == 4
+    assert SlowMemoizedCommand.run(someint=2, release=release) == 4
+    assert SlowMemoizedCommand.executions == 1
+    assert SlowMemoizedCommand.flights.stats()['leaders'] == 2
@@ -0,0 +1,84 @@
+from pytest import mark
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.columns import numpy
+from decree.command import Command
+from decree.exceptions import MissingRequiredError
+from decree.exceptions import NotNoneError
+from decree.exceptions import UnexpectedTypeError
+
+needs_numpy = mark.skipif(numpy is None, reason='numpy is not installed')
+
+
+class AddCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('left')
+        cmd.int('right', default=10, allow_none=False)
+        cmd.string('label', default='sum')
+
+    def execute(self):
+        return '{}={}'.format(self.label, self.left + self.right)
+
+
+class ColumnarAddCommand(AddCommand):
+    columnar = True
+
+    def execute(self):
+        return [left + right for left, right in zip(self.left, self.right)]
+
+
+def test_run_columns_runs_each_row():
+    batch = AddCommand.run_columns({'left': [1, 2, 3], 'right': [4, 5, 6]})
+    assert batch.ok
+    assert batch.results == ['sum=5', 'sum=7', 'sum=9']
+
+
+def test_run_columns_broadcasts_defaults():
+    assert AddCommand.run_columns({'left': [1, 2]}).results == ['sum=11', 'sum=12']
+
+
+def test_run_columns_requires_columns_without_defaults():
+    with raises(MissingRequiredError, match="Argument 'left' not present in command args"):
+        AddCommand.run_columns({'right': [1, 2]})
+
+
+def test_run_columns_requires_columns_of_equal_length():
+    with raises(ValueError, match=r'columns must all be of the same length, found lengths \[1, 2\]'):
+        AddCommand.run_columns({'left': [1, 2], 'right': [1]})
+
+
+def test_run_columns_checks_types_per_column():
+    with raises(UnexpectedTypeError, match="Expected 'left' to be of type 'int' but was 'str'"):
+        AddCommand.run_columns({'left': [1, 'two', 3]})
+
+
+def test_run_columns_checks_not_none_per_column():
+    with raises(NotNoneError, match="Argument 'right' may not be None"):
+        AddCommand.run_columns({'left': [1, 2], 'right': [1, None]})
+
+
+def test_columnar_command_executes_whole_columns():
+    assert ColumnarAddCommand.run_columns({'left': [1, 2], 'right': [3, 4]}) == [4, 6]
+
+
+@needs_numpy
+def test_run_columns_checks_numpy_dtypes():
+    batch = AddCommand.run_columns({'left': numpy.arange(3), 'right': numpy.ones(3, dtype='int32')})
+    assert batch.results == ['sum=1', 'sum=2', 'sum=3']
+
+    with raises(UnexpectedTypeError, match="Expected 'left' to be of type 'int' but was 'float64'"):
+        AddCommand.run_columns({'left': numpy.ones(3)})
+
+
+@needs_numpy
+def test_run_columns_masks_nulls_in_numpy_columns():
+    with raises(NotNoneError, match="Argument 'right' may not be None"):
+        AddCommand.run_columns({'left': numpy.arange(2), 'right': numpy.array([1, None], dtype=object)})
+
+
+@needs_numpy
+def test_columnar_command_receives_numpy_columns():
+    result = ColumnarAddCommand.run_columns({'left': numpy.arange(2), 'right': numpy.arange(1, 3)})
+    assert result == [1, 3]
@@ -25,8 +25,21 @@ SOFTWARE.
 from pytest import raises
 
 from decree.command import Command
+from decree.command import RunWrapper
+from decree.command import add_run_wrapper
+from decree.command import dispatch
+from decree.command import finalize_all
+from decree.command import lookup_command
+from decree.command import registered_commands
+from decree.exceptions import AmbiguousCommandError
 from decree.exceptions import MissingRequiredError
 from decree.exceptions import NotDefiningArgsException
+from decree.exceptions import NotNoneError
+from decree.exceptions import UnexpectedElementTypeError
+from decree.exceptions import UnexpectedTypeError
+from decree.exceptions import UnknownCommandError
+from decree.validators import DictValidator
+from decree.validators import IntValidator
 
 
 def test_basic_run_with_no_args():
@@ -123,3 +136,452 @@ def test_nested_command_has_parents_validators():
 
 def test_args_can_be_redefined_in_subcommands():
     assert RedefiningCommand.run() == 3456
+
+
+def test_args_are_validated_by_compiled_function():
+    assert 'someint' in RedefiningCommand._validate_args.source
+    assert RedefiningCommand._validate_args is not BaseCommand._validate_args
+
+
+class ManyArgsCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+        cmd.string('somestring', default='blah')
+        cmd.float('somefloat', allow_none=False)
+
+    def execute(self):
+        return [self.someint, self.somestring, self.somefloat]
+
+
+class InterpretedArgsCommand(ManyArgsCommand):
+    compile_args = False
+
+
+def test_compiled_and_interpreted_validation_are_equivalent():
+    for command in (ManyArgsCommand, InterpretedArgsCommand):
+        assert command.run(someint=1, somefloat=1.5) == [1, 'blah', 1.5]
+        assert command.run(someint=1, somestring='s', somefloat=1.5) == [1, 's', 1.5]
+
+        with raises(MissingRequiredError, match="Argument 'someint' not present"):
+            command.run(somefloat=1.5)
+        with raises(NotNoneError, match="Argument 'somefloat' may not be None"):
+            command.run(someint=1, somefloat=None)
+        with raises(UnexpectedTypeError,
+                    match="Expected 'somestring' to be of type 'str' but was 'int'"):
+            command.run(someint=1, somestring=2, somefloat=1.5)
+
+
+class EvenValidator(IntValidator):
+    @classmethod
+    def arg_method_names(cls):
+        return ['even']
+
+    def validate(self, args):
+        value = super().validate(args)
+        if value % 2:
+            raise ValueError('{} must be even'.format(self.name))
+        return value
+
+
+class CustomValidatorCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.even('someint')
+
+    def execute(self):
+        return self.someint
+
+
+def test_customised_validators_are_called_by_compiled_function():
+    assert CustomValidatorCommand.run(someint=4) == 4
+    with raises(ValueError, match='someint must be even'):
+        CustomValidatorCommand.run(someint=3)
+
+
+def test_run_many_runs_each_set_of_args():
+    batch = ManyArgsCommand.run_many({'someint': i, 'somefloat': 1.5} for i in range(3))
+    assert batch.ok
+    assert batch.results == [[0, 'blah', 1.5], [1, 'blah', 1.5], [2, 'blah', 1.5]]
+
+
+def test_run_many_records_errors_without_aborting():
+    batch = ManyArgsCommand.run_many([{'someint': 1, 'somefloat': 1.5},
+                                      {'somefloat': 1.5},
+                                      {'someint': 3, 'somefloat': 1.5}])
+    assert not batch.ok
+    assert batch.results == [[1, 'blah', 1.5], None, [3, 'blah', 1.5]]
+    assert list(batch.errors) == [1]
+    assert isinstance(batch.errors[1], MissingRequiredError)
+
+
+def test_run_many_can_stop_on_first_error():
+    batch = ManyArgsCommand.run_many([{'someint': 1, 'somefloat': 1.5},
+                                      {'someint': 'x', 'somefloat': 1.5},
+                                      {'someint': 3, 'somefloat': 1.5}], stop_on_error=True)
+    assert batch.results == [[1, 'blah', 1.5], None]
+    assert isinstance(batch.errors[1], UnexpectedTypeError)
+
+
+class SlottedCommand(Command):
+    slotted_args = True
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+        cmd.string('somestring', default='blah')
+
+    def execute(self):
+        return [self.someint, self.somestring]
+
+
+class NestedSlottedCommand(SlottedCommand):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('anotherint', default=2345)
+
+    def execute(self):
+        return [self.someint, self.somestring, self.anotherint]
+
+
+class SlottedRawArgsCommand(SlottedCommand):
+    keep_raw_args = True
+
+    def execute(self):
+        return self.raw_args
+
+
+def test_slotted_args_are_stored_in_slots():
+    assert SlottedCommand.__slots__ == ('someint', 'somestring')
+    assert NestedSlottedCommand.__slots__ == ('anotherint',)
+    assert SlottedCommand.run(someint=1) == [1, 'blah']
+    assert NestedSlottedCommand.run(someint=1) == [1, 'blah', 2345]
+
+    instance = NestedSlottedCommand.prepare(someint=1)
+    assert not hasattr(instance, '__dict__')
+    assert not hasattr(instance, 'raw_args')
+
+
+def test_slotted_args_keep_raw_args_when_asked():
+    assert SlottedRawArgsCommand.run(someint=1) == {'someint': 1}
+
+
+def test_slotted_args_are_validated():
+    with raises(MissingRequiredError):
+        SlottedCommand.run()
+    with raises(UnexpectedTypeError):
+        SlottedCommand.run(someint='1')
+
+
+def test_slotted_args_must_be_identifiers():
+    with raises(ValueError, match="Slotted command args must be identifiers, 'some-int' is not"):
+        class BadlyNamedCommand(Command):
+            slotted_args = True
+
+            @classmethod
+            def command_args(cmd):
+                cmd.int('some-int')
+
+
+def test_slotted_args_cannot_be_keywords():
+    with raises(ValueError, match="Slotted command args cannot be keywords, 'class' is one"):
+        class KeywordCommand(Command):
+            slotted_args = True
+
+            @classmethod
+            def command_args(cmd):
+                cmd.int('class')
+
+
+def test_slotted_commands_are_defined_once():
+    calls = []
+
+    class Counted(Command):
+        def __init_subclass__(cls, **kwargs):
+            super().__init_subclass__(**kwargs)
+            calls.append('subclassed')
+
+    class CountedSlottedCommand(Counted):
+        slotted_args = True
+        limit = 3
+
+        @classmethod
+        def command_args(cmd):
+            calls.append('command_args')
+            cmd.int('someint', default=cmd.limit)
+
+    assert calls == ['command_args', 'subclassed']
+    assert CountedSlottedCommand.__slots__ == ('someint',)
+    assert CountedSlottedCommand.run() is None
+    assert CountedSlottedCommand.prepare().someint == 3
+
+
+def test_the_base_command_can_be_run():
+    assert Command.run() is None
+    assert Command.prepare(unused=1).validated_args() == {}
+
+
+class LazyCommand(Command):
+    lazy_args = True
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+        cmd.string('somestring', default='blah')
+        cmd.float('somefloat', allow_none=False, default=1.5)
+
+    def execute(self):
+        return self.someint
+
+
+def test_lazy_args_check_presence_eagerly():
+    with raises(MissingRequiredError, match="Argument 'someint' not present in command args"):
+        LazyCommand.run(somestring='s')
+
+
+def test_lazy_args_are_validated_when_read():
+    assert LazyCommand.run(someint=1, somestring=2) == 1
+
+    instance = LazyCommand.prepare(someint=1, somestring=2, somefloat=None)
+    assert 'somestring' not in instance.__dict__
+    with raises(UnexpectedTypeError, match="Expected 'somestring' to be of type 'str' but was 'int'"):
+        instance.somestring
+    with raises(NotNoneError, match="Argument 'somefloat' may not be None"):
+        instance.somefloat
+
+
+def test_lazy_args_are_cached_and_defaulted():
+    instance = LazyCommand.prepare(someint=1)
+    assert instance.somestring == 'blah'
+    assert instance.__dict__['somestring'] == 'blah'
+    assert instance.validated_args() == {'someint': 1, 'somestring': 'blah', 'somefloat': 1.5}
+
+
+def test_lazy_args_cannot_be_slotted():
+    with raises(TypeError, match='LazySlottedCommand cannot have both lazy_args and slotted_args'):
+        class LazySlottedCommand(Command):
+            lazy_args = True
+            slotted_args = True
+
+
+def test_validators_are_shared_with_parent_commands():
+    assert NestedCommand.validators.maps[1] is BaseCommand.validators.maps[0]
+    assert list(NestedCommand.validators.maps[0]) == ['anotherint']
+    assert list(FurtherNestedCommand.validators) == ['someint', 'anotherint', 'somestring']
+    assert list(RedefiningCommand.validators.maps[0]) == ['someint']
+
+
+def deferred_command():
+    class DeferredCommand(Command):
+        defer_args = True
+        definitions = 0
+
+        @classmethod
+        def command_args(cmd):
+            cmd.definitions += 1
+            cmd.int('someint', default=1234)
+
+        def execute(self):
+            return self.someint
+
+    class NestedDeferredCommand(DeferredCommand):
+        @classmethod
+        def command_args(cmd):
+            cmd.int('anotherint', default=2345)
+
+        def execute(self):
+            return [self.someint, self.anotherint]
+
+    return DeferredCommand, NestedDeferredCommand
+
+
+def test_deferred_args_are_defined_on_first_run():
+    command, nested = deferred_command()
+    assert command.definitions == 0
+    assert nested.run() == [1234, 2345]
+    assert command.definitions == 1
+    assert command.run(someint=1) == 1
+    assert command.definitions == 1
+
+
+def test_deferred_args_are_defined_when_validators_are_read():
+    command, _ = deferred_command()
+    assert list(command.validators) == ['someint']
+    assert command.definitions == 1
+
+
+def test_finalize_all_defines_deferred_args():
+    command, nested = deferred_command()
+    finalize_all()
+    assert command.definitions == 1
+    assert list(nested.validators) == ['someint', 'anotherint']
+    assert nested.run(anotherint=1) == [1234, 1]
+
+
+def test_check_collects_all_arg_errors():
+    for command in (ManyArgsCommand, InterpretedArgsCommand):
+        result = command.check(somestring=2, somefloat=None)
+        assert not result.ok
+        assert result.codes == {'someint': 'missing', 'somestring': 'unexpected_type',
+                                'somefloat': 'not_none'}
+        assert [error.message for error in result.errors] == [
+            "Argument 'someint' not present in command args",
+            "Expected 'somestring' to be of type 'str' but was 'int'",
+            "Argument 'somefloat' may not be None",
+        ]
+        with raises(MissingRequiredError):
+            result.raise_for_errors()
+
+
+def test_check_returns_validated_values():
+    result = ManyArgsCommand.check(someint=1, somefloat=1.5)
+    assert result.ok
+    assert result.values == {'someint': 1, 'somestring': 'blah', 'somefloat': 1.5}
+
+
+def test_check_records_errors_of_customised_validators():
+    result = CustomValidatorCommand.check(someint='1')
+    assert result.codes == {'someint': 'unexpected_type'}
+
+
+class ElementTypedCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.list('ids', of=int)
+        cmd.dict('weights', keys=str, values=float, default={'a': 1.0})
+
+    def execute(self):
+        return [self.ids, self.weights]
+
+
+class InterpretedElementTypedCommand(ElementTypedCommand):
+    compile_args = False
+
+
+def test_element_types_are_checked_by_compiled_and_interpreted_validation():
+    for command in (ElementTypedCommand, InterpretedElementTypedCommand):
+        assert command.run(ids=[1, 2]) == [[1, 2], {'a': 1.0}]
+        with raises(UnexpectedElementTypeError, match="Expected elements of 'ids'"):
+            command.run(ids=[1, '2'])
+
+        result = command.check(ids=['1'], weights={'a': 'b'})
+        assert result.codes == {'ids': 'unexpected_element_type', 'weights': 'unexpected_element_type'}
+
+
+class SchemaCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.dict('config', schema={'db': DictValidator('db', schema={'port': EvenValidator})})
+
+    def execute(self):
+        return self.config
+
+
+def test_schema_args_report_errors_of_customised_validators_by_path():
+    assert SchemaCommand.run(config={'db': {'port': 2}}) == {'db': {'port': 2}}
+    assert SchemaCommand.check(config={'db': {'port': 'x'}}).errors[0].name == 'config.db.port'
+
+
+class NamespacedCommand(Command):
+    command_namespace = 'tests'
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+
+    def execute(self):
+        return self.someint
+
+
+class RenamedCommand(NamespacedCommand):
+    command_name = 'renamed'
+
+
+def test_commands_are_registered_by_name():
+    assert lookup_command('BaseCommand') is BaseCommand
+    assert lookup_command('tests.NamespacedCommand') is NamespacedCommand
+    assert lookup_command('tests.renamed') is RenamedCommand
+    with raises(UnknownCommandError, match="No command is registered as 'NamespacedCommand'"):
+        lookup_command('NamespacedCommand')
+
+
+def test_base_commands_are_not_registered():
+    assert 'Command' not in registered_commands()
+    assert 'AsyncCommand' not in registered_commands()
+    assert not NamespacedCommand.command_base
+    with raises(UnknownCommandError):
+        dispatch({'command': 'Command'})
+
+
+def test_commands_are_registered_by_module_and_qualified_name():
+    assert lookup_command('test_commands.NamespacedCommand') is NamespacedCommand
+    assert lookup_command('test_commands.RenamedCommand') is RenamedCommand
+    assert registered_commands()['test_commands.RenamedCommand'] is RenamedCommand
+
+
+def test_looking_up_a_name_shared_by_several_commands_raises():
+    class SharingCommand(NamespacedCommand):
+        command_name = 'shared'
+
+    class OtherSharingCommand(NamespacedCommand):
+        command_name = 'shared'
+
+    qualified = ['{}.{}'.format(command.__module__, command.__qualname__)
+                 for command in (OtherSharingCommand, SharingCommand)]
+    with raises(AmbiguousCommandError) as raised:
+        lookup_command('tests.shared')
+    assert raised.value.candidates == qualified
+    assert str(raised.value) == "Several commands are registered as 'tests.shared', look one up as {} or {}".format(
+        *qualified)
+    assert 'tests.shared' not in registered_commands()
+    assert [lookup_command(name) for name in qualified] == [OtherSharingCommand, SharingCommand]
+
+
+def test_redefined_commands_replace_their_earlier_definition():
+    defined = [deferred_command() for _ in range(2)]
+    assert lookup_command('DeferredCommand') is defined[1][0]
+
+
+def test_dispatch_runs_the_named_command():
+    assert dispatch({'command': 'tests.renamed', 'args': {'someint': 3}}) == 3
+    assert dispatch({'command': 'BaseCommand'}) == 1234
+
+
+class Tracing(RunWrapper):
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def run(self, command, proceed):
+        self.calls.append(self.name)
+        return proceed()
+
+
+class OtherTracing(Tracing):
+    pass
+
+
+def test_run_wrappers_wrap_those_added_before_them():
+    calls = []
+
+    class WrappedCommand(Command):
+        @classmethod
+        def command_args(cmd):
+            cmd.int('someint')
+
+        def validate(self):
+            calls.append('validate')
+
+        def execute(self):
+            calls.append('execute')
+            return self.someint
+
+    add_run_wrapper(WrappedCommand, Tracing('inner', calls))
+    add_run_wrapper(WrappedCommand, OtherTracing('outer', calls))
+    assert WrappedCommand.run(someint=1) == 1
+    assert calls == ['outer', 'inner', 'validate', 'execute']
+
+    with raises(TypeError, match='WrappedCommand is already wrapped by a Tracing'):
+        add_run_wrapper(WrappedCommand, Tracing('again', calls))
+    with raises(MissingRequiredError):
+        WrappedCommand.run()
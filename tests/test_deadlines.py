@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.aio import AsyncCommand
+from decree.command import Command
+from decree.deadlines import check_deadline
+from decree.deadlines import current_deadline
+from decree.deadlines import deadline
+from decree.deadlines import expired
+from decree.deadlines import remaining
+from decree.exceptions import DeadlineExceeded
+from decree.executor import CommandExecutor
+from decree.pipeline import Pipeline
+from decree.pipeline import Stage
+
+
+class RemainingCommand(Command):
+    executed = 0
+
+    @classmethod
+    def command_args(cmd):
+        cmd.float('sleep', default=0.0001)
+
+    def execute(self):
+        type(self).executed += 1
+        time.sleep(self.sleep)
+        return remaining()
+
+
+class NestedCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.float('timeout')
+
+    def execute(self):
+        outer = current_deadline()
+        inner = RemainingCommand.run_within(self.timeout)
+        return outer, inner
+
+
+def test_no_deadline_by_default():
+    assert remaining() is None
+    assert not expired()
+    check_deadline()
+    assert RemainingCommand.run() is None
+
+
+def test_run_within_sets_a_deadline_for_the_run():
+    left = RemainingCommand.run_within(10)
+    assert 9 < left <= 10
+    assert current_deadline() is None
+
+
+def test_nested_runs_share_the_outer_deadline():
+    outer, inner = NestedCommand.run_within(1, timeout=60.0)
+    assert outer is not None
+    assert inner <= 1
+
+    outer, inner = NestedCommand.run_within(60, timeout=1.0)
+    assert inner <= 1
+
+
+def test_expired_commands_are_not_run():
+    RemainingCommand.executed = 0
+    with deadline(timeout=0):
+        assert expired()
+        with raises(DeadlineExceeded):
+            RemainingCommand.run()
+        with raises(DeadlineExceeded):
+            check_deadline()
+        assert not RemainingCommand.run_many([{}]).ok
+        assert not RemainingCommand.run_columns({'sleep': [0.0001]}).ok
+    assert RemainingCommand.executed == 0
+
+
+def test_nested_commands_are_not_run_once_the_deadline_passes():
+    class SlowThenNested(Command):
+        def execute(self):
+            time.sleep(0.02)
+            return RemainingCommand.run()
+
+    with raises(DeadlineExceeded):
+        SlowThenNested.run_until(time.monotonic() + 0.01)
+
+
+def test_deadlines_are_carried_to_executor_threads():
+    with CommandExecutor(max_workers=1) as executor:
+        with deadline(timeout=10):
+            assert executor.submit(RemainingCommand).result() <= 10
+            assert list(executor.map(RemainingCommand, [{}]))[0] <= 10
+        assert executor.submit(RemainingCommand).result() is None
+
+
+def test_deadlines_are_carried_to_threaded_pipeline_stages():
+    pipeline = Pipeline(Stage(RemainingCommand, threaded=True))
+    with deadline(timeout=10):
+        assert all(left <= 10 for left in pipeline.stream([{}, {}]))
+    with deadline(timeout=0):
+        with raises(DeadlineExceeded):
+            list(pipeline.stream([{}]))
+    assert list(pipeline.stream([{}])) == [None]
+
+
+class AsyncRemainingCommand(AsyncCommand):
+    async def execute(self):
+        await asyncio.sleep(0)
+        return remaining()
+
+
+def test_deadlines_apply_to_async_commands():
+    async def run():
+        with deadline(timeout=10):
+            left = await AsyncRemainingCommand.run_async()
+        with deadline(timeout=0):
+            with raises(DeadlineExceeded):
+                await AsyncRemainingCommand.run_async()
+        return left
+
+    assert asyncio.run(run()) <= 10
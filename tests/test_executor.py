@@ -0,0 +1,118 @@
+import os
+
+from pytest import mark
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.columns import numpy
+from decree.command import Command
+from decree.exceptions import MissingRequiredError
+from decree.executor import CommandExecutor
+from decree.executor import command_reference
+from decree.executor import resolve_command
+from decree.sharing import SharedArg
+from decree.sharing import attach_args
+from decree.sharing import detach
+from decree.sharing import release
+from decree.sharing import share_args
+
+
+class SquareCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+
+    def execute(self):
+        return self.someint * self.someint
+
+
+class PidCommand(Command):
+    def execute(self):
+        return os.getpid()
+
+
+def test_submit_executes_on_threads():
+    with CommandExecutor(max_workers=2) as executor:
+        assert executor.submit(SquareCommand, someint=3).result() == 9
+
+
+def test_submit_validates_args_in_caller():
+    with CommandExecutor(max_workers=2) as executor:
+        with raises(MissingRequiredError):
+            executor.submit(SquareCommand)
+
+
+def test_map_returns_results_in_order():
+    with CommandExecutor(max_workers=3) as executor:
+        results = executor.map(SquareCommand, ({'someint': i} for i in range(10)), chunksize=3)
+        assert list(results) == [i * i for i in range(10)]
+
+
+def test_map_validates_every_set_of_args_before_executing():
+    with CommandExecutor(max_workers=2) as executor:
+        with raises(MissingRequiredError):
+            executor.map(SquareCommand, [{'someint': 1}, {}])
+
+
+def test_executes_on_processes_by_reference():
+    with CommandExecutor(max_workers=2, processes=True) as executor:
+        assert executor.submit(SquareCommand, someint=4).result() == 16
+        assert executor.submit(PidCommand).result() != os.getpid()
+        assert list(executor.map(SquareCommand, [{'someint': i} for i in range(5)], chunksize=2)) == \
+            [0, 1, 4, 9, 16]
+
+
+def test_command_reference_round_trips():
+    assert resolve_command(command_reference(SquareCommand)) is SquareCommand
+
+
+def test_commands_defined_in_functions_cannot_be_sent_to_processes():
+    class LocalCommand(Command):
+        pass
+
+    with raises(ValueError, match='is defined in a function and cannot be imported'):
+        command_reference(LocalCommand)
+
+
+class ChecksumCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.buffer('data', contiguous=True)
+
+    def execute(self):
+        return type(self.data).__name__, sum(memoryview(self.data).cast('B'))
+
+
+def test_large_buffers_are_shared_with_processes():
+    data = bytes(range(256)) * 16
+    view = memoryview(bytearray(data)).cast('i', (8, 128))
+    with CommandExecutor(max_workers=1, processes=True, share_threshold=1024) as executor:
+        assert executor.submit(ChecksumCommand, data=data).result() == ('bytes', sum(data))
+        assert executor.submit(ChecksumCommand, data=view).result() == ('memoryview', sum(data))
+        assert list(executor.map(ChecksumCommand, [{'data': b'small'}])) == [('bytes', sum(b'small'))]
+
+
+def test_shared_args_are_attached_as_the_original_type():
+    shared, segments = share_args({'data': bytearray(b'abc'), 'other': 1}, threshold=1)
+    try:
+        assert isinstance(shared['data'], SharedArg)
+        attached, attached_segments = attach_args(shared)
+        assert attached == {'data': bytearray(b'abc'), 'other': 1}
+        detach(attached_segments)
+    finally:
+        release(segments)
+
+
+@mark.skipif(numpy is None, reason='numpy is not installed')
+def test_shared_arrays_are_attached_as_views():
+    values = numpy.arange(12, dtype='int32').reshape(3, 4)
+    shared, segments = share_args({'values': values}, threshold=1)
+    try:
+        attached, attached_segments = attach_args(shared)
+        assert attached['values'].dtype == values.dtype
+        assert (attached['values'] == values).all()
+        assert not attached['values'].flags.owndata
+        del attached
+        detach(attached_segments)
+    finally:
+        release(segments)
@@ -0,0 +1,199 @@
+import io
+
+from pytest import mark
+from pytest import raises
+
+from decree.columns import numpy
+from decree.command import Command
+from decree.exceptions import MissingRequiredError
+from decree.exceptions import NotNoneError
+from decree.exceptions import UnexpectedTypeError
+from decree.ingest import RejectWriter
+from decree.ingest import ingest
+from decree.validators import parse_bool
+
+needs_numpy = mark.skipif(numpy is None, reason='numpy is not installed')
+
+
+class LoadTrade(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.string('symbol', allow_none=False)
+        cmd.int('quantity', allow_none=False)
+        cmd.float('price', default=1.5)
+        cmd.string('venue', default='XNYS')
+
+    def execute(self):
+        return (self.symbol, self.quantity, self.price, self.venue)
+
+
+class ColumnarTrades(LoadTrade):
+    columnar = True
+
+    def execute(self):
+        return self
+
+
+class Settle(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('id')
+        cmd.bool('settled', allow_none=True)
+
+    def execute(self):
+        return (self.id, self.settled)
+
+
+class TaggedCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('id')
+        cmd.list('tags', of=str)
+        cmd.set('codes', of=int)
+
+    def execute(self):
+        return (self.id, self.tags, self.codes)
+
+
+def collect(rejected):
+    return lambda line_number, row, error: rejected.append((line_number, row, type(error)))
+
+
+def test_fields_are_converted_to_their_args_types():
+    text = 'symbol,quantity,price,venue\nABC,10,2.25,XLON\nXYZ,5,3,XNAS\n'
+    chunks = list(LoadTrade.ingest(io.StringIO(text)))
+    assert len(chunks) == 1
+    assert chunks[0].rows == [2, 3]
+    assert chunks[0].result.results == [('ABC', 10, 2.25, 'XLON'), ('XYZ', 5, 3.0, 'XNAS')]
+
+
+def test_empty_fields_use_defaults_and_none():
+    chunk, = ingest(LoadTrade, io.StringIO('symbol,quantity,price\nABC,10,\n'))
+    assert chunk.result.results == [('ABC', 10, 1.5, 'XNYS')]
+
+    # None is vetted by the validator as for any other run, so fails the type check
+    rejected = []
+    chunk, = ingest(Settle, io.StringIO('id,settled\n1,true\n2,\n3,No\n'), rejects=collect(rejected))
+    assert chunk.result.results == [(1, True), (3, False)]
+    assert rejected == [(3, ['2', ''], UnexpectedTypeError)]
+
+
+def test_empty_fields_of_string_args_are_read_as_empty_strings():
+    class Annotate(Command):
+        @classmethod
+        def command_args(cmd):
+            cmd.int('id')
+            cmd.string('note')
+
+        def execute(self):
+            return (self.id, self.note)
+
+    chunk, = ingest(Annotate, io.StringIO('id,note\n1,late\n2,\n'))
+    assert chunk.result.results == [(1, 'late'), (2, '')]
+
+
+def test_missing_columns_use_defaults():
+    text = 'symbol\tquantity\nABC\t10\n'
+    chunk, = ingest(LoadTrade, io.StringIO(text), delimiter='\t')
+    assert chunk.result.results == [('ABC', 10, 1.5, 'XNYS')]
+
+
+def test_missing_required_column_raises():
+    with raises(MissingRequiredError):
+        list(ingest(LoadTrade, io.StringIO('symbol,price\nABC,1.0\n')))
+
+
+def test_bad_rows_are_rejected_with_their_line_numbers():
+    text = ('symbol,quantity,price\n'
+            'ABC,10,2.0\n'
+            'BAD,ten,2.0\n'
+            ',3,2.0\n'
+            'SHORT,1\n'
+            'XYZ,4,cheap\n'
+            'DEF,7,\n')
+    rejected = []
+    chunk, = ingest(LoadTrade, io.StringIO(text), rejects=collect(rejected))
+    assert chunk.rows == [2, 7]
+    assert [symbol for symbol, *_ in chunk.result.results] == ['ABC', 'DEF']
+    assert rejected == [
+        (3, ['BAD', 'ten', '2.0'], ValueError),
+        (4, ['', '3', '2.0'], NotNoneError),
+        (5, ['SHORT', '1'], ValueError),
+        (6, ['XYZ', '4', 'cheap'], ValueError),
+    ]
+
+
+def test_rows_failing_validation_are_rejected():
+    # zero is not allowed for args that disallow None, as for any other run
+    rejected = []
+    chunk, = ingest(LoadTrade, io.StringIO('symbol,quantity\nABC,0\nDEF,2\n'),
+                    rejects=collect(rejected))
+    assert chunk.rows == [3]
+    assert rejected == [(2, ['ABC', '0'], NotNoneError)]
+
+
+def test_rejected_rows_raise_without_a_sink():
+    with raises(ValueError) as error:
+        list(ingest(LoadTrade, io.StringIO('symbol,quantity\nABC,1\nDEF,x\n')))
+    assert error.value.row_number == 3
+
+
+def test_reject_writer_writes_csv():
+    output = io.StringIO()
+    writer = RejectWriter(output)
+    list(ingest(LoadTrade, io.StringIO('symbol,quantity\nABC,x\n'), rejects=writer))
+    assert writer.count == 1
+    assert output.getvalue().startswith('2,ValueError: invalid literal')
+    assert output.getvalue().rstrip().endswith(',ABC,x')
+
+
+def test_files_are_read_in_chunks(tmp_path):
+    path = tmp_path / 'trades.csv'
+    path.write_text('symbol,quantity\n' + ''.join('S{},{}\n'.format(n, n + 1) for n in range(25)))
+    chunks = list(ingest(LoadTrade, str(path), chunk_size=10))
+    assert [len(chunk.rows) for chunk in chunks] == [10, 10, 5]
+    assert chunks[2].result.results[-1] == ('S24', 25, 1.5, 'XNYS')
+
+    path.write_text('symbol,quantity\nA,1\nB,2\nC\n')
+    rejected = []
+    chunks = list(ingest(LoadTrade, str(path), chunk_size=2, rejects=collect(rejected)))
+    assert [chunk.rows for chunk in chunks] == [[2, 3]]
+    assert rejected == [(4, ['C'], ValueError)]
+
+
+def test_fieldnames_can_be_given():
+    chunk, = ingest(LoadTrade, io.StringIO('ABC,3\n'), fieldnames=['symbol', 'quantity'])
+    assert chunk.result.results == [('ABC', 3, 1.5, 'XNYS')]
+
+
+def test_container_fields_are_read_as_json():
+    text = 'id;tags;codes\n1;["a", "b"];[1, 2, 2]\n'
+    chunk, = ingest(TaggedCommand, io.StringIO(text), delimiter=';')
+    assert chunk.result.results == [(1, ['a', 'b'], {1, 2})]
+
+
+def test_columnar_commands_run_per_chunk():
+    text = 'symbol,quantity,price\nABC,1,2.5\nDEF,2,3.5\nGHI,x,1\n'
+    rejected = []
+    chunk, = ColumnarTrades.ingest(io.StringIO(text), rejects=collect(rejected))
+    command = chunk.result
+    assert list(command.symbol) == ['ABC', 'DEF']
+    assert list(command.quantity) == [1, 2]
+    assert list(command.price) == [2.5, 3.5]
+    assert rejected == [(4, ['GHI', 'x', '1'], ValueError)]
+
+
+@needs_numpy
+def test_columnar_numeric_columns_are_parsed_as_arrays():
+    chunk, = ColumnarTrades.ingest(io.StringIO('symbol,quantity,price\nABC,1,2.5\nDEF,2,3.5\n'))
+    command = chunk.result
+    assert isinstance(command.quantity, numpy.ndarray)
+    assert command.quantity.dtype == numpy.int64
+    assert command.price.tolist() == [2.5, 3.5]
+
+
+def test_parse_bool():
+    assert parse_bool(' Yes') is True
+    assert parse_bool('0') is False
+    with raises(ValueError):
+        parse_bool('maybe')
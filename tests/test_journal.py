@@ -0,0 +1,237 @@
+import os
+import threading
+
+from pytest import fixture
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.aio import AsyncCommand
+from decree.command import Command
+from decree.exceptions import UnexpectedTypeError
+from decree.journal import Journal
+from decree.journal import journaled
+from decree.journal import read_checkpoint
+from decree.journal import read_records
+from decree.journal import replay
+from decree.journal import segment_numbers
+from decree.memo import memoize
+
+
+class Ledger():
+    balances = {}
+    refunds = 0
+
+
+class Deposit(Command):
+    command_name = 'journal.deposit'
+
+    @classmethod
+    def command_args(cmd):
+        cmd.string('account')
+        cmd.int('amount')
+
+    def execute(self):
+        if self.amount < 0:
+            raise ValueError('amount must not be negative')
+        Ledger.balances[self.account] = Ledger.balances.get(self.account, 0) + self.amount
+        return Ledger.balances[self.account]
+
+
+class LazyDeposit(Deposit):
+    command_name = 'journal.lazy_deposit'
+    lazy_args = True
+
+    @classmethod
+    def command_args(cmd):
+        cmd.string('reference', default='')
+
+
+class Refund(Command):
+    command_name = 'journal.refund'
+
+    @classmethod
+    def command_args(cmd):
+        cmd.string('account')
+
+    def execute(self):
+        Ledger.refunds += 1
+        return Ledger.balances.get(self.account, 0)
+
+
+class AsyncDeposit(AsyncCommand):
+    command_name = 'journal.async_deposit'
+
+
+@fixture
+def journal(tmp_path):
+    Ledger.balances = {}
+    journal = Journal(str(tmp_path), sync_interval=0.001)
+    journaled(journal, durable=True)(Deposit)
+    yield journal
+    journal.close()
+    Deposit.run_wrappers = ()
+    del Deposit.journal, Deposit.journal_durable
+
+
+def test_runs_are_journaled_with_their_outcome(journal):
+    assert Deposit.run(account='a', amount=5) == 5
+    with raises(ValueError):
+        Deposit.run(account='a', amount=-1)
+
+    records = list(read_records(journal.directory))
+    assert [(r.command, r.args, r.ok) for r in records] == [
+        ('journal.deposit', {'account': 'a', 'amount': 5}, True),
+        ('journal.deposit', {'account': 'a', 'amount': -1}, False),
+    ]
+    assert records[1].error == ('ValueError', 'amount must not be negative')
+    assert records[0].timestamp <= records[1].timestamp
+
+
+def test_concurrent_durable_runs_share_fsyncs(journal):
+    threads = [threading.Thread(target=Deposit.run, kwargs={'account': str(n % 4), 'amount': 1})
+               for n in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(list(read_records(journal.directory))) == 50
+    assert journal.syncs < 50
+
+
+def test_replay_reexecutes_successful_runs(journal):
+    for amount in (1, 2, -3, 4):
+        try:
+            Deposit.run(account='a', amount=amount)
+        except ValueError:
+            pass
+    journal.close()
+
+    Ledger.balances = {}
+    assert replay(journal.directory) == 3
+    assert Ledger.balances == {'a': 7}
+    # replay is not journaled again
+    assert len(list(read_records(journal.directory))) == 4
+
+
+def test_checkpoint_bounds_replay(journal):
+    Deposit.run(account='a', amount=1)
+    Deposit.run(account='b', amount=2)
+    journal.checkpoint(dict(Ledger.balances))
+    Deposit.run(account='a', amount=10)
+    journal.close()
+
+    state, first_segment = read_checkpoint(journal.directory)
+    assert state == {'a': 1, 'b': 2}
+    assert segment_numbers(journal.directory)[0] == first_segment
+
+    Ledger.balances = {}
+    assert replay(journal.directory, restore=Ledger.balances.update) == 1
+    assert Ledger.balances == {'a': 11, 'b': 2}
+
+
+def test_segments_rotate_at_their_size(tmp_path):
+    with Journal(str(tmp_path), segment_size=256, sync_bytes=1) as journal:
+        for amount in range(20):
+            journal.wait(journal.append('journal.deposit', {'account': 'a', 'amount': amount}))
+
+    assert len(segment_numbers(str(tmp_path))) > 1
+    amounts = [record.args['amount'] for record in read_records(str(tmp_path))]
+    assert amounts == list(range(20))
+
+
+def test_reopening_starts_a_new_segment(tmp_path):
+    with Journal(str(tmp_path)) as journal:
+        journal.append('journal.deposit', {'account': 'a', 'amount': 1})
+    with Journal(str(tmp_path)) as journal:
+        journal.append('journal.deposit', {'account': 'a', 'amount': 2})
+
+    assert segment_numbers(str(tmp_path)) == [0, 1]
+    assert [record.position for record in read_records(str(tmp_path))] == [(0, 0), (1, 0)]
+
+
+def test_torn_records_end_their_segment(tmp_path):
+    with Journal(str(tmp_path)) as journal:
+        journal.append('journal.deposit', {'account': 'a', 'amount': 1})
+        journal.append('journal.deposit', {'account': 'a', 'amount': 2})
+
+    path = os.path.join(str(tmp_path), 'segment-00000000.log')
+    with open(path, 'r+b') as segment:
+        segment.truncate(os.path.getsize(path) - 3)
+
+    assert [record.args['amount'] for record in read_records(str(tmp_path))] == [1]
+
+
+def test_closed_journal_rejects_records(tmp_path):
+    journal = Journal(str(tmp_path))
+    journal.close()
+    with raises(RuntimeError):
+        journal.append('journal.deposit', {})
+
+
+def test_failed_writes_are_raised_to_waiting_runs(journal):
+    class FailingFile():
+        def write(self, data):
+            raise OSError('disk full')
+
+        def close(self):
+            pass
+
+    segment = journal._file
+    with journal._write_lock:
+        journal._file = FailingFile()
+    try:
+        with raises(RuntimeError, match='journal failed to write its records') as raised:
+            Deposit.run(account='a', amount=1)
+        assert isinstance(raised.value.__cause__, OSError)
+        with raises(RuntimeError, match='journal failed to write its records'):
+            journal.append('journal.deposit', {'account': 'a', 'amount': 2})
+    finally:
+        segment.close()
+
+
+def test_args_that_cannot_be_journaled_are_rejected_before_the_run_executes(tmp_path):
+    @journaled(Journal(str(tmp_path)))
+    class Locked(Command):
+        command_name = 'journal.locked'
+        runs = 0
+
+        @classmethod
+        def command_args(cmd):
+            cmd.object('lock', type=object)
+
+        def execute(self):
+            type(self).runs += 1
+
+    with raises(TypeError):
+        Locked.run(lock=threading.Lock())
+    assert Locked.runs == 0
+    Locked.journal.close()
+    assert list(read_records(str(tmp_path))) == []
+
+
+def test_lazy_args_are_validated_before_the_run_executes(journal):
+    with raises(UnexpectedTypeError):
+        LazyDeposit.run(account='a', amount=5, reference=5)
+    assert Ledger.balances == {}
+    journal.flush()
+    assert list(read_records(journal.directory)) == []
+
+
+def test_journaled_commands_stack_with_memoize(tmp_path):
+    Ledger.balances = {'a': 3}
+    Ledger.refunds = 0
+    with Journal(str(tmp_path)) as journal:
+        cached = journaled(journal)(memoize(Refund))
+        assert [cached.run(account='a') for _ in range(3)] == [3, 3, 3]
+    assert Ledger.refunds == 1
+    assert len(list(read_records(str(tmp_path)))) == 3
+
+
+def test_async_commands_are_not_journaled_or_replayed(tmp_path):
+    with Journal(str(tmp_path)) as journal:
+        with raises(TypeError, match='JournaledRuns cannot wrap the asynchronous command AsyncDeposit'):
+            journaled(journal)(AsyncDeposit)
+        journal.append('journal.async_deposit', {})
+    with raises(TypeError, match='AsyncDeposit is asynchronous and cannot be replayed'):
+        replay(str(tmp_path))
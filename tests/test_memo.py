@@ -0,0 +1,174 @@
+import asyncio
+
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.aio import AsyncCommand
+from decree.command import Command
+from decree.exceptions import MissingRequiredError
+from decree.executor import CommandExecutor
+from decree.memo import canonical
+from decree.memo import memoize
+
+
+class Clock():
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_command(**options):
+    @memoize(**options)
+    class CountingCommand(Command):
+        executions = 0
+
+        @classmethod
+        def command_args(cmd):
+            cmd.int('someint')
+            cmd.list('somelist', default=[1])
+
+        def execute(self):
+            type(self).executions += 1
+            return self.someint * len(self.somelist)
+
+    return CountingCommand
+
+
+def test_memoized_results_are_reused():
+    command = counting_command()
+    assert command.run(someint=2) == 2
+    assert command.run(someint=2) == 2
+    assert command.run(someint=3, somelist=[1, 2]) == 6
+    assert command.run(someint=3, somelist=[1, 2]) == 6
+    assert command.executions == 2
+    assert command.result_cache.stats() == {'entries': 2, 'bytes': 0, 'hits': 2, 'misses': 2,
+                                            'evictions': 0}
+
+
+def test_memoized_commands_still_validate_args():
+    command = counting_command()
+    with raises(MissingRequiredError):
+        command.run()
+
+
+def test_memoize_evicts_least_recently_used():
+    command = counting_command(max_entries=2)
+    command.run(someint=1)
+    command.run(someint=2)
+    command.run(someint=1)
+    command.run(someint=3)
+    assert command.result_cache.evictions == 1
+    command.run(someint=1)
+    assert command.executions == 3
+
+
+def test_memoize_expires_results():
+    command = counting_command(ttl=10)
+    command.result_cache.clock = clock = Clock()
+    command.run(someint=1)
+    clock.now = 9
+    command.run(someint=1)
+    clock.now = 10
+    command.run(someint=1)
+    assert command.executions == 2
+
+
+def test_memoize_limits_cached_bytes():
+    command = counting_command(max_bytes=10, sizeof=lambda result: 4)
+    for someint in range(4):
+        command.run(someint=someint)
+    assert command.result_cache.stats()['bytes'] == 8
+    assert len(command.result_cache) == 2
+
+
+def test_memoized_results_can_be_invalidated():
+    command = counting_command()
+    command.run(someint=1)
+    assert command.result_cache.invalidate(someint=1)
+    assert not command.result_cache.invalidate(someint=1)
+    command.run(someint=1)
+    command.result_cache.clear()
+    command.run(someint=1)
+    assert command.executions == 3
+
+
+def test_canonical_values_are_hashable_and_distinct():
+    assert hash(canonical({'a': [1, {2, 3}]}))
+    assert canonical([1, 2]) != canonical((1, 2)) != canonical({1, 2})
+    assert canonical([1]) != canonical([1.0]) != canonical([True])
+    with raises(TypeError):
+        canonical(bytearray())
+
+
+def test_equal_args_of_different_types_are_cached_apart():
+    @memoize
+    class Describe(Command):
+
+        @classmethod
+        def command_args(cmd):
+            cmd.object('value', type=object)
+
+        def execute(self):
+            return repr(self.value)
+
+    assert [Describe.run(value=value) for value in (1, True, 1.0, [1], [True], (1,), (1.0,))] == [
+        '1', 'True', '1.0', '[1]', '[True]', '(1,)', '(1.0,)']
+    assert Describe.result_cache.stats()['misses'] == 7
+
+
+def test_unhashable_args_bypass_the_cache():
+    @memoize
+    class BufferCommand(Command):
+        executions = 0
+
+        @classmethod
+        def command_args(cmd):
+            cmd.object('buffer', type=bytearray)
+
+        def execute(self):
+            type(self).executions += 1
+            return len(self.buffer)
+
+    assert BufferCommand.run(buffer=bytearray(3)) == 3
+    assert BufferCommand.run(buffer=bytearray(3)) == 3
+    assert BufferCommand.executions == 2
+    assert len(BufferCommand.result_cache) == 0
+
+
+def test_memoized_results_are_reused_by_batches_columns_and_executors():
+    command = counting_command()
+    assert command.run_many([{'someint': 2}, {'someint': 2}]).results == [2, 2]
+    assert command.run_columns({'someint': [2, 3]}).results == [2, 3]
+    with CommandExecutor(max_workers=1) as executor:
+        assert list(executor.map(command, [{'someint': 3}, {'someint': 4}])) == [3, 4]
+    assert command.executions == 3
+
+
+def test_commands_are_only_memoized_once():
+    command = counting_command()
+    with raises(TypeError, match='CountingCommand is already wrapped by a ResultCache'):
+        memoize(command)
+
+
+def test_async_commands_are_memoized():
+    @memoize
+    class AsyncCountingCommand(AsyncCommand):
+        executions = 0
+
+        @classmethod
+        def command_args(cmd):
+            cmd.int('someint')
+
+        async def execute(self):
+            type(self).executions += 1
+            await asyncio.sleep(0)
+            return self.someint * 2
+
+    async def run():
+        return [await AsyncCountingCommand.run_async(someint=n) for n in (1, 2, 1)]
+
+    assert asyncio.run(run()) == [2, 4, 2]
+    assert AsyncCountingCommand.executions == 2
+    assert AsyncCountingCommand.result_cache.invalidate(someint=1)
@@ -0,0 +1,129 @@
+import asyncio
+
+from pytest import fixture
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree import metrics
+from decree.aio import AsyncCommand
+from decree.command import Command
+from decree.command import run_recorder
+from decree.exceptions import MissingRequiredError
+from decree.executor import CommandExecutor
+from decree.memo import memoize
+from decree.metrics import BUCKET_BOUNDS
+from decree.metrics import Histogram
+from decree.scheduler import CommandScheduler
+
+
+class MeasuredCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+
+    def validate(self):
+        if self.someint < 0:
+            raise ValueError('someint must not be negative')
+
+    def execute(self):
+        return self.someint
+
+
+@fixture
+def instrumented():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+@memoize
+class MemoizedCommand(MeasuredCommand):
+    pass
+
+
+class MeasuredAsyncCommand(AsyncCommand):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+
+    async def execute(self):
+        return self.someint
+
+
+def test_disabled_metrics_set_no_recorder():
+    assert not metrics.enabled()
+    assert run_recorder() is None
+
+
+def test_records_calls_and_phase_latencies(instrumented):
+    assert MeasuredCommand.run(someint=1) == 1
+    assert MeasuredCommand.run(someint=2) == 2
+
+    stats = metrics.snapshot()['test_metrics.MeasuredCommand']
+    assert stats['calls'] == 2
+    assert stats['errors'] == {}
+    for phase in metrics.PHASES:
+        assert stats['phases'][phase]['count'] == 2
+        assert sum(stats['phases'][phase]['counts']) == 2
+
+
+def test_records_errors_by_type(instrumented):
+    with raises(MissingRequiredError):
+        MeasuredCommand.run()
+    with raises(ValueError):
+        MeasuredCommand.run(someint=-1)
+
+    stats = metrics.snapshot()['test_metrics.MeasuredCommand']
+    assert stats['calls'] == 2
+    assert stats['errors'] == {'MissingRequiredError': 1, 'ValueError': 1}
+    assert stats['phases']['args']['count'] == 1
+    assert stats['phases']['execute']['count'] == 0
+
+
+def test_records_batches_columns_and_workers(instrumented):
+    MeasuredCommand.run_many([{'someint': 1}, {'someint': -1}])
+    MeasuredCommand.run_columns({'someint': [1, 2]})
+    with CommandExecutor(max_workers=1) as executor:
+        executor.submit(MeasuredCommand, someint=1).result()
+    with CommandScheduler(workers=1) as scheduler:
+        scheduler.schedule(MeasuredCommand, {'someint': 1}).result()
+
+    stats = metrics.snapshot()['test_metrics.MeasuredCommand']
+    assert stats['calls'] == 6
+    assert stats['errors'] == {'ValueError': 1}
+    assert stats['phases']['args']['count'] == 2
+    assert stats['phases']['execute']['count'] == 5
+
+
+def test_records_memoized_and_async_commands(instrumented):
+    MemoizedCommand.run(someint=1)
+    MemoizedCommand.run(someint=1)
+    assert asyncio.run(MeasuredAsyncCommand.run_async(someint=3)) == 3
+
+    snapshot = metrics.snapshot()
+    memoized = snapshot['test_metrics.MemoizedCommand']
+    assert memoized['calls'] == 2
+    assert memoized['phases']['args']['count'] == 2
+    assert memoized['phases']['execute']['count'] == 1
+    assert snapshot['test_metrics.MeasuredAsyncCommand']['phases']['execute']['count'] == 1
+
+
+def test_reset_discards_stats(instrumented):
+    MeasuredCommand.run(someint=1)
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    histogram.record(500)
+    histogram.record(1000)
+    histogram.record(1001)
+    histogram.record(10 ** 11)
+    snapshot = histogram.snapshot()
+    assert snapshot['counts'][0] == 2
+    assert snapshot['counts'][1] == 1
+    assert snapshot['counts'][len(BUCKET_BOUNDS)] == 1
+    assert snapshot['max'] == 10 ** 11
@@ -0,0 +1,98 @@
+import threading
+
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.command import Command
+from decree.exceptions import UnexpectedTypeError
+from decree.pipeline import Pipeline
+from decree.pipeline import Stage
+
+produced = []
+
+
+class CountCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('count')
+
+    def execute(self):
+        for number in range(self.count):
+            produced.append(number)
+            yield number
+
+
+class SquareCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('number')
+
+    def execute(self):
+        return self.number * self.number
+
+
+class PairCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('number')
+        cmd.string('label', default='n')
+
+    def execute(self):
+        return {'label': self.label, 'value': self.number}
+
+
+class ThreadNameCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.int('number')
+
+    def execute(self):
+        return threading.current_thread().name
+
+
+def test_stages_feed_each_item_to_the_next():
+    pipeline = Pipeline(CountCommand, Stage(SquareCommand, arg='number'))
+    assert list(pipeline.run(count=4)) == [0, 1, 4, 9]
+
+
+def test_items_are_streamed_lazily():
+    del produced[:]
+    outputs = Pipeline(CountCommand, Stage(SquareCommand, arg='number')).run(count=1000)
+    assert produced == []
+    assert next(outputs) == 0
+    assert next(outputs) == 1
+    assert produced == [0, 1]
+
+
+def test_mapping_items_are_passed_as_args():
+    assert list(Pipeline(PairCommand).stream([{'number': 1}])) == [{'label': 'n', 'value': 1}]
+    assert list(Pipeline(Stage(PairCommand, arg='number', label='x')).stream([1])) == [
+        {'label': 'x', 'value': 1}]
+    with raises(TypeError, match='PairCommand expects a mapping of args but was given int'):
+        list(Pipeline(PairCommand).stream([1]))
+
+
+def test_stage_arg_must_be_defined():
+    with raises(ValueError, match='SquareCommand has no arg named missing'):
+        Stage(SquareCommand, arg='missing')
+
+
+def test_threaded_stages_run_on_worker_threads():
+    pipeline = Pipeline(CountCommand, Stage(ThreadNameCommand, arg='number', threaded=True, buffer_size=2))
+    assert set(pipeline.run(count=10)) == {'decree-pipeline-ThreadNameCommand'}
+
+
+def test_threaded_stages_are_bounded_by_their_buffer():
+    del produced[:]
+    pipeline = Pipeline(Stage(CountCommand, threaded=True, buffer_size=2))
+    outputs = pipeline.run(count=1000)
+    assert next(outputs) == 0
+    threading.Event().wait(0.05)
+    assert len(produced) <= 4
+    outputs.close()
+
+
+def test_threaded_stage_errors_are_raised_to_the_consumer():
+    pipeline = Pipeline(Stage(SquareCommand, arg='number', threaded=True))
+    with raises(UnexpectedTypeError):
+        list(pipeline.stream(['not a number']))
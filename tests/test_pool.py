@@ -0,0 +1,226 @@
+import asyncio
+import threading
+
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.aio import AsyncCommand
+from decree.command import Command
+from decree.exceptions import MissingRequiredError
+from decree.pool import InstancePool
+from decree.pool import pooled
+
+
+@pooled
+class Increment(Command):
+    instances = []
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+        cmd.string('label', default='count')
+
+    def execute(self):
+        type(self).instances.append(id(self))
+        return self.someint + 1
+
+
+class Decrement(Increment):
+
+    def execute(self):
+        return self.someint - 1
+
+
+@pooled(size=2)
+class SlottedIncrement(Command):
+    slotted_args = True
+    keep_raw_args = True
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+
+    def execute(self):
+        return self.someint + 1
+
+
+@pooled
+class Checksum(Command):
+    setups = 0
+
+    def __init__(self):
+        type(self).setups += 1
+        self.scratch = bytearray(1024)
+
+    @classmethod
+    def command_args(cmd):
+        cmd.object('data', type=bytes)
+
+    def execute(self):
+        self.scratch[:len(self.data)] = self.data
+        return sum(self.scratch[:len(self.data)])
+
+
+@pooled
+class Leaky(Command):
+    kept = []
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+        cmd.bool('keep', default=True)
+
+    def execute(self):
+        if self.keep:
+            type(self).kept.append(self)
+        return self.someint
+
+
+@pooled
+class ReturnsSelf(Command):
+
+    def execute(self):
+        return self
+
+
+@pooled
+class AsyncIncrement(AsyncCommand):
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+
+    async def execute(self):
+        await asyncio.sleep(0)
+        return self.someint + 1
+
+
+def test_instances_are_reused():
+    Increment.instances = []
+    assert [Increment.run(someint=n) for n in range(5)] == [1, 2, 3, 4, 5]
+    assert len(set(Increment.instances)) == 1
+    assert Increment.instance_pool.idle() == 1
+
+
+def test_subclasses_of_pooled_commands_have_pools_of_their_own():
+    assert Increment.run(someint=1) == 2
+    assert Decrement.run(someint=1) == 0
+    assert Decrement.instance_pool is not Increment.instance_pool
+    assert Decrement.instance_pool.command_class is Decrement
+    assert Decrement.instance_pool.size == Increment.instance_pool.size
+    assert Decrement.run_many([{'someint': 2}]).results == [1]
+    assert Increment.run(someint=1) == 2
+
+
+def test_batches_and_columns_use_the_pool():
+    Increment.instances = []
+    assert Increment.run_many([{'someint': n} for n in range(3)]).results == [1, 2, 3]
+    assert Increment.run_columns({'someint': [4, 5]}).results == [5, 6]
+    assert len(set(Increment.instances)) == 1
+    assert Increment.instance_pool.idle() == 1
+    # the instance of a failed run is not returned
+    assert not Increment.run_many([{}]).ok
+    assert Increment.instance_pool.idle() == 0
+
+
+def test_reused_instances_are_reset():
+    Increment.run(someint=1, label='first')
+    instance = Increment.instance_pool.acquire()
+    try:
+        assert not hasattr(instance, 'someint')
+        assert not hasattr(instance, 'raw_args')
+    finally:
+        Increment.instance_pool.release(instance)
+    with raises(MissingRequiredError):
+        Increment.run()
+
+
+def test_reset_keeps_state_set_up_by_init():
+    Checksum.setups = 0
+    assert [Checksum.run(data=data) for data in (b'ab', b'c', b'de')] == [195, 99, 201]
+    assert Checksum.setups == 1
+
+
+def test_slotted_instances_are_reset():
+    assert SlottedIncrement.run(someint=1) == 2
+    instance = SlottedIncrement.instance_pool.acquire()
+    assert not hasattr(instance, 'someint')
+    assert not hasattr(instance, 'raw_args')
+
+
+def test_pool_is_bounded():
+    pool = InstancePool(Increment, size=2)
+    instances = [pool.acquire() for _ in range(3)]
+    released = []
+    while instances:
+        instance = instances.pop()
+        released.append(pool.release(instance))
+    assert released == [True, True, False]
+    assert pool.idle() == 2
+    with raises(ValueError):
+        InstancePool(Increment, size=0)
+
+
+def test_leaked_instances_are_not_reused():
+    Leaky.kept = []
+    leaked = Leaky.instance_pool.leaked
+    Leaky.run(someint=1)
+    Leaky.run(someint=2)
+    first, second = Leaky.kept
+    assert first is not second
+    assert first.someint == 1
+    assert Leaky.instance_pool.leaked == leaked + 2
+
+    Leaky.run(someint=3, keep=False)
+    Leaky.run(someint=4, keep=False)
+    assert Leaky.instance_pool.idle() == 1
+
+
+def test_released_instances_still_referenced_are_leaked():
+    pool = InstancePool(Increment, size=2)
+    instance = pool.acquire()
+    kept = [instance]
+    assert not pool.release(instance)
+    assert pool.leaked == 1
+    assert pool.idle() == 0
+    kept.clear()
+    assert pool.release(instance)
+
+
+def test_returned_instances_are_not_reused():
+    first = ReturnsSelf.run()
+    second = ReturnsSelf.run()
+    assert first is not second
+    assert ReturnsSelf.instance_pool.idle() == 0
+
+
+def test_failed_runs_are_not_reused():
+    idle = Increment.instance_pool.idle()
+    with raises(MissingRequiredError):
+        Increment.run()
+    assert Increment.instance_pool.idle() == idle
+
+
+def test_pools_are_per_thread():
+    Increment.run(someint=1)
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(Increment.instance_pool.idle()))
+    thread.start()
+    thread.join()
+    assert seen == [0]
+    assert Increment.instance_pool.idle() == 1
+
+
+def test_run_within_uses_the_pool():
+    Increment.instances = []
+    Increment.run_within(5, someint=1)
+    Increment.run_within(5, someint=2)
+    assert len(set(Increment.instances)) == 1
+
+
+def test_async_commands_are_pooled():
+    async def run():
+        return [await AsyncIncrement.run_async(someint=n) for n in range(3)]
+
+    assert asyncio.run(run()) == [1, 2, 3]
+    assert AsyncIncrement.instance_pool.idle() == 1
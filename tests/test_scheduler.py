@@ -0,0 +1,99 @@
+import threading
+
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.command import Command
+from decree.exceptions import DeadlineExceeded
+from decree.exceptions import UnexpectedTypeError
+from decree.scheduler import CommandScheduler
+
+
+class RecordCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.string('label')
+        cmd.list('record')
+
+    def execute(self):
+        self.record.append(self.label)
+        return self.label
+
+
+class BlockCommand(Command):
+    @classmethod
+    def command_args(cmd):
+        cmd.object('event', type=threading.Event)
+
+    def execute(self):
+        self.event.wait(5)
+
+
+def test_commands_run_in_priority_order():
+    record = []
+    release = threading.Event()
+    with CommandScheduler(workers=1) as scheduler:
+        scheduler.schedule(BlockCommand, {'event': release})
+        while scheduler.depth():
+            threading.Event().wait(0.001)
+        for label, priority in (('batch', 10), ('urgent', 0), ('later', 10), ('normal', 5)):
+            scheduler.schedule(RecordCommand, {'label': label, 'record': record}, priority=priority)
+        assert scheduler.depth() == 4
+        release.set()
+    assert record == ['urgent', 'normal', 'batch', 'later']
+
+
+def test_results_are_returned_through_futures():
+    with CommandScheduler(workers=2) as scheduler:
+        future = scheduler.schedule(RecordCommand, {'label': 'done', 'record': []})
+        assert future.result(timeout=5) == 'done'
+    stats = scheduler.stats()
+    assert stats['completed'] == 1
+    assert stats['depth'] == 0
+    assert stats['wait']['count'] == 1
+
+
+def test_args_are_validated_when_scheduled():
+    with CommandScheduler(workers=1) as scheduler:
+        with raises(UnexpectedTypeError):
+            scheduler.schedule(RecordCommand, {'label': 1, 'record': []})
+    assert scheduler.stats()['submitted'] == 0
+
+
+def test_expired_commands_are_not_executed():
+    now = [0]
+    record = []
+    release = threading.Event()
+    scheduler = CommandScheduler(workers=1, clock=lambda: now[0])
+    scheduler.schedule(BlockCommand, {'event': release})
+    failing = scheduler.schedule(RecordCommand, {'label': 'late', 'record': record}, timeout=1)
+    now[0] = 2
+    release.set()
+    scheduler.shutdown()
+
+    with raises(DeadlineExceeded, match='RecordCommand expired before it was executed'):
+        failing.result()
+    assert record == []
+    assert scheduler.stats()['expired'] == 1
+
+
+def test_expired_commands_can_be_dropped():
+    release = threading.Event()
+    scheduler = CommandScheduler(workers=1, expired='drop')
+    scheduler.schedule(BlockCommand, {'event': release})
+    dropped = scheduler.schedule(RecordCommand, {'label': 'late', 'record': []}, deadline=0)
+    release.set()
+    scheduler.shutdown()
+    assert dropped.cancelled()
+
+
+def test_shutdown_can_cancel_pending_commands():
+    release = threading.Event()
+    scheduler = CommandScheduler(workers=1)
+    scheduler.schedule(BlockCommand, {'event': release})
+    pending = scheduler.schedule(RecordCommand, {'label': 'never', 'record': []})
+    threading.Thread(target=lambda: (threading.Event().wait(0.05), release.set())).start()
+    scheduler.shutdown(cancel_pending=True)
+    assert pending.cancelled()
+    with raises(RuntimeError, match='cannot schedule commands after shutdown'):
+        scheduler.schedule(RecordCommand, {'label': 'x', 'record': []})
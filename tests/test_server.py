@@ -0,0 +1,122 @@
+import threading
+from concurrent.futures import TimeoutError
+
+from pytest import fixture
+from pytest import raises
+
+import decree.validators  # noqa: F401 defines the arg methods of commands
+from decree.client import CommandClient
+from decree.command import Command
+from decree.exceptions import RemoteCommandError
+from decree.server import CommandServer
+
+
+class EchoCommand(Command):
+    command_namespace = 'server'
+
+    @classmethod
+    def command_args(cmd):
+        cmd.int('someint')
+        cmd.float('delay', default=0.0001)
+
+    def execute(self):
+        threading.Event().wait(self.delay)
+        return {'someint': self.someint, 'thread': threading.current_thread().name}
+
+
+class ConcurrentCommand(Command):
+    command_namespace = 'server'
+    running = 0
+    most_running = 0
+    lock = threading.Lock()
+
+    def execute(self):
+        cls = type(self)
+        with cls.lock:
+            cls.running += 1
+            cls.most_running = max(cls.most_running, cls.running)
+        threading.Event().wait(0.01)
+        with cls.lock:
+            cls.running -= 1
+
+
+class UnservedCommand(Command):
+    def execute(self):
+        return 'unserved'
+
+
+@fixture
+def tcp_server():
+    with CommandServer(('127.0.0.1', 0), workers=4, namespaces=['server']) as server:
+        yield server.start()
+
+
+def test_commands_run_on_the_server(tcp_server):
+    with CommandClient(tcp_server.address) as client:
+        assert client.run(EchoCommand, {'someint': 1})['someint'] == 1
+        assert client.run('server.EchoCommand', {'someint': 2})['someint'] == 2
+
+
+def test_requests_are_pipelined_over_pooled_connections(tcp_server):
+    with CommandClient(tcp_server.address, pool_size=2) as client:
+        futures = [client.submit(EchoCommand, {'someint': number, 'delay': 0.01}) for number in range(20)]
+        assert [future.result(timeout=5)['someint'] for future in futures] == list(range(20))
+        assert len(client._connections) == 2
+
+
+def test_errors_are_raised_by_the_client(tcp_server):
+    with CommandClient(tcp_server.address) as client:
+        with raises(RemoteCommandError, match="UnexpectedTypeError: Expected 'someint'") as error:
+            client.run(EchoCommand, {'someint': 'x'})
+        assert error.value.code == 'unexpected_type'
+        with raises(RemoteCommandError, match='UnknownCommandError'):
+            client.run('server.Missing')
+
+
+def test_only_the_given_commands_are_served(tcp_server):
+    with CommandClient(tcp_server.address) as client:
+        with raises(RemoteCommandError, match="No command is registered as 'UnservedCommand'"):
+            client.run(UnservedCommand)
+    with raises(ValueError, match='the commands or namespaces served must be given'):
+        CommandServer(('127.0.0.1', 0))
+
+    with CommandServer(('127.0.0.1', 0), commands=[UnservedCommand]) as server:
+        server.start()
+        with CommandClient(server.address) as client:
+            assert client.run('UnservedCommand') == 'unserved'
+            with raises(RemoteCommandError, match='UnknownCommandError'):
+                client.run(EchoCommand, {'someint': 1})
+
+    # a command looked up by its module and class name is only served if its own name is
+    qualified = '{}.UnservedCommand'.format(UnservedCommand.__module__)
+    with CommandServer(('127.0.0.1', 0), namespaces=[UnservedCommand.__module__]) as server:
+        server.start()
+        with CommandClient(server.address) as client:
+            with raises(RemoteCommandError, match="No command is registered as '{}'".format(qualified)):
+                client.run(qualified)
+
+
+def test_pipelined_requests_in_flight_are_bounded():
+    ConcurrentCommand.most_running = 0
+    with CommandServer(('127.0.0.1', 0), workers=4, namespaces=['server'], max_in_flight=2) as server:
+        server.start()
+        with CommandClient(server.address, pool_size=1) as client:
+            futures = [client.submit(ConcurrentCommand) for _ in range(8)]
+            assert [future.result(timeout=5) for future in futures] == [None] * 8
+    assert ConcurrentCommand.most_running <= 2
+
+
+def test_timed_out_runs_stop_waiting_for_their_response(tcp_server):
+    with CommandClient(tcp_server.address, timeout=0.01) as client:
+        with raises(TimeoutError):
+            client.run(EchoCommand, {'someint': 1, 'delay': 0.2})
+        assert len(client._connections[0]) == 0
+
+
+def test_unix_domain_sockets(tmpdir):
+    path = str(tmpdir.join('decree.sock'))
+    with CommandServer(path, commands=[EchoCommand]) as server:
+        server.start()
+        with CommandClient(path) as client:
+            assert client.run(EchoCommand, {'someint': 3})['someint'] == 3
+    assert not tmpdir.join('decree.sock').exists()
@@ -1,13 +1,21 @@
+from array import array
+
+from pytest import mark
 from pytest import raises
 
+from decree.columns import numpy
+from decree.exceptions import InvalidBufferError
 from decree.exceptions import MissingRequiredError
 from decree.exceptions import NotNoneError
+from decree.exceptions import UnexpectedElementTypeError
 from decree.exceptions import UnexpectedTypeError
 from decree.validators import BooleanValidator
+from decree.validators import BufferValidator
 from decree.validators import DictValidator
 from decree.validators import FloatValidator
 from decree.validators import IntValidator
 from decree.validators import ListValidator
+from decree.validators import NdarrayValidator
 from decree.validators import ObjectValidator
 from decree.validators import SetValidator
 from decree.validators import StringValidator
@@ -134,3 +142,209 @@ def test_default():
     with raises(UnexpectedTypeError,
                 match="Expected 'default for someint' to be of type 'int' but was 'str'"):
         IntValidator('someint', default='not an int')
+
+
+class SomeSubClass(SomeClass):
+    pass
+
+
+def test_object_validator_accepts_subclasses():
+    subclass_args = {'someclass': SomeSubClass()}
+    assert ObjectValidator('someclass', type=SomeClass).validate(subclass_args) == SomeSubClass()
+    assert ObjectValidator('someclass', type='SomeClass').validate(subclass_args) == SomeSubClass()
+
+
+def test_object_validator_rejects_unrelated_class_with_same_name():
+    validator = ObjectValidator('someclass', type=SomeClass)
+    impostor = type('SomeClass', (), {})
+
+    with raises(UnexpectedTypeError,
+                match="Expected 'someclass' to be of type 'SomeClass' but was 'SomeClass'"):
+        validator.validate({'someclass': impostor()})
+
+
+def test_object_validator_matches_named_type_by_name():
+    validator = ObjectValidator('someclass', type='SomeClass')
+    namesake = type('SomeClass', (), {})
+
+    assert isinstance(validator.validate({'someclass': namesake()}), namesake)
+    assert validator.validate(args) == SomeClass()
+    assert validator.validate({'someclass': SomeSubClass()}) == SomeSubClass()
+    assert validator.type_matcher().expected is None
+
+
+def test_object_validator_resolves_dotted_type():
+    from collections import OrderedDict
+    validator = ObjectValidator('somedict', type='collections.OrderedDict')
+    assert validator.validate({'somedict': OrderedDict()}) == OrderedDict()
+    with raises(UnexpectedTypeError,
+                match="Expected 'somedict' to be of type 'collections.OrderedDict' but was 'dict'"):
+        validator.validate(args)
+
+
+def test_object_validator_with_default():
+    assert ObjectValidator('notpresent', type=SomeClass, default=SomeClass()).validate(args) == SomeClass()
+
+
+def test_check_does_not_raise():
+    result = IntValidator('someint').check(args)
+    assert result.ok
+    assert result.value == 1234
+
+    result = IntValidator('somestring').check(args)
+    assert not result.ok
+    assert result.code == 'unexpected_type'
+    assert result.error.name == 'somestring'
+    assert result.error.message == "Expected 'somestring' to be of type 'int' but was 'str'"
+
+    assert IntValidator('notpresent').check(args).code == 'missing'
+    assert IntValidator('not_none', allow_none=False).check(args).code == 'not_none'
+    assert IntValidator('notpresent', default=1).check(args).value == 1
+
+
+def test_errors_format_their_message_when_read():
+    error = UnexpectedTypeError('someint', 'int', 'str')
+    assert error.args == ('someint', 'int', 'str')
+    assert str(error) == "Expected 'someint' to be of type 'int' but was 'str'"
+    assert error.code == 'unexpected_type'
+
+
+def test_list_validator_checks_element_types():
+    validator = ListValidator('somelist', of=int)
+    assert validator.validate(args) == [1, 2, 3, 4]
+    assert validator.validate({'somelist': [True, 2]}) == [True, 2]
+    with raises(UnexpectedElementTypeError,
+                match="Expected elements of 'somelist' to be of type 'int' but found 'str'"):
+        validator.validate({'somelist': [1, 'two']})
+    with raises(UnexpectedTypeError, match="to be of type 'list' but was 'tuple'"):
+        validator.validate({'somelist': (1, 2)})
+
+
+def test_dict_validator_checks_key_and_value_types():
+    validator = DictValidator('weights', keys=str, values=float)
+    assert validator.validate({'weights': {'a': 1.5}}) == {'a': 1.5}
+    with raises(UnexpectedElementTypeError, match="Expected keys of 'weights'"):
+        validator.validate({'weights': {1: 1.5}})
+    with raises(UnexpectedElementTypeError, match="Expected values of 'weights'"):
+        validator.validate({'weights': {'a': 'heavy'}})
+
+
+def test_set_validator_checks_element_types():
+    assert SetValidator('someset', of='int').validate(args) == {1, 2, 3, 4}
+    assert SetValidator('someset', of=str).check(args).code == 'unexpected_element_type'
+
+
+def test_element_typed_list_accepts_arrays_of_that_type():
+    validator = ListValidator('somelist', of=int)
+    ints = array('i', [1, 2])
+    assert validator.validate({'somelist': ints}) is ints
+    with raises(UnexpectedElementTypeError, match="but found 'float'"):
+        validator.validate({'somelist': array('d', [1.5])})
+    with raises(UnexpectedTypeError, match="but was 'array'"):
+        ListValidator('somelist').validate({'somelist': ints})
+
+
+@mark.skipif(numpy is None, reason='numpy is not installed')
+def test_element_typed_list_checks_numpy_dtype():
+    validator = ListValidator('somelist', of=float)
+    values = numpy.zeros(3)
+    assert validator.validate({'somelist': values}) is values
+    with raises(UnexpectedElementTypeError, match="but found 'int64'"):
+        validator.validate({'somelist': numpy.arange(1, 3, dtype='int64')})
+    mixed = numpy.array([1.5, 'a'], dtype=object)
+    with raises(UnexpectedElementTypeError, match="but found 'str'"):
+        validator.validate({'somelist': mixed})
+
+
+def test_sampled_element_checks_only_check_a_sample():
+    values = list(range(100))
+    values[1] = 'missed'
+    assert ListValidator('somelist', of=int, sample=10).validate({'somelist': values}) is values
+    values[50] = 'found'
+    with raises(UnexpectedElementTypeError):
+        ListValidator('somelist', of=int, sample=10).validate({'somelist': values})
+    with raises(ValueError, match='sample must be at least 1'):
+        ListValidator('somelist', of=int, sample=0)
+
+
+def test_element_types_of_defaults_are_checked():
+    with raises(UnexpectedElementTypeError):
+        ListValidator('notpresent', of=int, default=['a'])
+
+
+def config_validator():
+    return DictValidator('config', schema={
+        'port': IntValidator('port', default=8080),
+        'hosts': ListValidator('hosts', of=str),
+        'db': DictValidator('db', schema={
+            'user': StringValidator,
+            'timeout': FloatValidator('timeout', allow_none=False),
+        }),
+    })
+
+
+def test_dict_validator_validates_nested_schema():
+    config = {'hosts': ['a'], 'db': {'user': 'me', 'timeout': 1.5}, 'extra': 1}
+    assert config_validator().validate({'config': config}) == {
+        'port': 8080, 'hosts': ['a'], 'db': {'user': 'me', 'timeout': 1.5}, 'extra': 1}
+
+
+def test_schema_errors_carry_the_path_to_the_field():
+    validator = config_validator()
+    db = {'user': 'me', 'timeout': 1.5}
+
+    with raises(MissingRequiredError, match="Argument 'config.db' not present"):
+        validator.validate({'config': {'hosts': []}})
+    with raises(UnexpectedTypeError, match="Expected 'config.db.user' to be of type 'str' but was 'int'"):
+        validator.validate({'config': {'hosts': [], 'db': dict(db, user=1)}})
+    with raises(NotNoneError, match="Argument 'config.db.timeout' may not be None"):
+        validator.validate({'config': {'hosts': [], 'db': dict(db, timeout=None)}})
+    with raises(UnexpectedElementTypeError, match="Expected elements of 'config.hosts'"):
+        validator.validate({'config': {'hosts': [1], 'db': db}})
+
+    result = validator.check({'config': {'hosts': [], 'db': {'timeout': 1.5}}})
+    assert result.code == 'missing'
+    assert result.error.name == 'config.db.user'
+
+
+def test_schema_is_compiled_into_a_single_function():
+    source = config_validator()._validate_schema.source
+    assert "'config.db.timeout'" in source
+    assert source.count('def ') == 1
+
+
+def test_schema_fields_must_be_named_for_their_key():
+    with raises(ValueError, match="schema field 'a' has a validator named 'b'"):
+        DictValidator('config', schema={'a': IntValidator('b')})
+    with raises(ValueError, match='schema cannot be combined with keys or values'):
+        DictValidator('config', keys=str, schema={'a': IntValidator})
+
+
+def test_buffer_validator_accepts_buffers_without_copying():
+    validator = BufferValidator('data', max_size=4, contiguous=True)
+    for value in (b'ab', bytearray(b'ab'), memoryview(b'ab'), array('b', [1, 2])):
+        assert validator.validate({'data': value}) is value
+
+    with raises(InvalidBufferError, match="Argument 'data' must hold at most 4 bytes but holds 5"):
+        validator.validate({'data': b'abcde'})
+    with raises(InvalidBufferError, match="Argument 'data' must be contiguous"):
+        validator.validate({'data': memoryview(b'abcd')[::2]})
+    with raises(UnexpectedTypeError, match="Expected 'data' to be of type 'buffer' but was 'str'"):
+        validator.validate({'data': 'ab'})
+
+
+@mark.skipif(numpy is None, reason='numpy is not installed')
+def test_ndarray_validator_checks_dtype_shape_and_layout():
+    validator = NdarrayValidator('values', dtype='float32', shape=(None, 3), contiguous=True)
+    values = numpy.zeros((2, 3), dtype='float32')
+    assert validator.validate({'values': values}) is values
+    assert BufferValidator('values').validate({'values': values}) is values
+
+    with raises(InvalidBufferError, match="must have dtype 'float32' but has 'float64'"):
+        validator.validate({'values': numpy.zeros((2, 3))})
+    with raises(InvalidBufferError, match=r'must have shape \(None, 3\) but has \(3, 2\)'):
+        validator.validate({'values': numpy.zeros((3, 2), dtype='float32')})
+    with raises(InvalidBufferError, match='must be contiguous'):
+        validator.validate({'values': numpy.zeros((3, 6), dtype='float32')[:, ::2]})
+    with raises(UnexpectedTypeError, match="to be of type 'ndarray' but was 'list'"):
+        validator.validate({'values': [1.0]})